@@ -1,9 +1,19 @@
 #!/usr/bin/env python3
-"""Admin server - accessible only from local network. Port configurable via ADMIN_PORT in .env."""
+"""Admin server - accessible only from local network. Port configurable via ADMIN_PORT in .env.
 
-from flask import Flask
-from app.config import SECRET_KEY, UPLOADS_DIR, TEMPLATE_IMAGES_DIR, ADMIN_PORT
+Run `python admin_server.py serve` for the production server,
+`python admin_server.py migrate` to upgrade event files after an update, or
+`python admin_server.py rebuild` after editing or restoring event files by hand.
+"""
+
+from flask import Flask, Response
+from app.config import (
+    SECRET_KEY, UPLOADS_DIR, TEMPLATE_IMAGES_DIR, IMAGE_CACHE_DIR, IMMUTABLE_MAX_AGE, ADMIN_PORT,
+    ADMIN_WORKERS, ADMIN_THREADS, ADMIN_TIMEOUT,
+)
 from app.admin.routes import admin_bp
+from app.utils import json_log, metrics, profiling
+from app.utils.serving import main
 
 app = Flask(__name__)
 app.secret_key = SECRET_KEY
@@ -12,6 +22,12 @@ app.secret_key = SECRET_KEY
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
     from flask import send_from_directory
+    from app.services import upload_store
+    # Content-addressed uploads never change under the same name
+    if upload_store.is_content_addressed(filename):
+        response = send_from_directory(UPLOADS_DIR, filename, max_age=IMMUTABLE_MAX_AGE)
+        response.cache_control.immutable = True
+        return response
     return send_from_directory(UPLOADS_DIR, filename)
 
 @app.route('/template-images/<filename>')
@@ -19,7 +35,50 @@ def template_image(filename):
     from flask import send_from_directory
     return send_from_directory(TEMPLATE_IMAGES_DIR, filename)
 
+@app.route('/img/<filename>')
+def image_variant(filename):
+    from flask import send_from_directory
+    response = send_from_directory(IMAGE_CACHE_DIR, filename, max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.immutable = True
+    return response
+
 app.register_blueprint(admin_bp)
 
+json_log.init_app(app, "admin")
+
+# Prometheus scrape target for both servers. Public workers only write
+# snapshots to data/metrics/; this route is never reachable through the tunnel.
+metrics.init_app(app, "admin")
+profiling.init_app(app, "admin")
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+# Build the public read model and the contact index on the very first start.
+# Every worker runs this on boot, so after hand-editing or restoring event
+# files run `python admin_server.py rebuild` instead of relying on a restart.
+from app.config import CONTACT_INDEX_FILE
+from app.services import event_service, read_model
+if not read_model.version():
+    event_service.rebuild_read_model()
+if not CONTACT_INDEX_FILE.exists():
+    event_service.rebuild_contact_index()
+
+
+def migrate():
+    """Upgrade all event files to the current schema (stop both servers first)."""
+    migrated, total = event_service.migrate_events()
+    print(f"Migrated {migrated} of {total} event file(s) to schema version {event_service.SCHEMA_VERSION}")
+
+
+def rebuild():
+    """Resync the read model and contact index with the event files."""
+    event_service.rebuild_read_model()
+    event_service.rebuild_contact_index()
+    print("Rebuilt the public read model and the contact index")
+
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=ADMIN_PORT, debug=False)
+    main(app, "admin_server:app", "0.0.0.0", ADMIN_PORT, ADMIN_WORKERS, ADMIN_THREADS, ADMIN_TIMEOUT,
+         commands={"migrate": migrate, "rebuild": rebuild})
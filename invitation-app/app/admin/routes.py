@@ -1,12 +1,16 @@
 import os
 import subprocess
 from datetime import datetime, date
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
-from werkzeug.utils import secure_filename
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, abort, send_from_directory
 
-from app.config import INVITATION_TEMPLATES_DIR, UPLOADS_DIR, PUBLIC_DOMAIN, SENDER_PROFILES, get_sender_profile
-from app.services import contact_service, event_service, email_service, sms_service
-from app.utils.helpers import sanitize
+from app.config import (
+    INVITATION_TEMPLATES_DIR, PUBLIC_DOMAIN, SENDER_PROFILES, POOLED_PROFILE, LOCK_TRACE, PROFILES_DIR,
+)
+from app.services import contact_service, event_service, email_service, invitee_index, sms_service, upload_store
+from app.services.quota_service import QuotaExceeded
+from app.services.sender_pool import EventSenders
+from app.utils import lock_trace, profiling
+from app.utils.helpers import format_bytes, sanitize
 
 admin_bp = Blueprint(
     "admin", __name__,
@@ -22,6 +26,27 @@ def _allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def _save_photo(file):
+    """Store an uploaded photo by content hash (normalized, with variants). Returns the filename."""
+    extension = file.filename.rsplit(".", 1)[1].lower()
+    photo_filename, sizes = upload_store.store(file, extension)
+    if sizes and sizes["email"] < sizes["original"]:
+        flash(
+            f"Photo optimized: {format_bytes(sizes['original'])} uploaded, "
+            f"{format_bytes(sizes['normalized'])} stored, "
+            f"{format_bytes(sizes['email'])} attached to emails.",
+            "success",
+        )
+    return photo_filename
+
+
+def _flash_throttled(throttled, noun):
+    """Flash one message per channel that stopped early because of quotas."""
+    for channel, (reason, skipped) in throttled.items():
+        label = "Email" if channel == "email" else "SMS"
+        flash(f"{label} sending paused ({reason}); {skipped} {noun}(s) not sent. Try again later.", "warning")
+
+
 def _get_template_choices():
     templates = []
     for f in sorted(INVITATION_TEMPLATES_DIR.glob("*.html")):
@@ -47,12 +72,32 @@ def dashboard():
 
 @admin_bp.route("/events/<event_id>")
 def event_detail(event_id):
-    event = event_service.get_event(event_id)
+    # Guest rows are fetched page by page from event_invitees_api
+    event = event_service.get_event(event_id, include_invitees=False)
     if not event:
         flash("Event not found.", "error")
         return redirect(url_for("admin.dashboard"))
-    stats = event_service.get_event_stats(event)
-    return render_template("event_detail.html", event=event, stats=stats)
+    stats = event_service.get_invitee_index(event_id).summary
+    capacity = EventSenders(event).capacity()
+    return render_template("event_detail.html", event=event, stats=stats, capacity=capacity,
+                           statuses=invitee_index.STATUSES, per_page=INVITEES_PER_PAGE)
+
+
+def _selected_contact_ids(event_id, form):
+    """contact_ids posted explicitly, or the ids matching posted filters.
+
+    The event page's "send to all" buttons post filters (e.g. channel=email
+    and sent=unsent) instead of one hidden field per guest. Returns None
+    when the form names no one, which means every invitee.
+    """
+    contact_ids = form.getlist("contact_ids")
+    if contact_ids:
+        return set(contact_ids)
+    filters = invitee_index.parse_filters(form)
+    if not any(filters.values()):
+        return None
+    index = event_service.get_invitee_index(event_id)
+    return set(index.contact_ids(index.query(**filters))) if index else set()
 
 
 # --- Create Event ---
@@ -62,7 +107,7 @@ def new_event():
     templates = _get_template_choices()
     contacts = contact_service.get_all_contacts()
     all_tags = contact_service.get_all_tags()
-    return render_template("event_form.html", templates=templates, contacts=contacts, event=None, all_tags=all_tags, sender_profiles=SENDER_PROFILES)
+    return render_template("event_form.html", templates=templates, contacts=contacts, event=None, all_tags=all_tags, sender_profiles=SENDER_PROFILES, pooled_profile=POOLED_PROFILE)
 
 
 @admin_bp.route("/events/new", methods=["POST"])
@@ -88,8 +133,7 @@ def create_event():
     if "photo" in request.files:
         file = request.files["photo"]
         if file and file.filename and _allowed_file(file.filename):
-            photo_filename = secure_filename(file.filename)
-            file.save(UPLOADS_DIR / photo_filename)
+            photo_filename = _save_photo(file)
 
     # Get selected contacts
     all_contacts = contact_service.get_all_contacts()
@@ -112,17 +156,17 @@ def create_event():
 
 @admin_bp.route("/events/<event_id>/edit", methods=["GET"])
 def edit_event(event_id):
-    event = event_service.get_event(event_id)
+    event = event_service.get_event(event_id, include_invitees=False)
     if not event:
         flash("Event not found.", "error")
         return redirect(url_for("admin.dashboard"))
     templates = _get_template_choices()
-    return render_template("event_edit.html", event=event, templates=templates, sender_profiles=SENDER_PROFILES)
+    return render_template("event_edit.html", event=event, templates=templates, sender_profiles=SENDER_PROFILES, pooled_profile=POOLED_PROFILE)
 
 
 @admin_bp.route("/events/<event_id>/edit", methods=["POST"])
 def save_event(event_id):
-    event = event_service.get_event(event_id)
+    event = event_service.get_event(event_id, include_invitees=False)
     if not event:
         flash("Event not found.", "error")
         return redirect(url_for("admin.dashboard"))
@@ -148,9 +192,7 @@ def save_event(event_id):
     if "photo" in request.files:
         file = request.files["photo"]
         if file and file.filename and _allowed_file(file.filename):
-            photo_filename = secure_filename(file.filename)
-            file.save(UPLOADS_DIR / photo_filename)
-            kwargs["photo"] = photo_filename
+            kwargs["photo"] = _save_photo(file)
 
     event_service.update_event(event_id, **kwargs)
     flash("Event updated.", "success")
@@ -177,7 +219,7 @@ def add_invitees_form(event_id):
 
 @admin_bp.route("/events/<event_id>/invitees/add", methods=["POST"])
 def save_invitees(event_id):
-    event = event_service.get_event(event_id)
+    event = event_service.get_event(event_id, include_invitees=False)
     if not event:
         flash("Event not found.", "error")
         return redirect(url_for("admin.dashboard"))
@@ -199,7 +241,7 @@ def save_invitees(event_id):
 
 @admin_bp.route("/events/<event_id>/delete", methods=["POST"])
 def delete_event(event_id):
-    event = event_service.get_event(event_id)
+    event = event_service.get_event(event_id, include_invitees=False)
     if event:
         event_service.delete_event(event_id)
         flash(f"Event '{event['title']}' deleted.", "success")
@@ -217,8 +259,8 @@ def send_invitations(event_id):
         flash("Event not found.", "error")
         return redirect(url_for("admin.dashboard"))
 
-    # Get sender profile for this event
-    profile = get_sender_profile(event.get("sender_profile", "primary"))
+    # Sender profile(s) for this event (pooled events rotate per send)
+    senders = EventSenders(event)
 
     # Load invitation template for email
     tmpl_path = INVITATION_TEMPLATES_DIR / f"{event['template']}.html"
@@ -227,16 +269,17 @@ def send_invitations(event_id):
     template_html = tmpl_path.read_text()
 
     # Send to specific contacts or all unsent
-    contact_ids = request.form.getlist("contact_ids")
+    contact_ids = _selected_contact_ids(event_id, request.form)
     force_email = request.form.get("force_email") == "true"
     force_sms = request.form.get("force_sms") == "true"
     email_only = request.form.get("email_only") == "true"
     sms_only = request.form.get("sms_only") == "true"
     sent_count = 0
     errors = []
+    throttled = {}  # channel -> [reason, skipped count]
 
     for inv in event["invitees"]:
-        if contact_ids and inv["contact_id"] not in contact_ids:
+        if contact_ids is not None and inv["contact_id"] not in contact_ids:
             continue
 
         send_method = inv.get("send_method", "email")
@@ -259,41 +302,50 @@ def send_invitations(event_id):
                     should_sms = True
 
         # Send email
-        if should_email:
+        if should_email and "email" in throttled:
+            throttled["email"][1] += 1
+        elif should_email:
             rsvp_url = f"https://{PUBLIC_DOMAIN}/rsvp/{inv['token']}"
             html = email_service.render_invitation_email(template_html, event, inv, rsvp_url)
             try:
-                email_service.send_invitation(
+                profile_name = senders.send("email", lambda profile: email_service.send_invitation(
                     to_email=inv["email"],
                     to_name=inv["name"],
                     subject=f"You're Invited: {event['title']}",
                     html_content=html,
                     photo_filename=event.get("photo"),
                     sender_profile=profile,
-                )
-                event_service.mark_email_sent(event_id, inv["contact_id"])
+                ))
+                event_service.mark_email_sent(event_id, inv["contact_id"], sender_profile=profile_name)
                 sent_count += 1
+            except QuotaExceeded as e:
+                throttled["email"] = [str(e), 1]
             except Exception as e:
                 errors.append(f"Email to {inv['name']}: {e}")
 
         # Send SMS
-        if should_sms:
+        if should_sms and "sms" in throttled:
+            throttled["sms"][1] += 1
+        elif should_sms:
             short_url = f"https://{PUBLIC_DOMAIN}/r/{inv.get('short_token', '')}"
             try:
-                sms_service.send_sms_invitation(
+                profile_name = senders.send("sms", lambda profile: sms_service.send_sms_invitation(
                     to_phone=inv["phone"],
                     to_name=inv["name"],
                     event=event,
                     short_rsvp_url=short_url,
                     sender_profile=profile,
-                )
-                event_service.mark_sms_sent(event_id, inv["contact_id"])
+                ))
+                event_service.mark_sms_sent(event_id, inv["contact_id"], sender_profile=profile_name)
                 sent_count += 1
+            except QuotaExceeded as e:
+                throttled["sms"] = [str(e), 1]
             except Exception as e:
                 errors.append(f"SMS to {inv['name']}: {e}")
 
     if sent_count:
         flash(f"Sent {sent_count} invitation(s).", "success")
+    _flash_throttled(throttled, "invitation")
     if errors:
         for err in errors:
             flash(err, "error")
@@ -315,8 +367,8 @@ def send_reminders(event_id):
         flash("Invalid reminder method.", "error")
         return redirect(url_for("admin.event_detail", event_id=event_id))
 
-    # Get sender profile for this event
-    profile = get_sender_profile(event.get("sender_profile", "primary"))
+    # Sender profile(s) for this event (pooled events rotate per send)
+    senders = EventSenders(event)
 
     # Calculate days remaining
     try:
@@ -330,42 +382,54 @@ def send_reminders(event_id):
 
     sent_count = 0
     errors = []
+    throttled = {}  # channel -> [reason, skipped count]
 
     for inv in eligible:
         if method == "email" and inv.get("email"):
+            if "email" in throttled:
+                throttled["email"][1] += 1
+                continue
             rsvp_url = f"https://{PUBLIC_DOMAIN}/rsvp/{inv['token']}"
             try:
-                email_service.send_reminder_email(
+                senders.send("email", lambda profile: email_service.send_reminder_email(
                     to_email=inv["email"],
                     to_name=inv["name"],
                     event=event,
                     days_remaining=days_remaining,
                     rsvp_url=rsvp_url,
                     sender_profile=profile,
-                )
+                ))
                 sent_count += 1
+            except QuotaExceeded as e:
+                throttled["email"] = [str(e), 1]
             except Exception as e:
                 errors.append(f"Email to {inv['name']}: {e}")
 
         elif method == "sms" and inv.get("phone"):
+            if "sms" in throttled:
+                throttled["sms"][1] += 1
+                continue
             short_url = f"https://{PUBLIC_DOMAIN}/r/{inv.get('short_token', '')}"
             try:
-                sms_service.send_reminder_sms(
+                senders.send("sms", lambda profile: sms_service.send_reminder_sms(
                     to_phone=inv["phone"],
                     to_name=inv["name"],
                     event=event,
                     days_remaining=days_remaining,
                     short_rsvp_url=short_url,
                     sender_profile=profile,
-                )
+                ))
                 sent_count += 1
+            except QuotaExceeded as e:
+                throttled["sms"] = [str(e), 1]
             except Exception as e:
                 errors.append(f"SMS to {inv['name']}: {e}")
 
     if sent_count:
         flash(f"Sent {sent_count} reminder(s) via {method}.", "success")
-    elif not errors:
+    elif not errors and not throttled:
         flash("No eligible recipients found.", "warning")
+    _flash_throttled(throttled, "reminder")
     if errors:
         for err in errors:
             flash(err, "error")
@@ -395,7 +459,8 @@ def contacts():
         contacts_list = contact_service.search_contacts(query)
     else:
         contacts_list = contact_service.get_all_contacts()
-    return render_template("contacts.html", contacts=contacts_list, query=query)
+    history = event_service.get_contact_histories([c["id"] for c in contacts_list])
+    return render_template("contacts.html", contacts=contacts_list, query=query, history=history)
 
 
 @admin_bp.route("/contacts/add", methods=["POST"])
@@ -461,7 +526,7 @@ def sms_preview(event_id):
         return redirect(url_for("admin.dashboard"))
 
     sms_type = request.form.get("sms_type", "invitation")
-    contact_ids = request.form.getlist("contact_ids")
+    contact_ids = _selected_contact_ids(event_id, request.form)
     is_reminder = sms_type == "reminder"
 
     # Calculate days remaining for reminders
@@ -477,7 +542,7 @@ def sms_preview(event_id):
     for inv in event["invitees"]:
         if not inv.get("phone"):
             continue
-        if contact_ids and inv["contact_id"] not in contact_ids:
+        if contact_ids is not None and inv["contact_id"] not in contact_ids:
             continue
 
         short_url = f"https://{PUBLIC_DOMAIN}/r/{inv.get('short_token', '')}"
@@ -515,18 +580,22 @@ def send_sms_custom(event_id):
         flash("Event not found.", "error")
         return redirect(url_for("admin.dashboard"))
 
-    profile = get_sender_profile(event.get("sender_profile", "primary"))
+    senders = EventSenders(event)
     sms_type = request.form.get("sms_type", "invitation")
     contact_ids = request.form.getlist("contact_id")
 
     sent_count = 0
     errors = []
+    throttled = {}  # channel -> [reason, skipped count]
 
     for contact_id in contact_ids:
         phone = request.form.get(f"phone_{contact_id}", "")
         message_text = request.form.get(f"message_{contact_id}", "")
         if not phone or not message_text:
             continue
+        if throttled:
+            throttled["sms"][1] += 1
+            continue
 
         # Find invitee name
         inv_name = contact_id
@@ -536,15 +605,19 @@ def send_sms_custom(event_id):
                 break
 
         try:
-            sms_service.send_raw_sms(phone, message_text, sender_profile=profile)
+            profile_name = senders.send("sms", lambda profile: sms_service.send_raw_sms(
+                phone, message_text, sender_profile=profile))
             if sms_type == "invitation":
-                event_service.mark_sms_sent(event_id, contact_id)
+                event_service.mark_sms_sent(event_id, contact_id, sender_profile=profile_name)
             sent_count += 1
+        except QuotaExceeded as e:
+            throttled["sms"] = [str(e), 1]
         except Exception as e:
             errors.append(f"SMS to {inv_name}: {e}")
 
     if sent_count:
         flash(f"Sent {sent_count} SMS message(s).", "success")
+    _flash_throttled(throttled, "SMS message")
     if errors:
         for err in errors:
             flash(err, "error")
@@ -554,12 +627,12 @@ def send_sms_custom(event_id):
 
 @admin_bp.route("/events/<event_id>/sms-test", methods=["POST"])
 def send_test_sms(event_id):
-    event = event_service.get_event(event_id)
+    event = event_service.get_event(event_id, include_invitees=False)
     if not event:
         flash("Event not found.", "error")
         return redirect(url_for("admin.dashboard"))
 
-    profile = get_sender_profile(event.get("sender_profile", "primary"))
+    senders = EventSenders(event)
     test_phone = request.form.get("test_phone", "").strip()
     test_message = request.form.get("test_message", "").strip()
 
@@ -568,7 +641,8 @@ def send_test_sms(event_id):
         return redirect(url_for("admin.event_detail", event_id=event_id))
 
     try:
-        sms_service.send_raw_sms(test_phone, test_message, sender_profile=profile)
+        senders.send("sms", lambda profile: sms_service.send_raw_sms(
+            test_phone, test_message, sender_profile=profile))
         flash(f"Test SMS sent to {test_phone}.", "success")
     except Exception as e:
         flash(f"Test SMS failed: {e}", "error")
@@ -610,6 +684,35 @@ def template_preview(template_name):
     return tmpl_path.read_text()
 
 
+# --- API: Event Invitees ---
+
+INVITEES_PER_PAGE = 50
+INVITEES_MAX_PER_PAGE = 500
+
+
+@admin_bp.route("/api/events/<event_id>/invitees")
+def event_invitees_api(event_id):
+    """One page of an event's guests, filtered by status, channel, sent and name.
+
+    ?status=accepted,maybe&channel=email|sms&sent=sent|unsent&q=<name>&page=1&per_page=50
+    """
+    index = event_service.get_invitee_index(event_id)
+    if index is None:
+        return jsonify({"error": "Event not found"}), 404
+    per_page = min(max(request.args.get("per_page", INVITEES_PER_PAGE, type=int), 1), INVITEES_MAX_PER_PAGE)
+    matches = index.query(**invitee_index.parse_filters(request.args))
+    pages = max((len(matches) + per_page - 1) // per_page, 1)
+    page = min(max(request.args.get("page", 1, type=int), 1), pages)
+    return jsonify({
+        "invitees": index.page(matches, page, per_page),
+        "total": len(matches),
+        "page": page,
+        "pages": pages,
+        "per_page": per_page,
+        "stats": index.summary,
+    })
+
+
 # --- API: Contacts Search ---
 
 @admin_bp.route("/api/contacts/search")
@@ -617,3 +720,59 @@ def search_contacts_api():
     query = request.args.get("q", "")
     results = contact_service.search_contacts(query) if query else contact_service.get_all_contacts()
     return jsonify(results)
+
+
+# --- Debug: File Locks ---
+
+@admin_bp.route("/debug/locks")
+def debug_locks():
+    report = lock_trace.report() if LOCK_TRACE else None
+    if request.args.get("format") == "json":
+        return jsonify({"enabled": LOCK_TRACE, **(report or {})})
+    return render_template("debug_locks.html", report=report, enabled=LOCK_TRACE)
+
+
+# --- Debug: Request Profiles ---
+
+@admin_bp.route("/debug/profiles")
+def debug_profiles():
+    rate, slow_ms, source = profiling.settings()
+    return render_template(
+        "debug_profiles.html",
+        profiles=profiling.list_profiles()[:100],
+        rate=rate, slow_ms=slow_ms, source=source,
+        until=profiling.toggle_until(),
+        format_time=lambda ts: datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S"),
+    )
+
+
+@admin_bp.route("/debug/profiles/toggle", methods=["POST"])
+def toggle_profiling():
+    try:
+        rate = min(max(float(request.form.get("rate_percent") or 0) / 100, 0.0), 1.0)
+        slow_ms = max(int(request.form.get("slow_ms") or 0), 0)
+        minutes = max(int(request.form.get("minutes") or 0), 0)
+    except ValueError:
+        flash("Invalid profiling settings.", "error")
+        return redirect(url_for("admin.debug_profiles"))
+    if request.form.get("action") == "stop":
+        minutes = 0
+    profiling.write_toggle(rate, slow_ms, minutes)
+    if minutes and (rate or slow_ms):
+        flash(f"Profiling on for {minutes} minute(s) on both servers.", "success")
+    else:
+        flash("Profiling off.", "success")
+    return redirect(url_for("admin.debug_profiles"))
+
+
+@admin_bp.route("/debug/profiles/<profile_id>")
+def profile_detail(profile_id):
+    info, samples = profiling.load_profile(profile_id)
+    if info is None:
+        abort(404)
+    return render_template("debug_profile.html", info=info, top=profiling.top_functions(samples))
+
+
+@admin_bp.route("/debug/profiles/<profile_id>.folded")
+def profile_download(profile_id):
+    return send_from_directory(PROFILES_DIR, f"{profile_id}.folded", mimetype="text/plain", as_attachment=True)
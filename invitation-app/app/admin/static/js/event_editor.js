@@ -24,6 +24,7 @@ function updatePreview() {
                 '{{guest_name}}': 'Guest Name',
                 '{{rsvp_url}}': '#',
                 '{{photo_display}}': 'none',
+                '{{photo_srcset}}': '',
             };
 
             for (const [key, value] of Object.entries(replacements)) {
@@ -0,0 +1,133 @@
+// Attendee table on the event page: rows are fetched a page at a time from
+// the invitees API, filtered by the search box and selects above the table.
+const table = document.getElementById('invitee-table');
+const tbody = table.querySelector('tbody');
+const filters = document.getElementById('invitee-filters');
+const pager = document.getElementById('invitee-pager');
+const urls = table.dataset;
+let currentPage = 1;
+let lastPage = 1;
+let searchTimer = null;
+let pending = null;
+
+function el(tag, attrs, ...children) {
+    const node = document.createElement(tag);
+    for (const [key, value] of Object.entries(attrs || {})) {
+        node.setAttribute(key, value);
+    }
+    for (const child of children) {
+        if (child !== null && child !== undefined) {
+            node.append(child);  // strings become text nodes, never markup
+        }
+    }
+    return node;
+}
+
+function hiddenForm(action, fields, label) {
+    const form = el('form', { method: 'POST', action: action, class: 'inline-form' });
+    for (const [name, value] of Object.entries(fields)) {
+        form.append(el('input', { type: 'hidden', name: name, value: value }));
+    }
+    form.append(el('button', { type: 'submit', class: 'btn btn-small btn-secondary' }, label));
+    return form;
+}
+
+function sentCell(sentAt, via) {
+    if (!sentAt) return el('td', {}, '—');
+    return el('td', {},
+        el('span', { class: 'sent-check', title: sentAt }, '✓'),
+        via ? el('br') : null,
+        via ? el('small', { class: 'text-muted' }, 'via ' + via) : null);
+}
+
+function statusForm(inv) {
+    const select = el('select', { name: 'status', class: 'small-select' },
+        el('option', { value: '' }, 'Change...'),
+        el('option', { value: 'accepted' }, 'Accepted'),
+        el('option', { value: 'declined' }, 'Declined'),
+        el('option', { value: 'maybe' }, 'Maybe'),
+        el('option', { value: 'pending' }, 'Pending'));
+    return el('form', { method: 'POST', action: urls.updateStatus, class: 'inline-form' },
+        el('input', { type: 'hidden', name: 'contact_id', value: inv.contact_id }),
+        select,
+        el('button', { type: 'submit', class: 'btn btn-small' }, 'Set'));
+}
+
+function row(inv) {
+    const status = inv.status || 'pending';
+    const actions = el('td', { class: 'actions-cell' }, statusForm(inv));
+    if (inv.email) {
+        actions.append(hiddenForm(urls.sendInvitations,
+            { contact_ids: inv.contact_id, force_email: 'true' }, 'Resend Email'));
+    }
+    if (inv.phone) {
+        actions.append(hiddenForm(urls.smsPreview,
+            { sms_type: 'invitation', contact_ids: inv.contact_id }, 'Resend SMS'));
+    }
+    return el('tr', {},
+        el('td', {}, inv.name),
+        el('td', {},
+            el('small', {}, inv.email || ''),
+            inv.phone ? el('br') : null,
+            inv.phone ? el('small', {}, inv.phone) : null),
+        el('td', {}, el('span', { class: 'status-badge status-' + status },
+            status.charAt(0).toUpperCase() + status.slice(1))),
+        el('td', {}, inv.responded_at ? inv.responded_at.slice(0, 10) : '—'),
+        sentCell(inv.email_sent_at, inv.email_sent_via),
+        sentCell(inv.sms_sent_at, inv.sms_sent_via),
+        actions);
+}
+
+function message(text) {
+    tbody.replaceChildren(el('tr', {}, el('td', { colspan: '7', class: 'text-muted' }, text)));
+}
+
+function load(page) {
+    const params = new URLSearchParams(new FormData(filters));
+    for (const [key, value] of [...params]) {
+        if (!value) params.delete(key);
+    }
+    params.set('page', page);
+    params.set('per_page', urls.perPage);
+
+    // Only the newest request may draw, so fast typing can't show stale rows
+    const request = fetch(urls.api + '?' + params.toString()).then(r => {
+        if (!r.ok) throw new Error(r.status);
+        return r.json();
+    });
+    pending = request;
+    request
+        .then(data => {
+            if (pending !== request) return;
+            currentPage = data.page;
+            lastPage = data.pages;
+            if (data.invitees.length) {
+                tbody.replaceChildren(...data.invitees.map(row));
+            } else {
+                message(data.stats.total ? 'No invitees match these filters.' : 'No invitees yet.');
+            }
+            document.getElementById('invitee-count').textContent =
+                data.total + ' of ' + data.stats.total + ' invitee(s)';
+            document.getElementById('invitee-page').textContent = 'Page ' + data.page + ' of ' + data.pages;
+            pager.querySelector('[data-page="prev"]').disabled = data.page <= 1;
+            pager.querySelector('[data-page="next"]').disabled = data.page >= data.pages;
+            pager.hidden = data.pages <= 1;
+        })
+        .catch(() => {
+            if (pending === request) message('Could not load invitees.');
+        });
+}
+
+filters.addEventListener('change', () => load(1));
+filters.addEventListener('submit', e => { e.preventDefault(); load(1); });
+filters.querySelector('input[name="q"]').addEventListener('input', () => {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(() => load(1), 250);
+});
+pager.addEventListener('click', e => {
+    const direction = e.target.dataset.page;
+    if (direction === 'prev' && currentPage > 1) load(currentPage - 1);
+    if (direction === 'next' && currentPage < lastPage) load(currentPage + 1);
+});
+
+load(1);
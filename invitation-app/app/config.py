@@ -1,27 +1,42 @@
 import os
 import json
 from pathlib import Path
-from dotenv import load_dotenv
-
-load_dotenv()
 
 BASE_DIR = Path(__file__).resolve().parent.parent
-DATA_DIR = BASE_DIR / "data"
+
+# python-dotenv is only imported when there is a .env to read
+if (BASE_DIR / ".env").exists():
+    from dotenv import load_dotenv
+    load_dotenv(BASE_DIR / ".env")
+
+# Overridable so benchmarks and load tests can run against a scratch copy
+DATA_DIR = Path(os.getenv("DATA_DIR") or BASE_DIR / "data")
 EVENTS_DIR = DATA_DIR / "events"
 CONTACTS_FILE = DATA_DIR / "contacts.json"
+CONTACT_INDEX_FILE = DATA_DIR / "contact_events.json"  # contact id -> event ids
 CONFIG_FILE = DATA_DIR / "config.json"
+QUOTA_FILE = DATA_DIR / "quota.json"
+RATE_LIMIT_DB = DATA_DIR / "ratelimit.db"
+READ_MODEL_DB = DATA_DIR / "public.db"  # public server's copy of event data, rebuilt from events/
+UPLOADS_INDEX_FILE = DATA_DIR / "uploads.json"  # content-addressed upload refcounts
+METRICS_DIR = DATA_DIR / "metrics"  # per-process metric snapshots, served by the admin's /metrics
 UPLOADS_DIR = BASE_DIR / "uploads"
+PROFILES_DIR = BASE_DIR / "profiles"  # captured request profiles (folded stacks)
+PROFILING_TOGGLE_FILE = DATA_DIR / "profiling.json"  # admin's signed on/off switch
 INVITATION_TEMPLATES_DIR = BASE_DIR / "templates" / "invitations"
 TEMPLATE_IMAGES_DIR = BASE_DIR / "templates" / "images"
+IMAGE_CACHE_DIR = BASE_DIR / "cache" / "images"  # resized, content-hashed variants
 
-# Ensure directories exist
-EVENTS_DIR.mkdir(parents=True, exist_ok=True)
-UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
+# Content-hashed image variants never change, so browsers and CDNs may keep them forever
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
 
 # Email config
 GMAIL_ADDRESS = os.getenv("GMAIL_ADDRESS", "")
 GMAIL_APP_PASSWORD = os.getenv("GMAIL_APP_PASSWORD", "")
 ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", GMAIL_ADDRESS)
+# Outgoing mail server (STARTTLS); point at perf/fake_smtp.py for load tests
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 PUBLIC_DOMAIN = os.getenv("PUBLIC_DOMAIN", "invites.yourdomain.com")
 SECRET_KEY = os.getenv("SECRET_KEY", "change-me-in-production")
 
@@ -30,6 +45,43 @@ ADMIN_PORT = int(os.getenv("ADMIN_PORT", "5001"))
 PUBLIC_PORT = int(os.getenv("PUBLIC_PORT", "8080"))
 ADMIN_HOST = os.getenv("ADMIN_HOST", "localhost")
 
+# Production serving (`python <server>.py serve`, gunicorn). The admin server
+# defaults to a single worker because send loops keep circuit-breaker state
+# in-process and can run for minutes.
+PUBLIC_WORKERS = int(os.getenv("PUBLIC_WORKERS", "2"))
+PUBLIC_THREADS = int(os.getenv("PUBLIC_THREADS", "4"))
+PUBLIC_TIMEOUT = int(os.getenv("PUBLIC_TIMEOUT", "30"))
+ADMIN_WORKERS = int(os.getenv("ADMIN_WORKERS", "1"))
+ADMIN_THREADS = int(os.getenv("ADMIN_THREADS", "4"))
+ADMIN_TIMEOUT = int(os.getenv("ADMIN_TIMEOUT", "600"))
+
+# Public responses smaller than this are sent uncompressed (bytes)
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+
+# Logging: JSON lines on stderr (LOG_FORMAT=text for a terminal), written by a
+# background thread. LOG_LEVELS overrides single loggers, e.g.
+# "app.public.routes=DEBUG,app.access=WARNING"; ACCESS_LOG=0 drops the
+# per-request lines.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+ACCESS_LOG = os.getenv("ACCESS_LOG", "1") == "1"
+
+# File-lock tracing (admin page /debug/locks): when on, every flock records
+# its wait and hold time, file and caller, and waits or holds longer than
+# these thresholds (milliseconds) are logged
+LOCK_TRACE = os.getenv("LOCK_TRACE", "0") == "1"
+LOCK_WAIT_WARN_MS = int(os.getenv("LOCK_WAIT_WARN_MS", "100"))
+LOCK_HOLD_WARN_MS = int(os.getenv("LOCK_HOLD_WARN_MS", "250"))
+
+# Request profiling: sample the stacks of this fraction of requests (0-1)
+# and/or of every request, keeping the profile only if it took at least
+# PROFILE_SLOW_MS. 0 leaves it to the admin toggle on /debug/profiles.
+PROFILE_RATE = float(os.getenv("PROFILE_RATE", "0"))
+PROFILE_SLOW_MS = int(os.getenv("PROFILE_SLOW_MS", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))  # stack sampling period
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))  # newest profiles kept on disk
+
 # SMS config (Android SMS Gateway)
 SMS_GATEWAY_URL = os.getenv("SMS_GATEWAY_URL", "")
 SMS_GATEWAY_LOGIN = os.getenv("SMS_GATEWAY_LOGIN", "")
@@ -38,18 +90,52 @@ SMS_GATEWAY_PASSWORD = os.getenv("SMS_GATEWAY_PASSWORD", "")
 # Secondary sender credentials
 GMAIL_ADDRESS_2 = os.getenv("GMAIL_ADDRESS_2", "")
 GMAIL_APP_PASSWORD_2 = os.getenv("GMAIL_APP_PASSWORD_2", "")
+SMTP_HOST_2 = os.getenv("SMTP_HOST_2", SMTP_HOST)
+SMTP_PORT_2 = int(os.getenv("SMTP_PORT_2", str(SMTP_PORT)))
 SMS_GATEWAY_URL_2 = os.getenv("SMS_GATEWAY_URL_2", "")
 SMS_GATEWAY_LOGIN_2 = os.getenv("SMS_GATEWAY_LOGIN_2", "")
 SMS_GATEWAY_PASSWORD_2 = os.getenv("SMS_GATEWAY_PASSWORD_2", "")
 
+# Per-profile send rates (messages per minute), used to weight pooled sending
+GMAIL_RATE_PER_MINUTE = int(os.getenv("GMAIL_RATE_PER_MINUTE", "20"))
+GMAIL_RATE_PER_MINUTE_2 = int(os.getenv("GMAIL_RATE_PER_MINUTE_2", "20"))
+SMS_RATE_PER_MINUTE = int(os.getenv("SMS_RATE_PER_MINUTE", "10"))
+SMS_RATE_PER_MINUTE_2 = int(os.getenv("SMS_RATE_PER_MINUTE_2", "10"))
+
+# Per-profile daily limits (rolling 24h). Gmail caps consumer accounts at 500/day.
+GMAIL_DAILY_LIMIT = int(os.getenv("GMAIL_DAILY_LIMIT", "500"))
+GMAIL_DAILY_LIMIT_2 = int(os.getenv("GMAIL_DAILY_LIMIT_2", "500"))
+SMS_DAILY_LIMIT = int(os.getenv("SMS_DAILY_LIMIT", "300"))
+SMS_DAILY_LIMIT_2 = int(os.getenv("SMS_DAILY_LIMIT_2", "300"))
+
+# Longest a send loop will sleep waiting for rate capacity before giving up (seconds)
+QUOTA_MAX_WAIT = int(os.getenv("QUOTA_MAX_WAIT", "90"))
+
+# Network deadlines for Gmail SMTP and the SMS gateway (seconds)
+SMTP_CONNECT_TIMEOUT = float(os.getenv("SMTP_CONNECT_TIMEOUT", "10"))
+SMTP_SEND_TIMEOUT = float(os.getenv("SMTP_SEND_TIMEOUT", "30"))
+SMS_CONNECT_TIMEOUT = float(os.getenv("SMS_CONNECT_TIMEOUT", "5"))
+SMS_SEND_TIMEOUT = float(os.getenv("SMS_SEND_TIMEOUT", "15"))
+
+# Circuit breaker: consecutive failures before a sender fails fast, and how
+# long to wait before probing it again (seconds)
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_RESET_TIMEOUT = int(os.getenv("BREAKER_RESET_TIMEOUT", "60"))
+
 # Sender profiles
 SENDER_PROFILES = {
     "primary": {
         "gmail_address": GMAIL_ADDRESS,
         "gmail_password": GMAIL_APP_PASSWORD,
+        "smtp_host": SMTP_HOST,
+        "smtp_port": SMTP_PORT,
         "sms_url": SMS_GATEWAY_URL,
         "sms_login": SMS_GATEWAY_LOGIN,
         "sms_password": SMS_GATEWAY_PASSWORD,
+        "email_rate": GMAIL_RATE_PER_MINUTE,
+        "sms_rate": SMS_RATE_PER_MINUTE,
+        "email_daily": GMAIL_DAILY_LIMIT,
+        "sms_daily": SMS_DAILY_LIMIT,
     },
 }
 
@@ -57,11 +143,20 @@ if GMAIL_ADDRESS_2 or SMS_GATEWAY_URL_2:
     SENDER_PROFILES["secondary"] = {
         "gmail_address": GMAIL_ADDRESS_2,
         "gmail_password": GMAIL_APP_PASSWORD_2,
+        "smtp_host": SMTP_HOST_2,
+        "smtp_port": SMTP_PORT_2,
         "sms_url": SMS_GATEWAY_URL_2,
         "sms_login": SMS_GATEWAY_LOGIN_2,
         "sms_password": SMS_GATEWAY_PASSWORD_2,
+        "email_rate": GMAIL_RATE_PER_MINUTE_2,
+        "sms_rate": SMS_RATE_PER_MINUTE_2,
+        "email_daily": GMAIL_DAILY_LIMIT_2,
+        "sms_daily": SMS_DAILY_LIMIT_2,
     }
 
+# Pseudo-profile: an event set to this spreads its sends across all profiles
+POOLED_PROFILE = "pooled"
+
 
 def get_sender_profile(name="primary"):
     """Get a sender profile by name, falling back to primary."""
@@ -75,4 +170,10 @@ def load_app_config():
             return json.load(f)
     return {}
 
-APP_CONFIG = load_app_config()
+
+def __getattr__(name):
+    # APP_CONFIG is read from disk on first access rather than at import
+    if name == "APP_CONFIG":
+        globals()["APP_CONFIG"] = value = load_app_config()
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,94 @@
+import sys
+
+
+class Invitee:
+    """One guest of an event, stored compactly.
+
+    Large events keep thousands of these in memory, so the record uses
+    __slots__, keeps the 64-character hex RSVP token as 32 raw bytes, and
+    shares the status, send-method and sender-profile strings. It behaves
+    enough like the dict it replaces (inv["name"], inv.get("phone"), "key"
+    in inv) that routes and Jinja templates don't care; to_dict() gives the
+    plain form for JSON.
+    """
+
+    FIELDS = (
+        "contact_id", "name", "email", "phone", "token", "short_token", "send_method",
+        "status", "responded_at", "email_sent_at", "sms_sent_at", "email_sent_via", "sms_sent_via",
+    )
+    _FIELD_SET = frozenset(FIELDS)
+    _INTERNED_FIELDS = frozenset(("status", "send_method", "email_sent_via", "sms_sent_via"))
+    _DEFAULTS = {"phone": "", "send_method": "email", "status": "pending"}
+
+    __slots__ = (
+        "contact_id", "name", "email", "phone", "_token", "short_token", "send_method",
+        "status", "responded_at", "email_sent_at", "sms_sent_at", "email_sent_via", "sms_sent_via",
+        "_extra",
+    )
+
+    def __init__(self, **fields):
+        self._extra = None
+        for name in self.FIELDS:
+            self[name] = fields.pop(name, self._DEFAULTS.get(name))
+        if fields:
+            # Keys from other versions of the app are carried through untouched
+            self._extra = fields
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    @property
+    def token(self):
+        token = self._token
+        return token.hex() if isinstance(token, bytes) else token
+
+    @token.setter
+    def token(self, value):
+        try:
+            packed = bytes.fromhex(value)
+        except (TypeError, ValueError):
+            packed = None
+        # Only pack tokens that round-trip exactly (lowercase hex)
+        self._token = packed if packed is not None and packed.hex() == value else value
+
+    def to_dict(self):
+        data = {name: getattr(self, name) for name in self.FIELDS}
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+    def __getitem__(self, key):
+        if key in self._FIELD_SET:
+            return getattr(self, key)
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self._FIELD_SET:
+            if key in self._INTERNED_FIELDS and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __contains__(self, key):
+        return key in self._FIELD_SET or bool(self._extra and key in self._extra)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return self.to_dict().keys()
+
+    def items(self):
+        return self.to_dict().items()
+
+    def __repr__(self):
+        return f"Invitee(contact_id={self.contact_id!r}, name={self.name!r}, status={self.status!r})"
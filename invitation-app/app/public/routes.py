@@ -1,10 +1,14 @@
-import time
-from collections import defaultdict
+import logging
+
 from flask import Blueprint, render_template, request, redirect, url_for
 
-from app.config import INVITATION_TEMPLATES_DIR, get_sender_profile
-from app.services import event_service, email_service
+from app.config import INVITATION_TEMPLATES_DIR, UPLOADS_DIR, RATE_LIMIT_DB, get_sender_profile
+from app.services import event_service, email_service, image_service, preview_service, read_model
+from app.utils import metrics
 from app.utils.helpers import format_date, format_time
+from app.utils.rate_limiter import TokenBucketLimiter
+
+logger = logging.getLogger(__name__)
 
 public_bp = Blueprint(
     "public", __name__,
@@ -13,29 +17,73 @@ public_bp = Blueprint(
     static_url_path="/static",
 )
 
-# Simple in-memory rate limiting
-_rate_limit = defaultdict(list)
+# Token-bucket rate limiting, shared across worker processes via SQLite
 RATE_LIMIT_WINDOW = 60  # seconds
 RATE_LIMIT_MAX = 10  # requests per window
+RATE_LIMIT_MAX_KEYS = 10000  # least-recently-seen clients beyond this are evicted
+
+_rate_limiter = TokenBucketLimiter(
+    RATE_LIMIT_DB, RATE_LIMIT_MAX, RATE_LIMIT_WINDOW, max_keys=RATE_LIMIT_MAX_KEYS,
+)
+
+# Link-preview bots (and HEAD requests) draw from their own buckets, so
+# unfurling a texted link doesn't use up the guest's allowance
+PREVIEW_RATE_LIMIT_MAX = 30  # requests per window
+
+_preview_limiter = TokenBucketLimiter(
+    RATE_LIMIT_DB, PREVIEW_RATE_LIMIT_MAX, RATE_LIMIT_WINDOW, max_keys=RATE_LIMIT_MAX_KEYS,
+)
+
+_LOOPBACK = ("127.0.0.1", "::1")
+
+
+def _client_ip():
+    """Client address, using Cloudflare's header when the request came through the tunnel.
+
+    cloudflared connects from localhost, so remote_addr is only meaningful for
+    direct connections; the header is ignored otherwise so it can't be spoofed.
+    """
+    ip = request.remote_addr
+    if ip in _LOOPBACK:
+        ip = request.headers.get("CF-Connecting-IP", ip)
+    return ip
 
 
 def _check_rate_limit(ip):
-    now = time.time()
-    _rate_limit[ip] = [t for t in _rate_limit[ip] if now - t < RATE_LIMIT_WINDOW]
-    if len(_rate_limit[ip]) >= RATE_LIMIT_MAX:
-        return False
-    _rate_limit[ip].append(now)
-    return True
+    if _rate_limiter.allow(ip):
+        return True
+    metrics.inc("rate_limit_rejections_total", limiter="rsvp")
+    return False
+
+
+def _is_preview_request():
+    return request.method == "HEAD" or preview_service.is_preview_agent(request.user_agent.string)
+
+
+def _preview_response(token=None, short_token=None):
+    """Event-level OpenGraph card for link unfurlers; never names the guest.
+
+    Anyone can claim to be a preview bot, so an unknown token gets the same
+    generic 200 card instead of a 404: the preview bucket can't be used to
+    test which tokens exist.
+    """
+    if not _preview_limiter.allow("preview:" + _client_ip()):
+        metrics.inc("rate_limit_rejections_total", limiter="preview")
+        return render_template("rate_limited.html"), 429
+    return preview_service.render_card(token=token, short_token=short_token)
 
 
 @public_bp.route("/r/<short_token>")
 def rsvp_short(short_token):
     """Short RSVP URL for SMS invitations — redirects to the full RSVP page."""
-    ip = request.remote_addr
+    if _is_preview_request():
+        return _preview_response(short_token=short_token)
+
+    ip = _client_ip()
     if not _check_rate_limit(ip):
         return render_template("rate_limited.html"), 429
 
-    event, invitee = event_service.get_event_by_short_token(short_token)
+    event, invitee = read_model.get_by_short_token(short_token)
     if not event or not invitee:
         return render_template("not_found.html"), 404
 
@@ -44,11 +92,14 @@ def rsvp_short(short_token):
 
 @public_bp.route("/rsvp/<token>")
 def rsvp_page(token):
-    ip = request.remote_addr
+    if _is_preview_request():
+        return _preview_response(token=token)
+
+    ip = _client_ip()
     if not _check_rate_limit(ip):
         return render_template("rate_limited.html"), 429
 
-    event, invitee = event_service.get_event_by_token(token)
+    event, invitee = read_model.get_by_token(token)
     if not event or not invitee:
         return render_template("not_found.html"), 404
 
@@ -58,16 +109,25 @@ def rsvp_page(token):
         tmpl_path = INVITATION_TEMPLATES_DIR / "generic_party.html"
     template_html = tmpl_path.read_text()
 
-    # Build photo URL for web display (instead of cid: used in emails)
+    # Build photo URL for web display (instead of cid: used in emails),
+    # preferring resized variants with a srcset so phones fetch a small file
     photo_url = None
+    photo_srcset = ""
     if event.get("photo"):
-        photo_url = f"/uploads/{event['photo']}"
+        photo_path = UPLOADS_DIR / event["photo"]
+        fallback = image_service.variant_filename(photo_path, "jpeg", 640)
+        if fallback:
+            photo_url = f"/img/{fallback}"
+            photo_srcset = image_service.srcset(photo_path, "/img/")
+        else:
+            photo_url = f"/uploads/{event['photo']}"
 
     # Render with event data (no RSVP link needed since they're already here)
     invitation_html = email_service.render_invitation_email(
         template_html, event, invitee,
         rsvp_url="#rsvp-form",
         photo_url=photo_url,
+        photo_srcset=photo_srcset,
         strip_wrapper=True,
     )
 
@@ -84,29 +144,29 @@ def rsvp_page(token):
 
 @public_bp.route("/rsvp/<token>/respond", methods=["POST"])
 def rsvp_respond(token):
-    ip = request.remote_addr
+    ip = _client_ip()
     if not _check_rate_limit(ip):
         return render_template("rate_limited.html"), 429
 
     status = request.form.get("status", "")
-    print(f"[RSVP] token={token[:12]}... status='{status}' form_data={dict(request.form)} content_type={request.content_type} data_len={request.content_length}")
     if status not in ("accepted", "declined", "maybe"):
-        print(f"[RSVP] Invalid status, redirecting without saving")
+        logger.info("RSVP with invalid status ignored", extra={"token": token, "requested": status[:20]})
         return redirect(url_for("public.rsvp_page", token=token))
 
     # Check current status before updating to avoid duplicate notifications
-    event, current_invitee = event_service.get_event_by_token(token)
+    event, current_invitee = read_model.get_by_token(token)
     if not event:
-        print(f"[RSVP] Event not found for token")
+        logger.info("RSVP for unknown token", extra={"token": token})
         return render_template("not_found.html"), 404
 
     old_status = current_invitee.get("status")
-    event, invitee = event_service.update_rsvp(token, status)
+    event, invitee = event_service.update_rsvp(token, status, event_id=event["id"])
     if not event:
-        print(f"[RSVP] update_rsvp returned None")
+        logger.warning("RSVP token vanished from the event file", extra={"token": token})
         return render_template("not_found.html"), 404
 
-    print(f"[RSVP] Updated: {invitee['name']} {old_status} -> {status} (event: {event['id']})")
+    logger.info("RSVP %s -> %s", old_status, status,
+                extra={"token": token, "event_id": event["id"]})
 
     # Only send admin notification if status actually changed
     if status != old_status:
@@ -120,6 +180,6 @@ def rsvp_respond(token):
                 sender_profile=profile,
             )
         except Exception:
-            pass
+            logger.exception("Admin notification failed", extra={"event_id": event["id"]})
 
     return redirect(url_for("public.rsvp_page", token=token) + "?responded=" + status)
@@ -0,0 +1,60 @@
+from app.config import CONTACT_INDEX_FILE
+from app.utils.file_lock import locked_json_write, read_json
+
+# data/contact_events.json: [{"contact": <contact id>, "events": [<event id>, ...]}]
+# Maintained by event_service so "which events is this contact on?" doesn't
+# need to open every event.
+
+
+def add(event_id, contact_ids):
+    """Record that contacts were invited to an event."""
+    contact_ids = set(contact_ids)
+    if not contact_ids:
+        return
+    with locked_json_write(CONTACT_INDEX_FILE) as entries:
+        for entry in entries:
+            if entry["contact"] in contact_ids:
+                contact_ids.discard(entry["contact"])
+                if event_id not in entry["events"]:
+                    entry["events"].append(event_id)
+        for contact_id in sorted(contact_ids):
+            entries.append({"contact": contact_id, "events": [event_id]})
+
+
+def remove(event_id, contact_ids):
+    """Forget that contacts were on an event (event deleted, guest removed)."""
+    contact_ids = set(contact_ids)
+    if not contact_ids:
+        return
+    with locked_json_write(CONTACT_INDEX_FILE) as entries:
+        for entry in entries:
+            if entry["contact"] in contact_ids and event_id in entry["events"]:
+                entry["events"].remove(event_id)
+        entries[:] = [e for e in entries if e["events"]]
+
+
+def events_for(contact_id):
+    """Ids of the events a contact is invited to, oldest invitation first."""
+    for entry in read_json(CONTACT_INDEX_FILE):
+        if entry["contact"] == contact_id:
+            return list(entry["events"])
+    return []
+
+
+def all_events():
+    """{contact id: [event ids]} for every contact on at least one event."""
+    return {entry["contact"]: entry["events"] for entry in read_json(CONTACT_INDEX_FILE)}
+
+
+def rebuild(events):
+    """Recreate the index from events that include their invitees."""
+    index = {}
+    for event in events:
+        created = event.get("created_at", "")
+        for inv in event.get("invitees", []):
+            index.setdefault(inv["contact_id"], []).append((created, event["id"]))
+    with locked_json_write(CONTACT_INDEX_FILE) as entries:
+        entries[:] = [
+            {"contact": c, "events": [event_id for _, event_id in sorted(pairs)]}
+            for c, pairs in index.items()
+        ]
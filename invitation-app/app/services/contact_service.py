@@ -1,8 +1,9 @@
 import csv
 import io
 from app.config import CONTACTS_FILE
+from app.services import event_service
 from app.utils.file_lock import locked_json_write, read_json
-from app.utils.helpers import generate_id, now_iso, sanitize
+from app.utils.helpers import generate_id, now_iso, sanitize, sanitize_many
 
 
 def get_all_contacts():
@@ -25,7 +26,7 @@ def _parse_tags(tags_input):
         raw = [t.strip() for t in tags_input.split(",")]
     else:
         raw = []
-    return [sanitize(t) for t in raw if t.strip()]
+    return sanitize_many(t for t in raw if t.strip())
 
 
 def add_contact(name, email, phone="", tags=None):
@@ -44,6 +45,8 @@ def add_contact(name, email, phone="", tags=None):
 
 
 def update_contact(contact_id, name, email, phone="", tags=None):
+    """Update a contact and the invitee copies on its upcoming events."""
+    updated = None
     with locked_json_write(CONTACTS_FILE) as contacts:
         for c in contacts:
             if c["id"] == contact_id:
@@ -51,15 +54,22 @@ def update_contact(contact_id, name, email, phone="", tags=None):
                 c["email"] = sanitize(email).lower() if email else ""
                 c["phone"] = sanitize(phone)
                 c["tags"] = _parse_tags(tags)
-                return c
-    return None
+                updated = c
+                break
+    if updated:
+        event_service.sync_contact(updated)
+    return updated
 
 
 def delete_contact(contact_id):
+    """Delete a contact and take it off its upcoming events' guest lists."""
     with locked_json_write(CONTACTS_FILE) as contacts:
         original_len = len(contacts)
         contacts[:] = [c for c in contacts if c["id"] != contact_id]
-        return len(contacts) < original_len
+        deleted = len(contacts) < original_len
+    if deleted:
+        event_service.remove_contact(contact_id)
+    return deleted
 
 
 def import_contacts_csv(csv_content):
@@ -81,11 +91,12 @@ def import_contacts_csv(csv_content):
                 skipped += 1
                 continue
             tags_str = row.get("tags", "").strip()
+            clean_name, clean_email, clean_phone = sanitize_many((name, email, phone))
             contacts.append({
                 "id": generate_id(),
-                "name": sanitize(name),
-                "email": sanitize(email),
-                "phone": sanitize(phone),
+                "name": clean_name,
+                "email": clean_email,
+                "phone": clean_phone,
                 "tags": _parse_tags(tags_str),
                 "created_at": now_iso(),
             })
@@ -1,21 +1,78 @@
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.image import MIMEImage
+import logging
 from pathlib import Path
 
-from app.config import GMAIL_ADDRESS, GMAIL_APP_PASSWORD, ADMIN_EMAIL, PUBLIC_DOMAIN, UPLOADS_DIR, ADMIN_PORT, ADMIN_HOST
+from app.config import (
+    GMAIL_ADDRESS, GMAIL_APP_PASSWORD, SMTP_HOST, SMTP_PORT, ADMIN_EMAIL, PUBLIC_DOMAIN, UPLOADS_DIR, ADMIN_PORT, ADMIN_HOST,
+    TEMPLATE_IMAGES_DIR,
+    SMTP_CONNECT_TIMEOUT, SMTP_SEND_TIMEOUT, BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT,
+)
+from app.utils import metrics
+from app.utils.circuit_breaker import get_breaker
 
+logger = logging.getLogger(__name__)
 
-def _create_smtp(gmail_address=None, gmail_password=None):
-    server = smtplib.SMTP("smtp.gmail.com", 587)
+
+def _is_smtp_outage(exc):
+    """Connection-level SMTP errors count against the breaker; rejected messages don't."""
+    import smtplib
+
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return exc.smtp_code == 421
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return False
+    return isinstance(exc, OSError)
+
+
+def smtp_breaker(gmail_address=None):
+    """Circuit breaker for one Gmail account."""
+    return get_breaker(
+        f"Gmail ({gmail_address or GMAIL_ADDRESS})",
+        failure_threshold=BREAKER_FAILURE_THRESHOLD,
+        reset_timeout=BREAKER_RESET_TIMEOUT,
+        is_failure=_is_smtp_outage,
+    )
+
+
+def _create_smtp(gmail_address=None, gmail_password=None, host=None, port=None):
+    # smtplib and the MIME classes load on first send; most public workers never send
+    import smtplib
+
+    server = smtplib.SMTP(host or SMTP_HOST, port or SMTP_PORT, timeout=SMTP_CONNECT_TIMEOUT)
     server.starttls()
     server.login(gmail_address or GMAIL_ADDRESS, gmail_password or GMAIL_APP_PASSWORD)
+    # Connect/handshake use the short timeout; the message upload gets longer.
+    server.sock.settimeout(SMTP_SEND_TIMEOUT)
     return server
 
 
+def _send_message(from_addr, to_addr, msg, sender_profile=None):
+    """Deliver a message over SMTP through the sending account's circuit breaker."""
+    address = sender_profile["gmail_address"] if sender_profile else GMAIL_ADDRESS
+    with smtp_breaker(address).guard():
+        with metrics.timer("smtp_connect_duration_seconds"):
+            if sender_profile:
+                server = _create_smtp(
+                    sender_profile["gmail_address"], sender_profile["gmail_password"],
+                    sender_profile.get("smtp_host"), sender_profile.get("smtp_port"),
+                )
+            else:
+                server = _create_smtp()
+        try:
+            with metrics.timer("smtp_send_duration_seconds"):
+                server.sendmail(from_addr, to_addr, msg.as_string())
+        finally:
+            try:
+                server.quit()
+            except OSError:
+                server.close()
+
+
 def send_invitation(to_email, to_name, subject, html_content, photo_filename=None, sender_profile=None):
     """Send an HTML invitation email."""
+    from email.mime.image import MIMEImage
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
     from_addr = sender_profile["gmail_address"] if sender_profile else GMAIL_ADDRESS
 
     msg = MIMEMultipart("alternative")
@@ -31,9 +88,10 @@ def send_invitation(to_email, to_name, subject, html_content, photo_filename=Non
     msg.attach(MIMEText(text_content, "plain"))
     msg.attach(MIMEText(html_content, "html"))
 
-    # Attach photo as inline image if present
+    # Attach photo as inline image if present (the email-sized copy when one exists)
     if photo_filename:
-        photo_path = UPLOADS_DIR / photo_filename
+        from app.services.image_service import email_photo_path
+        photo_path = email_photo_path(UPLOADS_DIR / photo_filename)
         if photo_path.exists():
             with open(photo_path, "rb") as f:
                 img = MIMEImage(f.read())
@@ -41,18 +99,14 @@ def send_invitation(to_email, to_name, subject, html_content, photo_filename=Non
                 img.add_header("Content-Disposition", "inline", filename=photo_filename)
                 msg.attach(img)
 
-    if sender_profile:
-        server = _create_smtp(sender_profile["gmail_address"], sender_profile["gmail_password"])
-    else:
-        server = _create_smtp()
-    try:
-        server.sendmail(from_addr, to_email, msg.as_string())
-    finally:
-        server.quit()
+    _send_message(from_addr, to_email, msg, sender_profile)
 
 
 def send_admin_notification(invitee_name, event_title, new_status, event_id, sender_profile=None):
     """Send an RSVP notification to the event's sender email."""
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
     from_addr = sender_profile["gmail_address"] if sender_profile else GMAIL_ADDRESS
     to_addr = sender_profile["gmail_address"] if sender_profile else ADMIN_EMAIL
 
@@ -81,20 +135,16 @@ def send_admin_notification(invitee_name, event_title, new_status, event_id, sen
     msg.attach(MIMEText(html, "html"))
 
     try:
-        if sender_profile:
-            server = _create_smtp(sender_profile["gmail_address"], sender_profile["gmail_password"])
-        else:
-            server = _create_smtp()
-        try:
-            server.sendmail(from_addr, to_addr, msg.as_string())
-        finally:
-            server.quit()
+        _send_message(from_addr, to_addr, msg, sender_profile)
     except Exception as e:
-        print(f"Failed to send admin notification: {e}")
+        logger.warning("Failed to send admin notification: %s", e, extra={"event_id": event_id})
 
 
 def send_reminder_email(to_email, to_name, event, days_remaining, rsvp_url, sender_profile=None):
     """Send a reminder email for an upcoming event."""
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
     from app.utils.helpers import format_date, format_time
 
     from_addr = sender_profile["gmail_address"] if sender_profile else GMAIL_ADDRESS
@@ -152,27 +202,22 @@ def send_reminder_email(to_email, to_name, event, days_remaining, rsvp_url, send
     msg.attach(MIMEText(plain, "plain"))
     msg.attach(MIMEText(html, "html"))
 
-    if sender_profile:
-        server = _create_smtp(sender_profile["gmail_address"], sender_profile["gmail_password"])
-    else:
-        server = _create_smtp()
-    try:
-        server.sendmail(from_addr, to_email, msg.as_string())
-    finally:
-        server.quit()
+    _send_message(from_addr, to_email, msg, sender_profile)
 
 
-def render_invitation_email(template_html, event, invitee, rsvp_url, photo_url=None, strip_wrapper=False):
+def render_invitation_email(template_html, event, invitee, rsvp_url, photo_url=None, strip_wrapper=False, photo_srcset=""):
     """Render an invitation template with event data.
 
     Args:
         photo_url: If provided, used as the photo src (for web display).
                    If None, defaults to cid:event_photo (for inline email).
+        photo_srcset: Responsive srcset for the photo (web display only).
         strip_wrapper: If True, strips <html>/<head>/<body> tags for embedding
                        in a web page, and extracts the body background style.
     """
     import re
     from urllib.parse import quote
+    from app.services import image_service
     from app.utils.helpers import format_date, format_time
 
     location = event["location"] or ""
@@ -201,11 +246,11 @@ def render_invitation_email(template_html, event, invitee, rsvp_url, photo_url=N
         html = html.replace(placeholder, value or "")
 
     # Handle template images (e.g. background images): {{template_image:filename.png}}
-    for match in re.findall(r'\{\{template_image:([^}]+)\}\}', html):
-        if strip_wrapper:
-            url = f"/template-images/{match}"
-        else:
-            url = f"https://{PUBLIC_DOMAIN}/template-images/{match}"
+    # Prefer the resized, content-hashed variant (long-lived cache) over the original.
+    for match in set(re.findall(r'\{\{template_image:([^}]+)\}\}', html)):
+        variant = image_service.variant_filename(TEMPLATE_IMAGES_DIR / match)
+        path = f"/img/{variant}" if variant else f"/template-images/{match}"
+        url = path if strip_wrapper else f"https://{PUBLIC_DOMAIN}{path}"
         html = html.replace(f"{{{{template_image:{match}}}}}", url)
 
     # Handle show_host toggle
@@ -229,9 +274,11 @@ def render_invitation_email(template_html, event, invitee, rsvp_url, photo_url=N
     if event.get("photo"):
         src = photo_url if photo_url else "cid:event_photo"
         html = html.replace("{{photo_url}}", src)
+        html = html.replace("{{photo_srcset}}", photo_srcset if photo_url else "")
         html = html.replace("{{photo_display}}", "block")
     else:
         html = html.replace("{{photo_url}}", "")
+        html = html.replace("{{photo_srcset}}", "")
         html = html.replace("{{photo_display}}", "none")
 
     if strip_wrapper:
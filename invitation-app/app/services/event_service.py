@@ -1,66 +1,189 @@
+from datetime import date
 from pathlib import Path
 from app.config import EVENTS_DIR
+from app.models import Invitee
+from app.services import contact_index, invitee_index, read_model, upload_store
 from app.utils.file_lock import write_json, read_json
-from app.utils.helpers import generate_id, generate_token, generate_short_token, now_iso, sanitize
+from app.utils.helpers import generate_id, generate_token, generate_short_token, derive_short_token, now_iso, sanitize
+from app.utils.record_log import RecordLog
+
+# Bump when the event document layout changes, and teach _normalize_event
+# (and so `python admin_server.py migrate`) how to upgrade older files.
+#   1: invitees inline in <id>.json
+#   2: <id>.json holds event metadata only; invitees live in
+#      <id>.invitees.jsonl, one line appended per change
+SCHEMA_VERSION = 2
 
 
 def _event_path(event_id):
     return EVENTS_DIR / f"{event_id}.json"
 
 
+def _invitee_log(event_id):
+    return RecordLog(EVENTS_DIR / f"{event_id}.invitees.jsonl", key="contact_id")
+
+
+def _write_header(event):
+    """Write an event's metadata file (everything except the invitee list)."""
+    header = {k: v for k, v in event.items() if k != "invitees"}
+    header["schema_version"] = SCHEMA_VERSION
+    write_json(_event_path(event["id"]), header)
+
+
+def rebuild_read_model():
+    """Repopulate the public read model from the event files."""
+    read_model.rebuild(_iter_events())
+
+
+def rebuild_contact_index():
+    """Repopulate the contact -> events index from the event files."""
+    contact_index.rebuild(_iter_events())
+
+
+def _new_invitee(contact):
+    return Invitee(
+        contact_id=contact["id"],
+        name=contact["name"],
+        email=contact["email"],
+        phone=contact.get("phone", ""),
+        token=generate_token(),
+        short_token=generate_short_token(),
+        send_method=contact.get("send_method", "email"),
+        status="pending",
+    )
+
+
+def _load_invitees(records):
+    return [Invitee.from_dict(r) for r in records]
+
+
 def _normalize_invitee(inv):
-    """Ensure an invitee dict has all current fields (backward compat)."""
-    inv.setdefault("phone", "")
-    inv.setdefault("short_token", generate_short_token())
-    inv.setdefault("send_method", "email")
-    inv.setdefault("sms_sent_at", None)
+    """Upgrade an invitee dict from an older document.
+
+    Fields that are simply missing get their defaults from Invitee.
+    """
+    if not inv.get("short_token"):
+        inv["short_token"] = derive_short_token(inv["token"])
     # Migrate old sent_at → email_sent_at
     if "sent_at" in inv:
         inv.setdefault("email_sent_at", inv.pop("sent_at"))
-    else:
-        inv.setdefault("email_sent_at", None)
     return inv
 
 
 def _normalize_event(event):
-    """Normalize all invitees in an event for backward compat."""
-    for inv in event.get("invitees", []):
-        _normalize_invitee(inv)
+    """Upgrade an older, single-file event document in memory.
+
+    The result still has its invitees inline; _split_event moves them into
+    the invitee log.
+    """
+    event.setdefault("sender_profile", "primary")
+    event.setdefault("show_host", True)
+    event.setdefault("location_url", "")
+    event["invitees"] = _load_invitees(_normalize_invitee(inv) for inv in event.get("invitees", []))
+    return event
+
+
+def _split_event(event):
+    """Store an upgraded single-file event in the current layout.
+
+    The log is written before the header, so a crash in between leaves the
+    old document in place to be split again. Both happen under the log's
+    lock, after checking the file on disk is still unsplit: another process
+    that read the same old document may have split it already and appended
+    to the log since. Returns False in that case, without writing.
+    """
+    path = _event_path(event["id"])
+    with _invitee_log(event["id"]).exclusive() as rewrite:
+        if path.exists() and read_json(path).get("schema_version") == SCHEMA_VERSION:
+            return False
+        rewrite([inv.to_dict() for inv in event.get("invitees", [])])
+        _write_header(event)
+    return True
+
+
+def _read_event(path, include_invitees=True):
+    event = read_json(path)
+    if event.get("schema_version") != SCHEMA_VERSION:
+        # Not migrated yet: invitees are still inline
+        event = _normalize_event(event)
+        if not include_invitees:
+            del event["invitees"]
+        return event
+    if include_invitees:
+        event["invitees"] = _load_invitees(_invitee_log(event["id"]).all())
     return event
 
 
-def get_all_events():
+def _header(event_id):
+    """Current-layout metadata for an event about to be modified, or None.
+
+    Events not migrated yet are split on their first write.
+    """
+    path = _event_path(event_id)
+    if not path.exists():
+        return None
+    event = read_json(path)
+    if event.get("schema_version") != SCHEMA_VERSION:
+        event = _normalize_event(event)
+        if not _split_event(event):
+            return read_json(path)
+        del event["invitees"]
+        event["schema_version"] = SCHEMA_VERSION
+    return event
+
+
+def migrate_events():
+    """Rewrite every event file that is older than SCHEMA_VERSION.
+
+    Meant to run offline (servers stopped). Returns (migrated, total).
+    """
+    migrated = total = 0
+    for f in sorted(EVENTS_DIR.glob("*.json")):
+        total += 1
+        event = read_json(f)
+        if event.get("schema_version") == SCHEMA_VERSION:
+            continue
+        if _split_event(_normalize_event(event)):
+            migrated += 1
+    rebuild_read_model()
+    rebuild_contact_index()
+    return migrated, total
+
+
+def _last_modified(path):
+    """Latest change to an event's header or invitee log."""
+    log = path.with_name(path.stem + ".invitees.jsonl")
+    mtimes = [path.stat().st_mtime]
+    if log.exists():
+        mtimes.append(log.stat().st_mtime)
+    return max(mtimes)
+
+
+def _iter_events(include_invitees=True):
+    """Every event, one at a time (for rebuilds that mustn't hold them all)."""
+    for f in EVENTS_DIR.glob("*.json"):
+        yield _read_event(f, include_invitees)
+
+
+def get_all_events(include_invitees=True):
     events = []
-    for f in sorted(EVENTS_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True):
-        events.append(_normalize_event(read_json(f)))
+    for f in sorted(EVENTS_DIR.glob("*.json"), key=_last_modified, reverse=True):
+        events.append(_read_event(f, include_invitees))
     return events
 
 
-def get_event(event_id):
+def get_event(event_id, include_invitees=True):
+    """Load an event. With include_invitees=False only the small metadata
+    file is read, for pages that don't need the guest list."""
     path = _event_path(event_id)
     if not path.exists():
         return None
-    return _normalize_event(read_json(path))
+    return _read_event(path, include_invitees)
 
 
 def create_event(title, host, date, time, location, message, template, photo=None, contacts=None, sender_profile="primary", show_host=True, location_url=""):
     event_id = generate_id()
-    invitees = []
-    if contacts:
-        for c in contacts:
-            invitees.append({
-                "contact_id": c["id"],
-                "name": c["name"],
-                "email": c["email"],
-                "phone": c.get("phone", ""),
-                "token": generate_token(),
-                "short_token": generate_short_token(),
-                "send_method": c.get("send_method", "email"),
-                "status": "pending",
-                "responded_at": None,
-                "email_sent_at": None,
-                "sms_sent_at": None,
-            })
+    invitees = [_new_invitee(c) for c in contacts or []]
 
     event = {
         "id": event_id,
@@ -76,28 +199,43 @@ def create_event(title, host, date, time, location, message, template, photo=Non
         "show_host": show_host,
         "location_url": location_url,
         "created_at": now_iso(),
+        "schema_version": SCHEMA_VERSION,
         "invitees": invitees,
     }
-    write_json(_event_path(event_id), event)
+    _split_event(event)
+    read_model.publish_event(event)
+    contact_index.add(event_id, [inv.contact_id for inv in invitees])
+    if photo:
+        upload_store.add_ref(photo, event_id)
     return event
 
 
 def delete_event(event_id):
-    """Delete an event by removing its JSON file."""
+    """Delete an event's files, releasing its photo."""
     path = _event_path(event_id)
     if path.exists():
+        event = _read_event(path)
+        photo = event.get("photo")
         path.unlink()
+        _invitee_log(event_id).delete()
+        read_model.remove_event(event_id)
+        invitee_index.forget(event_id)
+        contact_index.remove(event_id, [inv.contact_id for inv in event["invitees"]])
+        if photo:
+            upload_store.release(photo, event_id)
         return True
     return False
 
 
 def update_event(event_id, **kwargs):
-    event = get_event(event_id)
+    """Update event metadata. Returns the event without its invitees."""
+    event = _header(event_id)
     if not event:
         return None
     for key in ("title", "host", "date", "time", "location", "message", "template"):
         if key in kwargs:
             event[key] = sanitize(kwargs[key])
+    old_photo = event.get("photo")
     if "photo" in kwargs:
         event["photo"] = kwargs["photo"]
     if "sender_profile" in kwargs:
@@ -106,107 +244,226 @@ def update_event(event_id, **kwargs):
         event["show_host"] = kwargs["show_host"]
     if "location_url" in kwargs:
         event["location_url"] = kwargs["location_url"]
-    write_json(_event_path(event_id), event)
+    _write_header(event)
+    read_model.publish_event(event)
+    if event.get("photo") != old_photo:
+        if event.get("photo"):
+            upload_store.add_ref(event["photo"], event_id)
+        if old_photo:
+            upload_store.release(old_photo, event_id)
     return event
 
 
 def add_invitees(event_id, contacts):
-    event = get_event(event_id)
-    if not event:
+    """Append contacts not yet invited. Returns the added invitees."""
+    if not _header(event_id):
         return None
-    existing_ids = {inv["contact_id"] for inv in event["invitees"]}
+    log = _invitee_log(event_id)
+    existing_ids = set(log.keys())
+    added = []
     for c in contacts:
         if c["id"] not in existing_ids:
-            event["invitees"].append({
-                "contact_id": c["id"],
-                "name": c["name"],
-                "email": c["email"],
-                "phone": c.get("phone", ""),
-                "token": generate_token(),
-                "short_token": generate_short_token(),
-                "send_method": c.get("send_method", "email"),
-                "status": "pending",
-                "responded_at": None,
-                "email_sent_at": None,
-                "sms_sent_at": None,
-            })
-    write_json(_event_path(event_id), event)
-    return event
+            existing_ids.add(c["id"])
+            added.append(_new_invitee(c))
+    log.append([inv.to_dict() for inv in added])
+    read_model.publish_invitees(event_id, added)
+    contact_index.add(event_id, [inv.contact_id for inv in added])
+    return added
 
 
-def mark_email_sent(event_id, contact_id):
-    event = get_event(event_id)
-    if not event:
-        return
-    for inv in event["invitees"]:
-        if inv["contact_id"] == contact_id:
-            inv["email_sent_at"] = now_iso()
-            break
-    write_json(_event_path(event_id), event)
+def _update_invitee(event_id, contact_id, change):
+    """Apply change() to one invitee and append it to the log."""
+    if not _header(event_id):
+        return None
+    record = _invitee_log(event_id).update(contact_id, change)
+    return Invitee.from_dict(record) if record else None
+
+
+def mark_email_sent(event_id, contact_id, sender_profile=None):
+    """Record that the email went out, and which sender profile delivered it."""
+    def change(inv):
+        inv["email_sent_at"] = now_iso()
+        if sender_profile:
+            inv["email_sent_via"] = sender_profile
+    # Send timestamps aren't published to the read model
+    _update_invitee(event_id, contact_id, change)
+
+
+def mark_sms_sent(event_id, contact_id, sender_profile=None):
+    """Record that the SMS went out, and which sender profile delivered it."""
+    def change(inv):
+        inv["sms_sent_at"] = now_iso()
+        if sender_profile:
+            inv["sms_sent_via"] = sender_profile
+    _update_invitee(event_id, contact_id, change)
+
+
+def _set_status(event_id, contact_id, status):
+    def change(inv):
+        inv["status"] = status
+        inv["responded_at"] = now_iso()
+    inv = _update_invitee(event_id, contact_id, change)
+    if inv:
+        read_model.publish_invitees(event_id, [inv])
+    return inv
 
 
-def mark_sms_sent(event_id, contact_id):
-    event = get_event(event_id)
-    if not event:
-        return
-    for inv in event["invitees"]:
-        if inv["contact_id"] == contact_id:
-            inv["sms_sent_at"] = now_iso()
-            break
-    write_json(_event_path(event_id), event)
+def _find_invitee(field, value, event_id=None):
+    """(event id, invitee) for the invitee whose field equals value."""
+    if event_id:
+        event_ids = [event_id]
+    else:
+        event_ids = [f.stem for f in EVENTS_DIR.glob("*.json")]
+    for eid in event_ids:
+        event = get_event(eid)
+        for inv in (event or {}).get("invitees", []):
+            if inv.get(field) == value:
+                return eid, inv
+    return None, None
 
 
-def update_rsvp(token, status):
-    """Find an invitee by token across all events and update their status.
-    Returns (event, invitee) or (None, None)."""
+def update_rsvp(token, status, event_id=None):
+    """Find an invitee by token and update their status.
+    Pass event_id (e.g. from the read model) to skip the scan.
+    Returns (event metadata without invitees, invitee) or (None, None)."""
     if status not in ("accepted", "declined", "maybe"):
         return None, None
 
-    for f in EVENTS_DIR.glob("*.json"):
-        event = _normalize_event(read_json(f))
-        for inv in event.get("invitees", []):
-            if inv["token"] == token:
-                inv["status"] = status
-                inv["responded_at"] = now_iso()
-                write_json(f, event)
-                return event, inv
-    return None, None
+    event_id, inv = _find_invitee("token", token, event_id)
+    if not inv:
+        return None, None
+    inv = _set_status(event_id, inv["contact_id"], status)
+    if not inv:
+        return None, None
+    return get_event(event_id, include_invitees=False), inv
 
 
 def get_event_by_token(token):
     """Find the event and invitee for a given RSVP token."""
-    for f in EVENTS_DIR.glob("*.json"):
-        event = _normalize_event(read_json(f))
-        for inv in event.get("invitees", []):
-            if inv["token"] == token:
-                return event, inv
-    return None, None
+    event_id, inv = _find_invitee("token", token)
+    return (get_event(event_id), inv) if inv else (None, None)
 
 
 def get_event_by_short_token(short_token):
     """Find the event and invitee for a given short RSVP token (SMS links)."""
-    for f in EVENTS_DIR.glob("*.json"):
-        event = _normalize_event(read_json(f))
-        for inv in event.get("invitees", []):
-            if inv.get("short_token") == short_token:
-                return event, inv
-    return None, None
+    event_id, inv = _find_invitee("short_token", short_token)
+    return (get_event(event_id), inv) if inv else (None, None)
 
 
 def update_invitee_status(event_id, contact_id, status):
     """Manually update an invitee's status (admin action)."""
     if status not in ("accepted", "declined", "maybe", "pending"):
         return False
-    event = get_event(event_id)
-    if not event:
-        return False
-    for inv in event["invitees"]:
-        if inv["contact_id"] == contact_id:
-            inv["status"] = status
-            inv["responded_at"] = now_iso()
-            write_json(_event_path(event_id), event)
-            return True
-    return False
+    return _set_status(event_id, contact_id, status) is not None
+
+
+def _is_upcoming(event):
+    try:
+        return date.fromisoformat(event["date"]) >= date.today()
+    except (KeyError, TypeError, ValueError):
+        return True  # no usable date: treat as still to come
+
+
+def _get_invitee(event_id, contact_id):
+    log = _invitee_log(event_id)
+    if log.exists():
+        record = log.get(contact_id)
+        return Invitee.from_dict(record) if record else None
+    # Not migrated yet: invitees are still inline
+    event = get_event(event_id) or {"invitees": []}
+    return next((inv for inv in event["invitees"] if inv.contact_id == contact_id), None)
+
+
+def get_contact_histories(contact_ids=None):
+    """{contact id: [(event, invitee), ...]} newest event first.
+
+    Uses the contact index, so only events with one of the contacts on them
+    are opened, each once. contact_ids=None covers every contact.
+    """
+    wanted = None if contact_ids is None else set(contact_ids)
+    events = {}
+    histories = {}
+    for contact_id, event_ids in contact_index.all_events().items():
+        if wanted is not None and contact_id not in wanted:
+            continue
+        history = []
+        for event_id in event_ids:
+            if event_id not in events:
+                events[event_id] = get_event(event_id, include_invitees=False)
+            inv = _get_invitee(event_id, contact_id) if events[event_id] else None
+            if inv:
+                history.append((events[event_id], inv))
+        history.sort(key=lambda pair: pair[0].get("date", ""), reverse=True)
+        histories[contact_id] = history
+    return histories
+
+
+def get_contact_history(contact_id):
+    """Events a contact is invited to, newest first, as (event, invitee) pairs."""
+    return get_contact_histories([contact_id]).get(contact_id, [])
+
+
+def sync_contact(contact):
+    """Copy a contact's edited name, email and phone to its upcoming events.
+
+    Past events keep the details they were sent with. Returns the number of
+    events updated.
+    """
+    def change(inv):
+        inv["name"] = contact["name"]
+        inv["email"] = contact["email"]
+        inv["phone"] = contact.get("phone", "")
+
+    updated = 0
+    for event_id in contact_index.events_for(contact["id"]):
+        event = get_event(event_id, include_invitees=False)
+        if not event or not _is_upcoming(event):
+            continue
+        inv = _update_invitee(event_id, contact["id"], change)
+        if inv:
+            read_model.publish_invitees(event_id, [inv])
+            updated += 1
+    return updated
+
+
+def remove_contact(contact_id):
+    """Take a deleted contact off the guest list of its upcoming events.
+
+    Past events keep the invitee as history. Returns the number of events
+    changed.
+    """
+    removed = 0
+    for event_id in contact_index.events_for(contact_id):
+        event = get_event(event_id, include_invitees=False)
+        if not event or not _is_upcoming(event) or not _header(event_id):
+            continue
+        record = _invitee_log(event_id).remove(contact_id)
+        if record:
+            read_model.remove_invitees([record["token"]])
+            contact_index.remove(event_id, [contact_id])
+            removed += 1
+    return removed
+
+
+def get_invitee_index(event_id):
+    """Filterable index of an event's invitees, or None if there's no such event.
+
+    Cached per process and rebuilt only after the invitee log changes (any
+    write appends to it, compaction replaces it), so the event page and its
+    API can filter and page large guest lists cheaply.
+    """
+    path = _event_path(event_id)
+    log = _invitee_log(event_id).path
+    try:
+        st = log.stat()
+    except FileNotFoundError:
+        # Not migrated yet: the invitees are still inside the event file
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+    stamp = (st.st_ino, st.st_size, st.st_mtime_ns)
+    return invitee_index.get(event_id, stamp, lambda: (get_event(event_id) or {"invitees": []})["invitees"])
 
 
 def get_event_stats(event):
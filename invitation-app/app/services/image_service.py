@@ -0,0 +1,231 @@
+import glob
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from app.config import IMAGE_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (320, 640, 1280)
+VARIANT_FORMATS = {
+    # format -> (file extension, Pillow save options)
+    "webp": ("webp", {"quality": 80, "method": 4}),
+    "jpeg": ("jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+# Width used where only one URL fits (CSS backgrounds, <img src> fallbacks)
+DEFAULT_WIDTH = 1280
+
+# Longest edge of the copy attached to invitation emails (shown at <=250 CSS px)
+EMAIL_PHOTO_MAX = 800
+EMAIL_SUFFIX = ".email.jpg"
+
+_RESAVE_OPTIONS = {
+    "JPEG": {"quality": 90, "optimize": True, "progressive": True},
+    "PNG": {"optimize": True},
+    "WEBP": {"quality": 90},
+}
+
+# Image info that normalize_upload keeps; everything else is metadata
+_KEEP_INFO = ("transparency", "icc_profile")
+
+_manifests = {}  # (path, mtime, size) -> {(fmt, width): filename}
+_lock = threading.Lock()
+
+
+def _content_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()[:12]
+
+
+def _variant_name(stem, digest, width, fmt):
+    ext = VARIANT_FORMATS[fmt][0]
+    return f"{stem}-{digest}-{width}.{ext}"
+
+
+def generate_variants(src_path):
+    """Create resized WebP/JPEG variants of an image in the image cache.
+
+    Variant filenames embed a hash of the source bytes, so they can be served
+    with immutable caching and a changed image always gets new URLs. Widths
+    larger than the original are skipped (the original width is used
+    instead). Returns {(format, width): filename}, or {} if the file is
+    missing or not an image.
+    """
+    src_path = Path(src_path)
+    try:
+        st = src_path.stat()
+    except OSError:
+        return {}
+    key = (str(src_path), st.st_mtime_ns, st.st_size)
+    with _lock:
+        manifest = _manifests.get(key)
+    if manifest is not None:
+        return manifest
+
+    digest = _content_hash(src_path)
+    manifest = _cached_manifest(src_path.stem, digest)
+    if manifest is not None:
+        with _lock:
+            _manifests[key] = manifest
+        return manifest
+
+    from PIL import Image, ImageOps
+
+    manifest = {}
+    try:
+        with Image.open(src_path) as im:
+            im = ImageOps.exif_transpose(im)
+            # Largest first, so _cached_manifest can trust the largest width it finds
+            widths = sorted({min(w, im.width) for w in VARIANT_WIDTHS}, reverse=True)
+            for width in widths:
+                resized = None
+                for fmt, (_, options) in VARIANT_FORMATS.items():
+                    name = _variant_name(src_path.stem, digest, width, fmt)
+                    manifest[(fmt, width)] = name
+                    out = IMAGE_CACHE_DIR / name
+                    if out.exists():
+                        continue
+                    if resized is None:
+                        height = max(round(im.height * width / im.width), 1)
+                        resized = _to_rgb(im).resize((width, height), Image.LANCZOS)
+                    _save_atomic(resized, out, fmt.upper(), options)
+    except (OSError, Image.DecompressionBombError) as e:
+        logger.warning("Could not build variants for %s: %s", src_path.name, e)
+        return {}
+
+    with _lock:
+        _manifests[key] = manifest
+    return manifest
+
+
+def _save_atomic(im, out, fmt, options):
+    """Save to a private temporary file, then rename it into place.
+
+    Every worker warms the cache at startup, so several may build the same
+    variant at once; each writes its own file and the last rename wins.
+    """
+    IMAGE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=IMAGE_CACHE_DIR, prefix=f".{out.name}.", suffix=".tmp")
+    try:
+        os.fchmod(fd, 0o644)  # mkstemp's 0600 would hide variants from a separate static server
+        with os.fdopen(fd, "wb") as f:
+            im.save(f, format=fmt, **options)
+        os.replace(tmp, out)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _cached_manifest(stem, digest):
+    """The manifest of a complete set of variants already in the cache, else None.
+
+    Lets a freshly started worker skip decoding the image. The largest
+    variant present is the width the image was capped at, and every smaller
+    width must be there in every format.
+    """
+    prefix = f"{stem}-{digest}-"
+    existing = {path.name for path in IMAGE_CACHE_DIR.glob(glob.escape(prefix) + "*")}
+    widths = {int(width) for width, _, _ in (name[len(prefix):].partition(".") for name in existing)
+              if width.isdigit()}
+    if not widths:
+        return None
+    top = max(widths)
+    manifest = {(fmt, width): _variant_name(stem, digest, width, fmt)
+                for width in {min(w, top) for w in VARIANT_WIDTHS} for fmt in VARIANT_FORMATS}
+    return manifest if set(manifest.values()) <= existing else None
+
+
+def variant_filename(src_path, fmt="jpeg", width=DEFAULT_WIDTH):
+    """Filename of the closest variant at or below width, or None."""
+    manifest = generate_variants(src_path)
+    widths = sorted(w for f, w in manifest if f == fmt)
+    if not widths:
+        return None
+    fitting = [w for w in widths if w <= width]
+    return manifest[(fmt, fitting[-1] if fitting else widths[0])]
+
+
+def srcset(src_path, url_prefix, fmt="webp"):
+    """srcset attribute value listing every variant of an image in one format."""
+    manifest = generate_variants(src_path)
+    return ", ".join(
+        f"{url_prefix}{name} {width}w"
+        for (f, width), name in sorted(manifest.items(), key=lambda item: item[0][1])
+        if f == fmt
+    )
+
+
+def _to_rgb(im):
+    """Convert to RGB, flattening any transparency onto white."""
+    from PIL import Image
+
+    if im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info):
+        im = im.convert("RGBA")
+        background = Image.new("RGB", im.size, (255, 255, 255))
+        background.paste(im, mask=im.getchannel("A"))
+        return background
+    return im.convert("RGB")
+
+
+def email_photo_path(src_path):
+    """Path of the email-sized copy of an upload, falling back to the original."""
+    src_path = Path(src_path)
+    derivative = src_path.with_name(src_path.stem + EMAIL_SUFFIX)
+    return derivative if derivative.exists() else src_path
+
+
+def normalize_upload(path, target=None):
+    """Prepare a freshly saved upload for serving and emailing.
+
+    Applies the EXIF orientation to the pixels, re-saves the image without
+    metadata (camera model, GPS, ...), and writes a small JPEG for
+    send_invitation to attach. Animated GIFs are left untouched. path is
+    rewritten in place; the email copy is named after target, the name the
+    upload will be served under (default: path). Returns a dict of byte
+    sizes: {"original", "normalized", "email"}.
+    """
+    from PIL import Image, ImageOps
+
+    path = Path(path)
+    target = Path(target or path)
+    sizes = {"original": path.stat().st_size}
+    try:
+        with Image.open(path) as im:
+            if getattr(im, "is_animated", False) and im.format == "GIF":
+                sizes["normalized"] = sizes["email"] = sizes["original"]
+                return sizes
+            # Many phone cameras write multi-picture JPEGs, which Pillow opens as MPO
+            fmt = "JPEG" if im.format == "MPO" else im.format
+            im = ImageOps.exif_transpose(im)
+            clean = im.convert("RGB") if fmt == "JPEG" and im.mode not in ("RGB", "L") else im.copy()
+            # Pillow writes some of these (comments, ...) back out on save
+            clean.info = {k: v for k, v in clean.info.items() if k in _KEEP_INFO}
+            tmp = path.with_suffix(path.suffix + ".tmp")
+            clean.save(tmp, format=fmt, **_RESAVE_OPTIONS.get(fmt, {}))
+            tmp.replace(path)
+            small = _to_rgb(im)
+            small.thumbnail((EMAIL_PHOTO_MAX, EMAIL_PHOTO_MAX), Image.LANCZOS)
+            email_path = target.with_name(target.stem + EMAIL_SUFFIX)
+            small.save(email_path, format="JPEG", quality=82, optimize=True, progressive=True)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        logger.warning("Could not normalize %s: %s", path.name, e)
+        sizes["normalized"] = sizes["email"] = sizes["original"]
+        return sizes
+    sizes["normalized"] = path.stat().st_size
+    sizes["email"] = email_path.stat().st_size
+    return sizes
+
+
+def warm(directory):
+    """Pre-build variants for every image in a directory (e.g. at startup)."""
+    for path in sorted(Path(directory).glob("*")):
+        if path.suffix.lower() in (".png", ".jpg", ".jpeg", ".webp", ".gif"):
+            generate_variants(path)
@@ -0,0 +1,126 @@
+import threading
+from collections import OrderedDict
+
+# In-memory index of one event's invitees for the admin's event page and its
+# JSON API: row numbers grouped by status and channel, send state, lowercased
+# names for search, and the counts the page shows. event_service builds one
+# per event and keeps it until the event's invitee log changes on disk, so
+# paging and filtering a large guest list doesn't re-read or re-scan it.
+
+STATUSES = ("pending", "accepted", "declined", "maybe")
+CHANNELS = ("email", "sms")
+SENT_STATES = ("sent", "unsent")
+
+MAX_CACHED = 16  # events whose index is kept per process
+
+# Fields sent to the browser; tokens stay on the server
+ROW_FIELDS = (
+    "contact_id", "name", "email", "phone", "send_method", "status", "responded_at",
+    "email_sent_at", "sms_sent_at", "email_sent_via", "sms_sent_via",
+)
+
+_cache = OrderedDict()  # event id -> (stamp, InviteeIndex)
+_lock = threading.Lock()
+
+
+class InviteeIndex:
+    """Filter and page one event's invitees without scanning all of them."""
+
+    def __init__(self, invitees):
+        self.rows = list(invitees)
+        self.names = [(inv["name"] or "").lower() for inv in self.rows]
+        self.by_status = {status: [] for status in STATUSES}
+        self.by_channel = {channel: [] for channel in CHANNELS}
+        self.sent = {channel: set() for channel in CHANNELS}
+        for n, inv in enumerate(self.rows):
+            self.by_status.setdefault(inv["status"], []).append(n)
+            if inv.get("email"):
+                self.by_channel["email"].append(n)
+            if inv.get("phone"):
+                self.by_channel["sms"].append(n)
+            if inv.get("email_sent_at"):
+                self.sent["email"].add(n)
+            if inv.get("sms_sent_at"):
+                self.sent["sms"].add(n)
+        self.summary = self._summarize()
+
+    def _summarize(self):
+        declined = set(self.by_status.get("declined", ()))
+        summary = {"total": len(self.rows)}
+        summary.update({status: len(self.by_status.get(status, ())) for status in STATUSES})
+        for channel in CHANNELS:
+            reachable = self.by_channel[channel]
+            summary[f"unsent_{channel}"] = sum(1 for n in reachable if n not in self.sent[channel])
+            summary[f"reminder_{channel}"] = sum(1 for n in reachable if n not in declined)
+        summary["reminder_eligible"] = len(self.rows) - len(declined)
+        return summary
+
+    def query(self, statuses=None, channel=None, sent=None, search=None):
+        """Row numbers matching every given filter, in guest-list order.
+
+        statuses: iterable of statuses (any of them); channel: "email" or
+        "sms" (has that address); sent: "sent"/"unsent" on that channel, or
+        on either channel when none is given; search: case-insensitive
+        substring of the name.
+        """
+        if channel:
+            candidates = self.by_channel[channel]
+        else:
+            candidates = range(len(self.rows))
+        if statuses:
+            wanted = set()
+            for status in statuses:
+                wanted.update(self.by_status.get(status, ()))
+            candidates = [n for n in candidates if n in wanted]
+        if sent:
+            done = self.sent[channel] if channel else self.sent["email"] | self.sent["sms"]
+            candidates = [n for n in candidates if (n in done) == (sent == "sent")]
+        if search:
+            search = search.lower()
+            candidates = [n for n in candidates if search in self.names[n]]
+        return list(candidates)
+
+    def page(self, matches, page, per_page):
+        """The invitees of one page of query() results, as plain dicts."""
+        start = (page - 1) * per_page
+        return [{field: self.rows[n][field] for field in ROW_FIELDS} for n in matches[start:start + per_page]]
+
+    def contact_ids(self, matches):
+        return [self.rows[n]["contact_id"] for n in matches]
+
+
+def get(event_id, stamp, load):
+    """The index for an event, rebuilt with load() if stamp has changed."""
+    with _lock:
+        cached = _cache.get(event_id)
+        if cached is not None and cached[0] == stamp:
+            _cache.move_to_end(event_id)
+            return cached[1]
+    index = InviteeIndex(load())
+    with _lock:
+        _cache[event_id] = (stamp, index)
+        _cache.move_to_end(event_id)
+        while len(_cache) > MAX_CACHED:
+            _cache.popitem(last=False)
+    return index
+
+
+def forget(event_id):
+    with _lock:
+        _cache.pop(event_id, None)
+
+
+def parse_filters(args):
+    """Filters for InviteeIndex.query from request args or form data.
+
+    Unknown values are ignored rather than rejected, like an empty filter.
+    """
+    statuses = [s for s in args.get("status", "").split(",") if s in STATUSES]
+    channel = args.get("channel", "")
+    sent = args.get("sent", "")
+    return {
+        "statuses": statuses or None,
+        "channel": channel if channel in CHANNELS else None,
+        "sent": sent if sent in SENT_STATES else None,
+        "search": args.get("q", "").strip() or None,
+    }
@@ -0,0 +1,86 @@
+import re
+import threading
+
+from flask import render_template
+
+from app.config import UPLOADS_DIR, PUBLIC_DOMAIN
+from app.services import image_service, read_model
+from app.utils import metrics
+from app.utils.helpers import format_date, format_time
+
+# Link unfurlers seen when invitation links are texted or shared. iMessage
+# fetches previews with a Safari UA that ends in "facebookexternalhit/1.1".
+PREVIEW_AGENTS = re.compile(
+    r"facebookexternalhit|facebot|whatsapp|twitterbot|slackbot|slack-imgproxy|"
+    r"telegrambot|discordbot|linkedinbot|skypeuripreview|applebot|iframely|"
+    r"embedly|pinterest|redditbot|vkshare|google-pagerenderer|snapchat|"
+    r"viber|line-poker|kakaotalk-scrap|mastodon|bluesky",
+    re.IGNORECASE,
+)
+
+_cards = {}  # event id -> (read model revision, rendered html); None -> generic card
+_lock = threading.Lock()
+
+
+def is_preview_agent(user_agent):
+    return bool(user_agent and PREVIEW_AGENTS.search(user_agent))
+
+
+def _image_url(event):
+    if not event.get("photo"):
+        return None
+    name = image_service.variant_filename(UPLOADS_DIR / event["photo"], "jpeg", 1280)
+    path = f"/img/{name}" if name else f"/uploads/{event['photo']}"
+    return f"https://{PUBLIC_DOMAIN}{path}"
+
+
+# Shown for links whose token isn't known, so a preview never confirms
+# whether a guessed token exists
+GENERIC_TITLE = "You're invited!"
+GENERIC_DESCRIPTION = "Open the link to see your invitation and RSVP."
+
+
+def _generic_card():
+    with _lock:
+        html = _cards.get(None)
+    if html is None:
+        html = render_template("preview_card.html", title=GENERIC_TITLE,
+                               description=GENERIC_DESCRIPTION, image_url=None)
+        with _lock:
+            _cards[None] = html
+    return html
+
+
+def render_card(token=None, short_token=None):
+    """OpenGraph card for the event behind an RSVP link.
+
+    The card only carries event-level details (title, date, photo), never the
+    guest's name, so it is rendered once per event and reused for every
+    invitee's link until the event is republished. Unknown tokens get the
+    same generic card every time.
+    """
+    if short_token:
+        event, _ = read_model.get_by_short_token(short_token)
+    else:
+        event, _ = read_model.get_by_token(token)
+    if not event:
+        return _generic_card()
+    with _lock:
+        cached = _cards.get(event["id"])
+    fresh = cached is not None and cached[0] == event["revision"]
+    metrics.cache_lookup("preview_card", fresh)
+    if fresh:
+        return cached[1]
+
+    when = format_date(event["date"])
+    if event.get("time"):
+        when += f" at {format_time(event['time'])}"
+    html = render_template(
+        "preview_card.html",
+        title=event["title"],
+        description=when,
+        image_url=_image_url(event),
+    )
+    with _lock:
+        _cards[event["id"]] = (event["revision"], html)
+    return html
@@ -0,0 +1,171 @@
+import logging
+import time
+from datetime import datetime
+
+from app.config import QUOTA_FILE, QUOTA_MAX_WAIT
+from app.utils.file_lock import locked_json_write, read_json
+
+logger = logging.getLogger(__name__)
+
+MINUTE = 60
+DAY = 24 * 60 * 60
+
+BACKOFF_BASE = 30  # seconds; doubled for each consecutive rate-limit error
+BACKOFF_MAX = 60 * 60
+
+
+class QuotaExceeded(Exception):
+    """Raised when a sender profile has no capacity left on a channel."""
+
+
+def _limits(profile, channel):
+    return int(profile.get(f"{channel}_rate") or 0), int(profile.get(f"{channel}_daily") or 0)
+
+
+def _prune(entries, now):
+    entries[:] = [
+        e for e in entries
+        if (e["type"] == "send" and now - e["at"] < DAY)
+        or (e["type"] == "pause" and now < e["until"] + BACKOFF_MAX)
+    ]
+
+
+def _usage(entries, profile_name, channel, now):
+    """Summarize the recorded sends and pauses for one profile/channel."""
+    minute = day = 0
+    oldest_in_minute = None
+    pause = None
+    for e in entries:
+        if e["profile"] != profile_name or e["channel"] != channel:
+            continue
+        if e["type"] == "pause":
+            pause = e
+        elif now - e["at"] < DAY:
+            day += 1
+            if now - e["at"] < MINUTE:
+                minute += 1
+                if oldest_in_minute is None or e["at"] < oldest_in_minute:
+                    oldest_in_minute = e["at"]
+    return {
+        "minute": minute,
+        "day": day,
+        "oldest_in_minute": oldest_in_minute,
+        "paused_until": pause["until"] if pause and pause["until"] > now else None,
+        "strikes": pause["strikes"] if pause else 0,
+    }
+
+
+def is_rate_limit_error(exc):
+    """Check whether a send error means the provider is throttling us."""
+    import smtplib
+
+    if isinstance(exc, smtplib.SMTPResponseException):
+        text = exc.smtp_error
+        if isinstance(text, bytes):
+            text = text.decode(errors="ignore")
+        text = text.lower()
+        return (
+            exc.smtp_code in (421, 450, 451, 452)
+            or "5.4.5" in text
+            or "rate limit" in text
+            or "quota" in text
+        )
+    return getattr(exc, "status_code", None) == 429
+
+
+def _is_daily_limit_error(exc):
+    import smtplib
+
+    if isinstance(exc, smtplib.SMTPResponseException):
+        text = exc.smtp_error
+        if isinstance(text, bytes):
+            text = text.decode(errors="ignore")
+        return "5.4.5" in text or "daily" in text.lower()
+    return False
+
+
+def acquire(profile_name, profile, channel, max_wait=QUOTA_MAX_WAIT):
+    """Reserve capacity for one message, waiting for the per-minute window if needed.
+
+    Reservations are recorded in data/quota.json, so rolling per-minute and
+    daily counts hold across restarts and across processes. Raises
+    QuotaExceeded if the daily limit is reached, or if the profile would
+    not have capacity again within max_wait seconds. Returns True if the
+    profile had been backing off after rate-limit errors.
+    """
+    rate, daily = _limits(profile, channel)
+    deadline = time.time() + max_wait
+    while True:
+        with locked_json_write(QUOTA_FILE) as entries:
+            now = time.time()
+            _prune(entries, now)
+            usage = _usage(entries, profile_name, channel, now)
+            if daily and usage["day"] >= daily:
+                raise QuotaExceeded(f"daily {channel} limit ({daily}) reached for '{profile_name}'")
+            if usage["paused_until"]:
+                wait = usage["paused_until"] - now
+            elif rate and usage["minute"] >= rate:
+                wait = usage["oldest_in_minute"] + MINUTE - now
+            else:
+                entries.append({"type": "send", "profile": profile_name, "channel": channel, "at": now})
+                return usage["strikes"] > 0
+        if now + wait > deadline:
+            raise QuotaExceeded(f"'{profile_name}' is throttled on {channel} for another {int(wait) + 1}s")
+        time.sleep(max(wait, 0.1))
+
+
+def record_success(profile_name, channel):
+    """Clear any backoff once a profile delivers again."""
+    with locked_json_write(QUOTA_FILE) as entries:
+        entries[:] = [
+            e for e in entries
+            if not (e["type"] == "pause" and e["profile"] == profile_name and e["channel"] == channel)
+        ]
+
+
+def record_failure(profile_name, channel, exc):
+    """Release the reservation made by acquire() and back off on rate-limit errors."""
+    with locked_json_write(QUOTA_FILE) as entries:
+        now = time.time()
+        for i in range(len(entries) - 1, -1, -1):
+            e = entries[i]
+            if e["type"] == "send" and e["profile"] == profile_name and e["channel"] == channel:
+                del entries[i]
+                break
+        if not is_rate_limit_error(exc):
+            return
+        strikes = _usage(entries, profile_name, channel, now)["strikes"] + 1
+        if _is_daily_limit_error(exc):
+            delay = BACKOFF_MAX
+        else:
+            delay = min(BACKOFF_BASE * 2 ** (strikes - 1), BACKOFF_MAX)
+        entries[:] = [
+            e for e in entries
+            if not (e["type"] == "pause" and e["profile"] == profile_name and e["channel"] == channel)
+        ]
+        entries.append({
+            "type": "pause", "profile": profile_name, "channel": channel,
+            "until": now + delay, "strikes": strikes,
+        })
+    logger.warning("%s/%s rate-limited, backing off %ss: %s", profile_name, channel, delay, exc)
+
+
+def get_capacity(members):
+    """Remaining capacity for a list of (profile_name, profile, channel) tuples."""
+    entries = read_json(QUOTA_FILE)
+    now = time.time()
+    rows = []
+    for profile_name, profile, channel in members:
+        rate, daily = _limits(profile, channel)
+        usage = _usage(entries, profile_name, channel, now)
+        paused_until = usage["paused_until"]
+        rows.append({
+            "profile": profile_name,
+            "channel": channel,
+            "minute_limit": rate,
+            "minute_remaining": max(rate - usage["minute"], 0) if rate else None,
+            "daily_limit": daily,
+            "daily_remaining": max(daily - usage["day"], 0) if daily else None,
+            "paused_until": datetime.fromtimestamp(paused_until).strftime("%H:%M:%S") if paused_until else None,
+        })
+    return rows
@@ -0,0 +1,170 @@
+import sqlite3
+import threading
+
+from app.config import READ_MODEL_DB
+
+# Compact, versioned copy of event data for the public server. event_service
+# publishes the few fields an RSVP page needs into SQLite, keyed by token, so
+# the public server never parses event documents (and never loads contact
+# emails, phone numbers or send history).
+
+# Event fields copied into the read model, in column order
+EVENT_FIELDS = (
+    "title", "host", "date", "time", "location", "message", "template", "photo",
+    "show_host", "location_url", "sender_profile",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY, revision INTEGER NOT NULL,
+    title TEXT, host TEXT, date TEXT, time TEXT, location TEXT, message TEXT,
+    template TEXT, photo TEXT, show_host INTEGER, location_url TEXT, sender_profile TEXT
+);
+CREATE TABLE IF NOT EXISTS invitees (
+    token TEXT PRIMARY KEY, short_token TEXT, event_id TEXT NOT NULL,
+    name TEXT, status TEXT
+);
+CREATE INDEX IF NOT EXISTS invitees_short ON invitees (short_token);
+CREATE INDEX IF NOT EXISTS invitees_event ON invitees (event_id);
+"""
+
+_local = threading.local()
+
+
+def _conn():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        READ_MODEL_DB.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(READ_MODEL_DB), timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT that bumps the global version on success."""
+
+    def __enter__(self):
+        self.conn = _conn()
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.conn.execute("ROLLBACK")
+            return False
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('version', 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+        )
+        self.conn.execute("COMMIT")
+        return False
+
+
+def _write_event(conn, event):
+    values = [event.get(f) for f in EVENT_FIELDS]
+    values[EVENT_FIELDS.index("show_host")] = 1 if event.get("show_host", True) else 0
+    conn.execute(
+        "INSERT INTO events (id, revision, %s) VALUES (?, 1, %s) "
+        "ON CONFLICT(id) DO UPDATE SET revision = revision + 1, %s"
+        % (
+            ", ".join(EVENT_FIELDS),
+            ", ".join("?" * len(EVENT_FIELDS)),
+            ", ".join(f"{f} = excluded.{f}" for f in EVENT_FIELDS),
+        ),
+        [event["id"], *values],
+    )
+    if "invitees" in event:
+        conn.execute("DELETE FROM invitees WHERE event_id = ?", (event["id"],))
+        _write_invitees(conn, event["id"], event["invitees"])
+
+
+def _write_invitees(conn, event_id, invitees):
+    conn.executemany(
+        "INSERT OR REPLACE INTO invitees (token, short_token, event_id, name, status) VALUES (?, ?, ?, ?, ?)",
+        [(inv["token"], inv.get("short_token"), event_id, inv["name"], inv["status"]) for inv in invitees],
+    )
+
+
+def publish_event(event):
+    """Copy an event's public fields into the read model.
+
+    If the event dict carries its invitees they replace the published ones;
+    metadata-only events leave the published invitees alone.
+    """
+    with _Transaction() as conn:
+        _write_event(conn, event)
+
+
+def publish_invitees(event_id, invitees):
+    """Add or update some of an event's invitees in the read model."""
+    if not invitees:
+        return
+    with _Transaction() as conn:
+        _write_invitees(conn, event_id, invitees)
+
+
+def remove_invitees(tokens):
+    if not tokens:
+        return
+    with _Transaction() as conn:
+        conn.executemany("DELETE FROM invitees WHERE token = ?", [(t,) for t in tokens])
+
+
+def remove_event(event_id):
+    with _Transaction() as conn:
+        conn.execute("DELETE FROM invitees WHERE event_id = ?", (event_id,))
+        conn.execute("DELETE FROM events WHERE id = ?", (event_id,))
+
+
+def rebuild(events):
+    """Replace the whole read model with the given events."""
+    with _Transaction() as conn:
+        conn.execute("DELETE FROM invitees")
+        conn.execute("DELETE FROM events")
+        for event in events:
+            _write_event(conn, event)
+
+
+def version():
+    """Increases on every publish; 0 if the read model was never built."""
+    row = _conn().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    return row[0] if row else 0
+
+
+def _event_from_row(row):
+    event = {"id": row[0], "revision": row[1]}
+    event.update(zip(EVENT_FIELDS, row[2:]))
+    event["show_host"] = bool(event["show_host"])
+    return event
+
+
+_EVENT_COLUMNS = "e.id, e.revision, " + ", ".join(f"e.{f}" for f in EVENT_FIELDS)
+
+
+def _lookup(column, value):
+    row = _conn().execute(
+        f"SELECT i.token, i.short_token, i.name, i.status, {_EVENT_COLUMNS} "
+        f"FROM invitees i JOIN events e ON e.id = i.event_id WHERE i.{column} = ?",
+        (value,),
+    ).fetchone()
+    if row is None:
+        return None, None
+    invitee = dict(zip(("token", "short_token", "name", "status"), row[:4]))
+    return _event_from_row(row[4:]), invitee
+
+
+def get_by_token(token):
+    """(event, invitee) for an RSVP token, or (None, None).
+
+    Both are small dicts holding only the published fields; the event also
+    carries a "revision" that changes whenever it is republished.
+    """
+    return _lookup("token", token)
+
+
+def get_by_short_token(short_token):
+    """(event, invitee) for a short SMS token, or (None, None)."""
+    return _lookup("short_token", short_token)
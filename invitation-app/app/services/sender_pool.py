@@ -0,0 +1,154 @@
+from app.config import SENDER_PROFILES, POOLED_PROFILE, get_sender_profile
+from app.services import email_service, quota_service, sms_service
+from app.services.quota_service import QuotaExceeded
+from app.utils.circuit_breaker import CircuitOpenError, OPEN
+
+CHANNELS = ("email", "sms")
+MAX_SEND_ATTEMPTS = 4
+
+
+def _profile_supports(profile, channel):
+    """Check whether a profile has credentials for the given channel."""
+    if channel == "email":
+        return bool(profile.get("gmail_address") and profile.get("gmail_password"))
+    return bool(profile.get("sms_url") and profile.get("sms_login") and profile.get("sms_password"))
+
+
+def pool_members(channel):
+    """Return [(name, profile)] of all profiles configured for a channel."""
+    return [(name, p) for name, p in SENDER_PROFILES.items() if _profile_supports(p, channel)]
+
+
+class SenderPool:
+    """Smooth weighted round-robin across sender profiles for one channel.
+
+    Each profile is weighted by its per-minute rate for the channel, so a
+    profile allowed 20/min gets twice the sends of one allowed 10/min, and
+    picks are interleaved rather than bunched.
+    """
+
+    def __init__(self, channel, members=None):
+        self.channel = channel
+        members = members if members is not None else pool_members(channel)
+        self._weights = {name: max(int(p.get(f"{channel}_rate", 1) or 1), 1) for name, p in members}
+        self._profiles = dict(members)
+        self._current = {name: 0 for name in self._weights}
+
+    def __bool__(self):
+        return bool(self._weights)
+
+    def next(self, exclude=()):
+        """Pick the next profile, skipping names in exclude. Returns (name, profile) or (None, None)."""
+        candidates = [n for n in self._weights if n not in exclude]
+        if not candidates:
+            return None, None
+        total = sum(self._weights[n] for n in candidates)
+        for n in candidates:
+            self._current[n] += self._weights[n]
+        best = max(candidates, key=lambda n: self._current[n])
+        self._current[best] -= total
+        return best, self._profiles[best]
+
+
+class EventSenders:
+    """Resolve which sender profile handles each send for an event.
+
+    Events pinned to a single profile always get that profile; events set to
+    the pooled pseudo-profile rotate through every profile configured for the
+    channel being sent on.
+    """
+
+    def __init__(self, event):
+        self.profile_name = event.get("sender_profile", "primary")
+        self.pooled = self.profile_name == POOLED_PROFILE
+        self._pools = {}
+        self._blocked = {channel: {} for channel in CHANNELS}
+        if self.pooled:
+            for channel in CHANNELS:
+                self._pools[channel] = SenderPool(channel)
+        elif self.profile_name not in SENDER_PROFILES:
+            self.profile_name = "primary"
+
+    def pick(self, channel, exclude=()):
+        """Return (name, profile) to use for the next send on a channel.
+
+        Profiles named in exclude (e.g. out of quota) are skipped; returns
+        (None, None) when nothing is left.
+        """
+        if self.pooled:
+            pool = self._pools[channel]
+            if pool:
+                return pool.next(exclude=exclude)
+            # No profile is configured for this channel; let the send fail
+            # with the usual "not configured" error from the primary profile.
+            if "primary" in exclude:
+                return None, None
+            return "primary", get_sender_profile("primary")
+        if self.profile_name in exclude:
+            return None, None
+        return self.profile_name, get_sender_profile(self.profile_name)
+
+    def members(self, channel):
+        """Return [(name, profile)] this event may send through on a channel."""
+        if self.pooled:
+            return pool_members(channel)
+        profile = get_sender_profile(self.profile_name)
+        if _profile_supports(profile, channel):
+            return [(self.profile_name, profile)]
+        return []
+
+    def send(self, channel, deliver):
+        """Deliver one message through this event's sender profile(s).
+
+        deliver(profile) performs the actual send. Quota is reserved before
+        each attempt; a profile that is out of capacity is skipped for the
+        rest of this batch (pooled events move on to the next profile), as is
+        one whose circuit breaker is open, and rate-limit errors back the
+        profile off before retrying. Returns the name of the profile that
+        delivered. Raises QuotaExceeded once no profile has capacity left on
+        the channel.
+        """
+        blocked = self._blocked[channel]
+        for _ in range(MAX_SEND_ATTEMPTS):
+            name, profile = self.pick(channel, exclude=blocked)
+            if name is None:
+                break
+            try:
+                recovering = quota_service.acquire(name, profile, channel)
+            except QuotaExceeded as e:
+                blocked[name] = str(e)
+                continue
+            try:
+                deliver(profile)
+            except CircuitOpenError as e:
+                # Backend is down: don't count it against quota, and stop
+                # routing this batch through it.
+                quota_service.record_failure(name, channel, e)
+                blocked[name] = str(e)
+                continue
+            except Exception as e:
+                quota_service.record_failure(name, channel, e)
+                if quota_service.is_rate_limit_error(e):
+                    continue
+                raise
+            if recovering:
+                quota_service.record_success(name, channel)
+            return name
+        raise QuotaExceeded("; ".join(blocked.values()) or f"{channel} sending kept hitting rate limits")
+
+    def capacity(self):
+        """Remaining quota and breaker state for every profile/channel this event can send through."""
+        rows = quota_service.get_capacity([
+            (name, profile, channel)
+            for channel in CHANNELS
+            for name, profile in self.members(channel)
+        ])
+        for row in rows:
+            profile = get_sender_profile(row["profile"])
+            if row["channel"] == "email":
+                breaker = email_service.smtp_breaker(profile["gmail_address"])
+            else:
+                breaker = sms_service.sms_breaker(profile["sms_url"])
+            row["circuit_open"] = breaker.state == OPEN
+            row["last_error"] = breaker.last_error
+        return rows
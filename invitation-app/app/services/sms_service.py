@@ -1,9 +1,67 @@
+import functools
 import re
-from android_sms_gateway import client, domain
-from app.config import SMS_GATEWAY_URL, SMS_GATEWAY_LOGIN, SMS_GATEWAY_PASSWORD
+from app.config import (
+    SMS_GATEWAY_URL, SMS_GATEWAY_LOGIN, SMS_GATEWAY_PASSWORD,
+    SMS_CONNECT_TIMEOUT, SMS_SEND_TIMEOUT, BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT,
+)
+from app.utils import metrics
+from app.utils.circuit_breaker import get_breaker
 from app.utils.helpers import format_date, format_time
 
 
+# requests and android_sms_gateway are imported on first send, so servers
+# without SMS configured never load them
+
+@functools.cache
+def _session_class():
+    import requests
+
+    class _TimeoutSession(requests.Session):
+        """requests session that applies the gateway deadlines to every call."""
+
+        def request(self, method, url, **kwargs):
+            kwargs.setdefault("timeout", (SMS_CONNECT_TIMEOUT, SMS_SEND_TIMEOUT))
+            return super().request(method, url, **kwargs)
+
+    return _TimeoutSession
+
+
+def _is_gateway_outage(exc):
+    """Network errors and 5xx responses count against the breaker; bad requests don't."""
+    import requests
+
+    if isinstance(exc, requests.RequestException):
+        return True
+    status = getattr(exc, "status_code", None)
+    return status is not None and status >= 500
+
+
+def sms_breaker(sms_url=None):
+    """Circuit breaker for one SMS gateway phone."""
+    return get_breaker(
+        f"SMS gateway ({sms_url or SMS_GATEWAY_URL})",
+        failure_threshold=BREAKER_FAILURE_THRESHOLD,
+        reset_timeout=BREAKER_RESET_TIMEOUT,
+        is_failure=_is_gateway_outage,
+    )
+
+
+def _send_gateway_message(message, sms_url, sms_login, sms_password):
+    """POST a message to the gateway with hard deadlines, through its circuit breaker."""
+    from android_sms_gateway import client, http
+
+    with sms_breaker(sms_url).guard(), _session_class()() as session:
+        api = client.APIClient(sms_login, sms_password, base_url=sms_url, http=http.RequestsHttpClient(session))
+        with metrics.timer("sms_gateway_duration_seconds"):
+            api.send(message)
+
+
+def _build_message(phone, text):
+    from android_sms_gateway import domain
+
+    return domain.Message(phone_numbers=[phone], text_message=domain.TextMessage(text=text))
+
+
 def _get_sms_credentials(sender_profile=None):
     """Get SMS gateway credentials from sender profile or defaults."""
     if sender_profile and sender_profile.get("sms_url"):
@@ -127,13 +185,8 @@ def send_reminder_sms(to_phone, to_name, event, days_remaining, short_rsvp_url,
 
     message_text = format_reminder_sms(event, days_remaining, short_rsvp_url)
 
-    message = domain.Message(
-        phone_numbers=[normalized],
-        text_message=domain.TextMessage(text=message_text),
-    )
-
-    with client.APIClient(sms_login, sms_password, base_url=sms_url) as c:
-        c.send(message)
+    message = _build_message(normalized, message_text)
+    _send_gateway_message(message, sms_url, sms_login, sms_password)
 
 
 def send_raw_sms(to_phone, message_text, sender_profile=None):
@@ -145,13 +198,8 @@ def send_raw_sms(to_phone, message_text, sender_profile=None):
     if not normalized:
         raise ValueError(f"Invalid phone number: {to_phone}")
 
-    message = domain.Message(
-        phone_numbers=[normalized],
-        text_message=domain.TextMessage(text=message_text),
-    )
-
-    with client.APIClient(sms_login, sms_password, base_url=sms_url) as c:
-        c.send(message)
+    message = _build_message(normalized, message_text)
+    _send_gateway_message(message, sms_url, sms_login, sms_password)
 
 
 def send_sms_invitation(to_phone, to_name, event, short_rsvp_url, sender_profile=None):
@@ -165,10 +213,5 @@ def send_sms_invitation(to_phone, to_name, event, short_rsvp_url, sender_profile
 
     message_text = format_sms_message(event, short_rsvp_url)
 
-    message = domain.Message(
-        phone_numbers=[normalized],
-        text_message=domain.TextMessage(text=message_text),
-    )
-
-    with client.APIClient(sms_login, sms_password, base_url=sms_url) as c:
-        c.send(message)
+    message = _build_message(normalized, message_text)
+    _send_gateway_message(message, sms_url, sms_login, sms_password)
@@ -0,0 +1,135 @@
+import hashlib
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+
+from app.config import UPLOADS_DIR, UPLOADS_INDEX_FILE, IMAGE_CACHE_DIR
+from app.services import image_service
+from app.utils.file_lock import locked_json_write
+from app.utils.helpers import now_iso
+
+# Stored uploads are named <sha256 prefix>.<ext>
+HASH_LENGTH = 32
+_HASHED_NAME = re.compile(r"^[0-9a-f]{%d}\.[a-z0-9]+$" % HASH_LENGTH)
+
+# store() holds an upload this long (seconds), so the event being created or
+# edited with it can add its reference before another event's release()
+# garbage-collects the same file
+HOLD_SECONDS = 3600
+
+
+def is_content_addressed(filename):
+    """True for upload names produced by store() (safe to cache forever)."""
+    return bool(filename and _HASHED_NAME.match(filename))
+
+
+def store(file, extension):
+    """Save an uploaded file under the hash of its bytes.
+
+    If the same bytes were uploaded before, the existing file is reused and
+    nothing is written. New uploads are normalized before they appear under
+    their name, and get their resized variants built. Returns (filename,
+    sizes) where sizes is the dict from image_service.normalize_upload, or
+    None for a duplicate.
+
+    Runs under the uploads index lock, like release(), and holds the file
+    for HOLD_SECONDS, so it isn't deleted between being found here and the
+    caller's add_ref().
+    """
+    data = file.read()
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    filename = f"{digest}.{extension.lower()}"
+    path = UPLOADS_DIR / filename
+
+    with locked_json_write(UPLOADS_INDEX_FILE) as entries:
+        _hold(entries, filename)
+        _sweep(entries)
+        if path.exists():
+            return filename, None
+
+        UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=UPLOADS_DIR, prefix=f".{digest}.", suffix=".tmp")
+        try:
+            os.fchmod(fd, 0o644)
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            sizes = image_service.normalize_upload(tmp, path)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+    image_service.generate_variants(path)
+    return filename, sizes
+
+
+def _hold(entries, filename):
+    for entry in entries:
+        if entry["file"] == filename:
+            break
+    else:
+        entry = {"file": filename, "events": [], "created_at": now_iso()}
+        entries.append(entry)
+    entry["held_until"] = time.time() + HOLD_SECONDS
+
+
+def add_ref(filename, event_id):
+    """Record that an event uses a stored upload."""
+    if not is_content_addressed(filename):
+        return
+    with locked_json_write(UPLOADS_INDEX_FILE) as entries:
+        for entry in entries:
+            if entry["file"] == filename:
+                if event_id not in entry["events"]:
+                    entry["events"].append(event_id)
+                # The reference protects it now; release() may collect it
+                entry.pop("held_until", None)
+                return
+        entries.append({"file": filename, "events": [event_id], "created_at": now_iso()})
+
+
+def release(filename, event_id):
+    """Drop an event's reference; delete the upload once nothing uses it.
+
+    Returns True if the file was garbage-collected. Also collects any other
+    unreferenced upload whose store() hold has expired. Uploads saved
+    before the content-addressed store (plain filenames) are never deleted
+    here, since other events may share them.
+    """
+    if not is_content_addressed(filename):
+        return False
+    with locked_json_write(UPLOADS_INDEX_FILE) as entries:
+        for entry in entries:
+            if entry["file"] == filename:
+                if event_id in entry["events"]:
+                    entry["events"].remove(event_id)
+                break
+        collected = _sweep(entries)
+    return filename in collected
+
+
+def _sweep(entries):
+    """Delete uploads no event references and no store() still holds.
+
+    Call with the uploads index locked. Returns the collected filenames.
+    """
+    now = time.time()
+    collected = [e["file"] for e in entries if not e["events"] and e.get("held_until", 0) <= now]
+    if collected:
+        entries[:] = [e for e in entries if e["file"] not in collected]
+        for filename in collected:
+            _delete_files(filename)
+    return collected
+
+
+def _delete_files(filename):
+    path = UPLOADS_DIR / filename
+    stem = Path(filename).stem
+    doomed = [path, path.with_name(stem + image_service.EMAIL_SUFFIX)]
+    doomed.extend(IMAGE_CACHE_DIR.glob(f"{stem}-*"))
+    for p in doomed:
+        try:
+            p.unlink()
+        except FileNotFoundError:
+            pass
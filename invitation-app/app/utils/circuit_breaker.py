@@ -0,0 +1,108 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a backend whose circuit is open."""
+
+
+class CircuitBreaker:
+    """Fail fast after repeated errors talking to one backend.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    are rejected immediately with CircuitOpenError. Once reset_timeout seconds
+    have passed, a single probe call is let through: success closes the
+    circuit, failure re-opens it for another reset_timeout.
+    """
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=60, is_failure=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._is_failure = is_failure or (lambda exc: True)
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._last_error = None
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    @property
+    def last_error(self):
+        return self._last_error
+
+    def _before_call(self):
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                # Let exactly one probe through; concurrent callers keep failing fast.
+                self._state = HALF_OPEN
+                return
+            retry_in = max(int(self.reset_timeout - (time.monotonic() - self._opened_at)), 0)
+            raise CircuitOpenError(
+                f"{self.name} is unavailable after {self._failures} failure(s) "
+                f"({self._last_error}); retrying in {retry_in}s"
+            )
+
+    def _record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._last_error = None
+
+    def _record_failure(self, exc):
+        with self._lock:
+            self._failures += 1
+            self._last_error = str(exc) or exc.__class__.__name__
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    logger.warning("%s opened after %d failure(s): %s", self.name, self._failures, self._last_error)
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    @contextmanager
+    def guard(self):
+        """Run the body through the breaker.
+
+        Usage:
+            with breaker.guard():
+                talk_to_backend()
+        """
+        self._before_call()
+        try:
+            yield
+        except Exception as e:
+            if self._is_failure(e):
+                self._record_failure(e)
+            else:
+                self._record_success()
+            raise
+        self._record_success()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name, **kwargs):
+    """Return the process-wide breaker for a backend, creating it on first use."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name, **kwargs)
+        return breaker
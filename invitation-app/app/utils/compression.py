@@ -0,0 +1,149 @@
+import gzip
+import threading
+from pathlib import Path
+
+from flask import request
+from werkzeug.security import safe_join
+
+from app.utils import metrics
+
+try:
+    import brotli
+except ImportError:  # gzip alone still works
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    "text/html", "text/css", "text/plain", "text/javascript",
+    "application/javascript", "application/json", "image/svg+xml",
+}
+STATIC_SUFFIXES = {".css", ".js", ".html", ".txt", ".json", ".svg"}
+
+# Pages are compressed per request, so favour speed; static files are done
+# once at startup, so spend the CPU for the smallest output.
+_DYNAMIC_LEVELS = {"br": 5, "gzip": 6}
+_STATIC_LEVELS = {"br": 11, "gzip": 9}
+
+
+def _encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def _compress(data, encoding, level):
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+class _StaticCache:
+    """Precompressed copies of static text files, keyed by absolute path."""
+
+    def __init__(self):
+        self._entries = {}  # path -> (mtime_ns, {encoding: bytes})
+        self._lock = threading.Lock()
+
+    def warm(self, folder):
+        for path in sorted(Path(folder).rglob("*")):
+            if path.is_file() and path.suffix.lower() in STATIC_SUFFIXES:
+                self.get(str(path))
+
+    def get(self, path):
+        """Compressed bodies for a file, rebuilt if it changed on disk."""
+        try:
+            mtime = Path(path).stat().st_mtime_ns
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(path)
+        fresh = entry is not None and entry[0] == mtime
+        metrics.cache_lookup("static_compressed", fresh)
+        if fresh:
+            return entry[1]
+        data = Path(path).read_bytes()
+        bodies = {enc: _compress(data, enc, _STATIC_LEVELS[enc]) for enc in _encodings()}
+        # Keep only encodings that actually save bytes
+        bodies = {enc: body for enc, body in bodies.items() if len(body) < len(data)}
+        with self._lock:
+            self._entries[path] = (mtime, bodies)
+        return bodies
+
+
+def _static_path(app):
+    """Filesystem path of the file a static endpoint is serving, or None."""
+    endpoint = request.endpoint or ""
+    if endpoint != "static" and not endpoint.endswith(".static"):
+        return None
+    if request.blueprint:
+        folder = app.blueprints[request.blueprint].static_folder
+    else:
+        folder = app.static_folder
+    filename = (request.view_args or {}).get("filename")
+    if not folder or not filename:
+        return None
+    return safe_join(folder, filename)
+
+
+def init_compression(app, min_size=1024):
+    """Compress text responses according to the client's Accept-Encoding.
+
+    Static files from the app's and blueprints' static folders are
+    compressed once, by a background thread started on the first request
+    (and again only if they change on disk). Rendered responses at least
+    min_size bytes long are compressed on the fly. Brotli is preferred when
+    installed and accepted, otherwise gzip.
+    """
+    static_cache = _StaticCache()
+    folders = [folder for folder in [app.static_folder] + [bp.static_folder for bp in app.blueprints.values()]
+               if folder]
+    warming = threading.Lock()
+
+    def _warm():
+        for folder in folders:
+            static_cache.warm(folder)
+
+    @app.before_request
+    def start_precompression():
+        # Not at import: a new worker answers at once, and the gunicorn master
+        # (which never serves) doesn't fork while this thread holds a lock.
+        # A static request that beats the thread compresses its file itself.
+        if not warming.locked() and warming.acquire(blocking=False):
+            threading.Thread(target=_warm, name="static-precompress", daemon=True).start()
+
+    @app.after_request
+    def compress_response(response):
+        if (
+            response.status_code != 200
+            or response.mimetype not in COMPRESSIBLE_TYPES
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = request.accept_encodings.best_match(_encodings())
+        if encoding is None:
+            return response
+
+        if response.direct_passthrough:
+            path = _static_path(app)
+            bodies = static_cache.get(path) if path else None
+            if not bodies or encoding not in bodies:
+                return response
+            body = bodies[encoding]
+            response.response.close()
+            response.direct_passthrough = False
+            # Ranges would refer to the uncompressed bytes
+            response.headers.pop("Accept-Ranges", None)
+        elif response.is_streamed:
+            return response
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            body = _compress(data, encoding, _DYNAMIC_LEVELS[encoding])
+
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # Different bytes than the identity response; a weak tag still
+            # lets If-None-Match revalidate against the uncompressed file.
+            response.set_etag(etag, weak=True)
+        return response
@@ -1,20 +1,24 @@
 import json
 import os
 import sys
+import time
 from pathlib import Path
 from contextlib import contextmanager
 
+from app.config import LOCK_TRACE
+from app.utils import lock_trace, metrics
+
 # Cross-platform file locking
 if sys.platform == "win32":
     import msvcrt
 
-    def _lock_shared(f):
+    def _flock_shared(f):
         msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
 
-    def _lock_exclusive(f):
+    def _flock_exclusive(f):
         msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
 
-    def _unlock(f):
+    def _funlock(f):
         try:
             f.seek(0)
             msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -23,16 +27,50 @@ if sys.platform == "win32":
 else:
     import fcntl
 
-    def _lock_shared(f):
+    def _flock_shared(f):
         fcntl.flock(f.fileno(), fcntl.LOCK_SH)
 
-    def _lock_exclusive(f):
+    def _flock_exclusive(f):
         fcntl.flock(f.fileno(), fcntl.LOCK_EX)
 
-    def _unlock(f):
+    def _funlock(f):
         fcntl.flock(f.fileno(), fcntl.LOCK_UN)
 
 
+def _acquire(f, flock, mode):
+    started = time.perf_counter()
+    flock(f)
+    waited = time.perf_counter() - started
+    metrics.observe("flock_wait_seconds", waited, mode=mode)
+    if LOCK_TRACE:
+        lock_trace.acquired(f, mode, waited)
+
+
+def _lock_shared(f):
+    _acquire(f, _flock_shared, "shared")
+
+
+def _lock_exclusive(f):
+    _acquire(f, _flock_exclusive, "exclusive")
+
+
+def _unlock(f):
+    _funlock(f)
+    if LOCK_TRACE:
+        lock_trace.released(f)
+
+
+def _file_label(filepath):
+    # One series for all event files rather than one per event
+    return "events/*.json" if filepath.parent.name == "events" else filepath.name
+
+
+def _record(kind, filepath, started, f):
+    label = _file_label(filepath)
+    metrics.observe(f"json_{kind}_duration_seconds", time.perf_counter() - started, file=label)
+    metrics.observe(f"json_{kind}_bytes", os.fstat(f.fileno()).st_size, file=label)
+
+
 @contextmanager
 def locked_json_read(filepath):
     """Read a JSON file with a shared lock."""
@@ -40,11 +78,14 @@ def locked_json_read(filepath):
     if not filepath.exists():
         yield [] if filepath.name != "config.json" else {}
         return
+    started = time.perf_counter()
     with open(filepath, "r") as f:
         _lock_shared(f)
         try:
             content = f.read().strip()
-            yield json.loads(content) if content else ([] if filepath.name != "config.json" else {})
+            data = json.loads(content) if content else ([] if filepath.name != "config.json" else {})
+            _record("read", filepath, started, f)
+            yield data
         finally:
             _unlock(f)
 
@@ -65,14 +106,19 @@ def locked_json_write(filepath):
         filepath.write_text("[]")
 
     with open(filepath, "r+") as f:
+        started = time.perf_counter()
         _lock_exclusive(f)
         try:
             content = f.read().strip()
             data = json.loads(content) if content else []
+            _record("read", filepath, started, f)
             yield data
+            started = time.perf_counter()
             f.seek(0)
             f.truncate()
             json.dump(data, f, indent=2, default=str)
+            f.flush()
+            _record("write", filepath, started, f)
         finally:
             _unlock(f)
 
@@ -81,10 +127,13 @@ def write_json(filepath, data):
     """Write data to a JSON file with an exclusive lock."""
     filepath = Path(filepath)
     filepath.parent.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
     with open(filepath, "w") as f:
         _lock_exclusive(f)
         try:
             json.dump(data, f, indent=2, default=str)
+            f.flush()
+            _record("write", filepath, started, f)
         finally:
             _unlock(f)
 
@@ -94,10 +143,13 @@ def read_json(filepath):
     filepath = Path(filepath)
     if not filepath.exists():
         return [] if filepath.name != "config.json" else {}
+    started = time.perf_counter()
     with open(filepath, "r") as f:
         _lock_shared(f)
         try:
             content = f.read().strip()
-            return json.loads(content) if content else []
+            data = json.loads(content) if content else []
+            _record("read", filepath, started, f)
+            return data
         finally:
             _unlock(f)
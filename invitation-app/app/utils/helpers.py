@@ -1,8 +1,19 @@
+import base64
+import functools
+import hashlib
+import re
 import secrets
 import uuid
-import bleach
 from datetime import datetime
 
+# Characters bleach.clean() would change: markup and entity starts, and the
+# control characters html5lib drops or replaces (\t and \n pass through).
+# Text without any of them comes back from bleach unchanged.
+_NEEDS_CLEANING = re.compile(r"[\x00-\x08\x0b-\x1f&<>\ud800-\udfff]")
+
+SANITIZE_CACHE_SIZE = 4096  # distinct short values with markup remembered
+SANITIZE_CACHE_MAX_LEN = 256  # longer ones (event messages) aren't worth keeping
+
 
 def generate_id():
     return str(uuid.uuid4())
@@ -17,15 +28,59 @@ def generate_short_token():
     return secrets.token_urlsafe(6)[:8]
 
 
+def derive_short_token(token):
+    """Stable short token for an invitee that predates short tokens.
+
+    Derived from the full RSVP token so every read (and the migration) gives
+    the same SMS link without having to persist it first.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    return base64.urlsafe_b64encode(digest[:6]).decode()
+
+
 def now_iso():
     return datetime.utcnow().isoformat() + "Z"
 
 
 def sanitize(text):
-    """Sanitize user input to prevent XSS."""
+    """Sanitize user input to prevent XSS.
+
+    Same result as bleach.clean() on the stripped text, but names, emails,
+    phone numbers and tags without markup skip bleach's HTML parser.
+    """
     if text is None:
         return ""
-    return bleach.clean(str(text).strip())
+    text = str(text).strip()
+    if not _NEEDS_CLEANING.search(text):
+        return text
+    return _slow_clean(text)
+
+
+def sanitize_many(values):
+    """sanitize() each value, for imports that clean thousands of fields."""
+    search = _NEEDS_CLEANING.search
+    cleaned = []
+    for text in values:
+        if text is None:
+            cleaned.append("")
+            continue
+        text = str(text).strip()
+        cleaned.append(_slow_clean(text) if search(text) else text)
+    return cleaned
+
+
+def _slow_clean(text):
+    if len(text) > SANITIZE_CACHE_MAX_LEN:
+        return _bleach_clean.__wrapped__(text)
+    return _bleach_clean(text)
+
+
+@functools.lru_cache(maxsize=SANITIZE_CACHE_SIZE)
+def _bleach_clean(text):
+    # Repeats are common (tags, "Smith & Sons" on every row of an import)
+    import bleach  # html5lib and friends; only needed once a field has markup
+
+    return bleach.clean(text)
 
 
 def format_date(date_str):
@@ -44,3 +99,11 @@ def format_time(time_str):
         return dt.strftime("%I:%M %p")
     except (ValueError, TypeError):
         return time_str
+
+
+def format_bytes(num):
+    """Format a byte count for display (e.g. 4.2 MB)."""
+    for unit in ("B", "KB", "MB"):
+        if num < 1024 or unit == "MB":
+            return f"{num:.0f} {unit}" if unit == "B" else f"{num:.1f} {unit}"
+        num /= 1024
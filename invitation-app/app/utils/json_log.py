@@ -0,0 +1,180 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import time
+import uuid
+
+from app.config import LOG_LEVEL, LOG_LEVELS, LOG_FORMAT, ACCESS_LOG
+
+# Logging for both servers. Request threads only put records on an in-memory
+# queue; a listener thread formats them (as one JSON object per line by
+# default), redacts RSVP tokens and writes to stderr, so a slow journald
+# never holds up a guest's request. Records logged during a request carry
+# its request id.
+
+# Attributes every LogRecord has; anything else was passed via extra=
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# 64-hex RSVP tokens anywhere, and whatever follows /r/ or /rsvp/ in a URL
+_HEX_TOKEN = re.compile(r"\b([0-9a-f]{6})[0-9a-f]{26,}\b")
+_TOKEN_URL = re.compile(r"(/r/|/rsvp/)[A-Za-z0-9_-]{6,}")
+_SECRET_FIELDS = {"token", "short_token", "password", "gmail_password", "sms_password"}
+
+_state = {"pid": None, "listener": None}
+
+
+def redact(value):
+    """Replace RSVP tokens in a string with a short, non-secret prefix."""
+    value = _TOKEN_URL.sub(r"\1…", value)
+    return _HEX_TOKEN.sub(r"\1…", value)
+
+
+def _fields(record):
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_FIELDS}
+
+
+def _clean(key, value):
+    if key in _SECRET_FIELDS and value:
+        return f"{str(value)[:6]}…" if "token" in key else "***"
+    if isinstance(value, str):
+        return redact(value)
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    return redact(str(value))
+
+
+class JSONFormatter(logging.Formatter):
+    def __init__(self, server):
+        super().__init__()
+        self.server = server
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": redact(record.getMessage()),
+            "server": self.server,
+            "pid": record.process,
+        }
+        for key, value in _fields(record).items():
+            entry[key] = _clean(key, value)
+        if record.exc_text:
+            entry["exc"] = redact(record.exc_text)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Readable single lines for running the dev server in a terminal."""
+
+    def format(self, record):
+        extra = " ".join(f"{k}={_clean(k, v)}" for k, v in _fields(record).items())
+        line = f"{self.formatTime(record, '%H:%M:%S')} {record.levelname:7s} {record.name}: {redact(record.getMessage())}"
+        if extra:
+            line += f" [{extra}]"
+        if record.exc_text:
+            line += "\n" + redact(record.exc_text)
+        return line
+
+
+class _RequestQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue a record with its request id; formatting happens on the listener."""
+
+    def prepare(self, record):
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            # Tracebacks hold frames, which mustn't cross threads; render it now
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if "request_id" not in vars(record):
+            request_id = _current_request_id()
+            if request_id:
+                record.request_id = request_id
+        return record
+
+
+def _current_request_id():
+    try:
+        from flask import g, has_request_context
+    except ImportError:
+        return None
+    return g.get("request_id") if has_request_context() else None
+
+
+def _parse_levels(spec):
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup(server):
+    """Route all logging through the background listener (once per process).
+
+    Safe to call again after a fork: a gunicorn worker inherits the master's
+    handlers but not its listener thread, so it builds its own.
+    """
+    if _state["pid"] == os.getpid():
+        return
+    root = logging.getLogger()
+    if _state["listener"] is not None:
+        for handler in list(root.handlers):
+            if isinstance(handler, _RequestQueueHandler):
+                root.removeHandler(handler)
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JSONFormatter(server))
+    records = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, output, respect_handler_level=False)
+    listener.start()
+    root.addHandler(_RequestQueueHandler(records))
+    root.setLevel(LOG_LEVEL.upper())
+    for name, level in _parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _state["pid"] = os.getpid()
+    _state["listener"] = listener
+    atexit.register(listener.stop)
+
+
+# --- Flask integration ---
+
+_REQUEST_ID = re.compile(r"[A-Za-z0-9._-]{1,64}")
+access_log = logging.getLogger("app.access")
+
+
+def init_app(app, server):
+    """Give every request an id (X-Request-ID) and log it with its timing."""
+    from flask import g, request
+
+    setup(server)
+
+    @app.before_request
+    def _assign_request_id():
+        incoming = request.headers.get("X-Request-ID") or request.headers.get("CF-Ray") or ""
+        g.request_id = incoming if _REQUEST_ID.fullmatch(incoming) else uuid.uuid4().hex[:16]
+        g.log_started = time.perf_counter()
+
+    @app.after_request
+    def _log_request(response):
+        response.headers["X-Request-ID"] = g.get("request_id", "")
+        if ACCESS_LOG and "log_started" in g:
+            access_log.info(
+                "%s %s %s", request.method,
+                # The route pattern keeps tokens out of the log
+                request.url_rule.rule if request.url_rule else "(unmatched)", response.status_code,
+                extra={
+                    "endpoint": request.endpoint,
+                    "status": response.status_code,
+                    "duration_ms": round((time.perf_counter() - g.log_started) * 1000, 2),
+                    "bytes": response.calculate_content_length(),
+                },
+            )
+        return response
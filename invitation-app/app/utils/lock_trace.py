@@ -0,0 +1,139 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+from app.config import BASE_DIR, LOCK_TRACE, LOCK_WAIT_WARN_MS, LOCK_HOLD_WARN_MS
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Per-process record of file-lock waits and holds, fed by file_lock when
+# LOCK_TRACE=1. Each server process ships its record with its metrics
+# snapshot, and the admin's /debug/locks page merges them, so contention
+# between the admin send loop and public RSVP writes shows up in one place.
+
+KEEP_LONGEST = 25  # longest holds kept per process
+KEEP_WARNINGS = 50  # most recent threshold warnings kept per process
+
+# Frames in these files are lock plumbing, not the caller we want to name
+_PLUMBING = ("file_lock.py", "record_log.py", "lock_trace.py", "contextlib.py")
+
+_lock = threading.Lock()
+_held = {}  # id(file object) -> (path, mode, waited, acquired at, caller)
+_files = {}  # path -> {"locks", "wait_total", "wait_max", "hold_total", "hold_max"}
+_longest = []  # [{"path", "mode", "wait_ms", "hold_ms", "caller", "at"}], longest hold first
+_warnings = deque(maxlen=KEEP_WARNINGS)
+
+
+def _caller():
+    """'module.function:line' for the first two frames outside lock plumbing."""
+    frame = sys._getframe(3)
+    names = []
+    while frame is not None and len(names) < 2:
+        filename = frame.f_code.co_filename
+        if not filename.endswith(_PLUMBING):
+            module = os.path.relpath(filename, BASE_DIR) if filename.startswith(str(BASE_DIR)) else filename
+            module = module.removesuffix(".py").replace(os.sep, ".")
+            names.append(f"{module}.{frame.f_code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return " <- ".join(names) or "?"
+
+
+def _short_path(path):
+    path = str(path)
+    return os.path.relpath(path, BASE_DIR) if path.startswith(str(BASE_DIR)) else path
+
+
+def _warn(message, path, mode, waited, held, caller):
+    logger.warning("%s (%s lock on %s, %s)", message, mode, path, caller)
+    with _lock:
+        _warnings.append({"at": time.time(), "message": message, "path": path, "mode": mode,
+                          "wait_ms": round(waited * 1000, 1),
+                          "hold_ms": None if held is None else round(held * 1000, 1), "caller": caller})
+
+
+def acquired(f, mode, waited):
+    path = _short_path(getattr(f, "name", "?"))
+    caller = _caller()
+    with _lock:
+        _held[id(f)] = (path, mode, waited, time.perf_counter(), caller)
+    if waited * 1000 >= LOCK_WAIT_WARN_MS:
+        _warn(f"waited {waited * 1000:.0f} ms", path, mode, waited, None, caller)
+
+
+def released(f):
+    now = time.perf_counter()
+    with _lock:
+        entry = _held.pop(id(f), None)
+        if entry is None:
+            return
+        path, mode, waited, acquired_at, caller = entry
+        held = now - acquired_at
+        stats = _files.get(path)
+        if stats is None:
+            stats = _files[path] = {"locks": 0, "wait_total": 0.0, "wait_max": 0.0,
+                                    "hold_total": 0.0, "hold_max": 0.0}
+        stats["locks"] += 1
+        stats["wait_total"] += waited
+        stats["wait_max"] = max(stats["wait_max"], waited)
+        stats["hold_total"] += held
+        stats["hold_max"] = max(stats["hold_max"], held)
+        if len(_longest) < KEEP_LONGEST or held > _longest[-1]["hold_ms"] / 1000:
+            _longest.append({"path": path, "mode": mode, "wait_ms": round(waited * 1000, 1),
+                             "hold_ms": round(held * 1000, 1), "caller": caller, "at": time.time()})
+            _longest.sort(key=lambda e: e["hold_ms"], reverse=True)
+            del _longest[KEEP_LONGEST:]
+    if held * 1000 >= LOCK_HOLD_WARN_MS:
+        _warn(f"held {held * 1000:.0f} ms", path, mode, waited, held, caller)
+
+
+def snapshot():
+    with _lock:
+        return {
+            "files": {path: dict(stats) for path, stats in _files.items()},
+            "longest": list(_longest),
+            "warnings": list(_warnings),
+            "held": [{"path": path, "mode": mode, "caller": caller,
+                      "held_ms": round((time.perf_counter() - acquired_at) * 1000, 1)}
+                     for path, mode, _, acquired_at, caller in _held.values()],
+        }
+
+
+def report():
+    """Lock activity of every traced server process, merged for the debug page.
+
+    Returns {"files": [...] hottest first, "longest": [...], "warnings": [...],
+    "held": [...], "processes": n}; each entry carries its server and pid.
+    """
+    files, longest, warnings, held = {}, [], [], []
+    processes = metrics.section("locks")
+    for server, pid, data in processes:
+        for path, stats in data["files"].items():
+            merged = files.setdefault(path, {"path": path, "locks": 0, "wait_total": 0.0, "wait_max": 0.0,
+                                             "hold_total": 0.0, "hold_max": 0.0, "servers": set()})
+            merged["locks"] += stats["locks"]
+            merged["wait_total"] += stats["wait_total"]
+            merged["hold_total"] += stats["hold_total"]
+            merged["wait_max"] = max(merged["wait_max"], stats["wait_max"])
+            merged["hold_max"] = max(merged["hold_max"], stats["hold_max"])
+            merged["servers"].add(server)
+        for kind, target in (("longest", longest), ("warnings", warnings), ("held", held)):
+            target.extend(dict(entry, server=server, pid=pid) for entry in data[kind])
+    # Hottest = most time spent waiting for it, then most time held
+    ranked = sorted(files.values(), key=lambda f: (f["wait_total"], f["hold_total"]), reverse=True)
+    for entry in ranked:
+        entry["servers"] = ", ".join(sorted(entry["servers"]))
+    return {
+        "files": ranked,
+        "longest": sorted(longest, key=lambda e: e["hold_ms"], reverse=True)[:KEEP_LONGEST],
+        "warnings": sorted(warnings, key=lambda e: e["at"], reverse=True)[:KEEP_WARNINGS],
+        "held": held,
+        "processes": len(processes),
+    }
+
+
+if LOCK_TRACE:
+    metrics.add_section("locks", snapshot)
@@ -0,0 +1,255 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from app.config import METRICS_DIR
+
+logger = logging.getLogger(__name__)
+
+# In-process counters and histograms, exposed in Prometheus text format by
+# the admin server's /metrics. Every server process (each gunicorn worker of
+# both apps) periodically writes its values to data/metrics/<server>-<pid>.json;
+# /metrics adds those up, so the public server never has to serve metrics
+# itself. Processes that never call init_app (CLI commands, benchmarks) only
+# count in memory.
+
+_SECONDS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    "http_requests_total": ("counter", "HTTP requests by endpoint, method and status.", None),
+    "http_request_duration_seconds": ("histogram", "Time to handle an HTTP request.", _SECONDS),
+    "json_read_bytes": ("histogram", "Size of JSON files read.", _BYTES),
+    "json_read_duration_seconds": ("histogram", "Time to read and parse a JSON file, lock included.", _SECONDS),
+    "json_write_bytes": ("histogram", "Size of JSON files written.", _BYTES),
+    "json_write_duration_seconds": ("histogram", "Time to serialize and write a JSON file, lock included.",
+                                    _SECONDS),
+    "flock_wait_seconds": ("histogram", "Time spent waiting to acquire a file lock.", _SECONDS),
+    "smtp_connect_duration_seconds": ("histogram", "SMTP connect, STARTTLS and login.", _SECONDS),
+    "smtp_send_duration_seconds": ("histogram", "SMTP message upload.", _SECONDS),
+    "sms_gateway_duration_seconds": ("histogram", "SMS gateway API call.", _SECONDS),
+    "rate_limit_rejections_total": ("counter", "Requests refused by a rate limiter.", None),
+    "cache_lookups_total": ("counter", "Cache lookups by cache and result (hit/miss).", None),
+}
+
+FLUSH_INTERVAL = 5  # seconds between snapshot writes of a busy process
+
+_lock = threading.Lock()
+_counters = {}  # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., +Inf count], sum
+_state = {"server": None, "flushed": 0.0}
+_sections = {}  # name -> callable returning extra JSON data for the snapshot
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name, value, **labels):
+    buckets = METRICS[name][2]
+    key = _key(name, labels)
+    with _lock:
+        entry = _histograms.get(key)
+        if entry is None:
+            entry = _histograms[key] = [[0] * (len(buckets) + 1), 0.0]
+        entry[0][bisect_left(buckets, value)] += 1
+        entry[1] += value
+
+
+@contextmanager
+def timer(name, **labels):
+    """Observe the duration of the block; result="error" if it raised."""
+    started = time.perf_counter()
+    result = "ok"
+    try:
+        yield
+    except BaseException:
+        result = "error"
+        raise
+    finally:
+        observe(name, time.perf_counter() - started, result=result, **labels)
+
+
+def cache_lookup(cache, hit):
+    inc("cache_lookups_total", cache=cache, result="hit" if hit else "miss")
+
+
+# --- Per-process snapshots ---
+
+def _snapshot_path(server, pid):
+    return METRICS_DIR / f"{server}-{pid}.json"
+
+
+def add_section(name, collect):
+    """Include collect()'s JSON-able result in this process's snapshots."""
+    _sections[name] = collect
+
+
+def _snapshot():
+    with _lock:
+        snapshot = {
+            "pid": os.getpid(),
+            "counters": [[name, dict(labels), value] for (name, labels), value in _counters.items()],
+            "histograms": [[name, dict(labels), list(counts), total]
+                           for (name, labels), (counts, total) in _histograms.items()],
+        }
+    for name, collect in _sections.items():
+        snapshot[name] = collect()
+    return snapshot
+
+
+def flush():
+    """Write this process's values for /metrics to pick up."""
+    server = _state["server"]
+    if server is None:
+        return
+    _state["flushed"] = time.monotonic()
+    path = _snapshot_path(server, os.getpid())
+    tmp = path.with_suffix(".tmp")
+    try:
+        METRICS_DIR.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps({"server": server, **_snapshot()}))
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("could not write %s: %s", path.name, e)
+
+
+def _maybe_flush():
+    if time.monotonic() - _state["flushed"] >= FLUSH_INTERVAL:
+        flush()
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _collect():
+    """Snapshots of all live server processes, this one read from memory."""
+    snapshots = []
+    own = _snapshot_path(_state["server"], os.getpid()) if _state["server"] else None
+    for path in sorted(METRICS_DIR.glob("*.json")):
+        if path == own:
+            continue
+        try:
+            pid = int(path.stem.rsplit("-", 1)[1])
+        except (IndexError, ValueError):
+            continue
+        if not _alive(pid):
+            # Recycled worker or an earlier run; Prometheus treats the drop as a counter reset
+            path.unlink(missing_ok=True)
+            continue
+        try:
+            snapshots.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    snapshots.append({"server": _state["server"] or "admin", **_snapshot()})
+    return snapshots
+
+
+def section(name):
+    """[(server, pid, data)] of a snapshot section across live server processes."""
+    return [(snapshot["server"], snapshot.get("pid"), snapshot[name])
+            for snapshot in _collect() if name in snapshot]
+
+
+# --- Prometheus text format ---
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, **extra):
+    merged = {**labels, **extra}
+    if not merged:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in merged.items()) + "}"
+
+
+def _number(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def render():
+    """All metrics from every server process, in Prometheus text format."""
+    counters = {}
+    histograms = {}
+    for snapshot in _collect():
+        server = snapshot["server"]
+        for name, labels, value in snapshot["counters"]:
+            key = _key(name, {"server": server, **labels})
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, counts, total in snapshot["histograms"]:
+            key = _key(name, {"server": server, **labels})
+            entry = histograms.setdefault(key, [[0] * len(counts), 0.0])
+            entry[0] = [a + b for a, b in zip(entry[0], counts)]
+            entry[1] += total
+
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "counter":
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_labels(dict(labels))} {_number(value)}")
+            continue
+        for (metric, labels), (counts, total) in sorted(histograms.items()):
+            if metric != name:
+                continue
+            labels = dict(labels)
+            cumulative = 0
+            for bound, count in zip((*buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(round(total, 6))}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+# --- Flask integration ---
+
+def init_app(app, server):
+    """Count and time every request of a Flask app, and snapshot this process.
+
+    Call before other after_request hooks are registered (e.g. compression)
+    so the measured time includes them.
+    """
+    from flask import g, request
+
+    _state["server"] = server
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop("metrics_started", None)
+        endpoint = request.endpoint or "unmatched"
+        inc("http_requests_total", endpoint=endpoint, method=request.method, status=response.status_code)
+        if started is not None:
+            observe("http_request_duration_seconds", time.perf_counter() - started, endpoint=endpoint)
+        _maybe_flush()
+        return response
+
+    atexit.register(flush)
@@ -0,0 +1,232 @@
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from itsdangerous import BadSignature, URLSafeSerializer
+
+from app.config import (
+    SECRET_KEY, PROFILES_DIR, PROFILING_TOGGLE_FILE,
+    PROFILE_RATE, PROFILE_SLOW_MS, PROFILE_INTERVAL_MS, PROFILE_KEEP,
+)
+
+logger = logging.getLogger(__name__)
+
+# Opt-in request profiling. A background thread samples the call stacks of
+# requests being profiled every PROFILE_INTERVAL_MS; when such a request
+# finishes, its samples are saved as folded stacks (profiles/<id>.folded,
+# the input format of flamegraph.pl and speedscope) plus a <id>.json summary.
+# Requests are picked by PROFILE_RATE, or all are sampled and only those over
+# PROFILE_SLOW_MS kept. The admin can switch it on for a while without a
+# restart; the toggle file is signed so only the admin's settings are obeyed.
+
+_serializer = URLSafeSerializer(SECRET_KEY, salt="profiling")
+
+_lock = threading.Lock()
+_active = {}  # thread id -> Counter of stacks, for requests being sampled
+_wakeup = threading.Event()
+_state = {"server": None, "sampler": None, "toggle": None, "toggle_checked": 0.0, "toggle_mtime": None}
+
+TOGGLE_CHECK_INTERVAL = 1.0  # seconds between stat() calls on the toggle file
+
+
+# --- Settings ---
+
+def write_toggle(rate, slow_ms, minutes):
+    """Turn profiling on for every server process for the next `minutes` (0 = off)."""
+    settings = {"rate": rate, "slow_ms": slow_ms, "until": time.time() + minutes * 60 if minutes else 0}
+    PROFILING_TOGGLE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = PROFILING_TOGGLE_FILE.with_suffix(".tmp")
+    tmp.write_text(_serializer.dumps(settings))
+    os.replace(tmp, PROFILING_TOGGLE_FILE)
+
+
+def _read_toggle():
+    now = time.monotonic()
+    if now - _state["toggle_checked"] < TOGGLE_CHECK_INTERVAL:
+        return _state["toggle"]
+    _state["toggle_checked"] = now
+    try:
+        mtime = PROFILING_TOGGLE_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
+        _state["toggle"] = _state["toggle_mtime"] = None
+        return None
+    if mtime != _state["toggle_mtime"]:
+        _state["toggle_mtime"] = mtime
+        try:
+            _state["toggle"] = _serializer.loads(PROFILING_TOGGLE_FILE.read_text())
+        except (OSError, BadSignature):
+            logger.warning("ignoring toggle file with a bad signature")
+            _state["toggle"] = None
+    return _state["toggle"]
+
+
+def settings():
+    """(rate, slow_ms, source) currently in force; source is None when off."""
+    if PROFILE_RATE or PROFILE_SLOW_MS:
+        return PROFILE_RATE, PROFILE_SLOW_MS, "env"
+    toggle = _read_toggle()
+    if toggle and toggle["until"] > time.time() and (toggle["rate"] or toggle["slow_ms"]):
+        return toggle["rate"], toggle["slow_ms"], "admin"
+    return 0.0, 0, None
+
+
+def toggle_until():
+    """When the admin toggle switches itself off (epoch seconds), or None."""
+    toggle = _read_toggle()
+    return toggle["until"] if toggle and toggle["until"] > time.time() else None
+
+
+# --- Sampling ---
+
+def _frame_name(frame):
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+
+def _sample_loop():
+    interval = PROFILE_INTERVAL_MS / 1000
+    while True:
+        _wakeup.wait()
+        time.sleep(interval)
+        with _lock:
+            targets = list(_active.items())
+            if not targets:
+                _wakeup.clear()
+                continue
+        frames = sys._current_frames()
+        for thread_id, samples in targets:
+            frame = frames.get(thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                samples[";".join(reversed(stack))] += 1
+
+
+def _start(thread_id):
+    with _lock:
+        if _state["sampler"] is None:
+            _state["sampler"] = threading.Thread(target=_sample_loop, name="profiler", daemon=True)
+            _state["sampler"].start()
+        _active[thread_id] = Counter()
+    _wakeup.set()
+
+
+def _stop(thread_id):
+    with _lock:
+        return _active.pop(thread_id, None)
+
+
+# --- Storage ---
+
+def _save(samples, info):
+    now = time.time()
+    profile_id = (f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{int(now * 1000) % 1000:03d}"
+                  f"-{info['server']}-{os.getpid()}")
+    info = dict(info, id=profile_id, samples=sum(samples.values()), interval_ms=PROFILE_INTERVAL_MS)
+    try:
+        PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+        with open(PROFILES_DIR / f"{profile_id}.folded", "w") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        (PROFILES_DIR / f"{profile_id}.json").write_text(json.dumps(info))
+        _prune()
+    except OSError as e:
+        logger.warning("could not save profile: %s", e)
+
+
+def _prune():
+    summaries = sorted(PROFILES_DIR.glob("*.json"))
+    for old in summaries[:max(len(summaries) - PROFILE_KEEP, 0)]:
+        old.unlink(missing_ok=True)
+        old.with_suffix(".folded").unlink(missing_ok=True)
+
+
+def list_profiles():
+    """Summaries of saved profiles, slowest first."""
+    profiles = []
+    for path in PROFILES_DIR.glob("*.json"):
+        try:
+            profiles.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return sorted(profiles, key=lambda p: p["duration_ms"], reverse=True)
+
+
+def load_profile(profile_id):
+    """(summary, {stack: count}) for a saved profile, or (None, None)."""
+    if "/" in profile_id or profile_id.startswith("."):
+        return None, None
+    try:
+        info = json.loads((PROFILES_DIR / f"{profile_id}.json").read_text())
+        samples = {}
+        with open(PROFILES_DIR / f"{profile_id}.folded") as f:
+            for line in f:
+                stack, _, count = line.rstrip("\n").rpartition(" ")
+                samples[stack] = int(count)
+    except (OSError, ValueError):
+        return None, None
+    return info, samples
+
+
+def top_functions(samples, limit=25):
+    """[(function, self samples, total samples)] ordered by self samples."""
+    own, total = Counter(), Counter()
+    for stack, count in samples.items():
+        frames = stack.split(";")
+        own[frames[-1]] += count
+        for name in set(frames):
+            total[name] += count
+    return [(name, count, total[name]) for name, count in own.most_common(limit)]
+
+
+# --- Flask integration ---
+
+def init_app(app, server):
+    """Sample requests of a Flask app according to settings()."""
+    from flask import g, request
+
+    _state["server"] = server
+
+    @app.before_request
+    def _maybe_profile():
+        rate, slow_ms, source = settings()
+        if source is None:
+            return
+        chosen = rate and random.random() < rate
+        if chosen or slow_ms:
+            g.profile = {"started": time.perf_counter(), "chosen": bool(chosen), "slow_ms": slow_ms}
+            _start(threading.get_ident())
+
+    @app.after_request
+    def _note_status(response):
+        if "profile" in g:
+            g.profile["status"] = response.status_code
+        return response
+
+    @app.teardown_request
+    def _finish_profile(exc):
+        profile = g.pop("profile", None)
+        if profile is None:
+            return
+        samples = _stop(threading.get_ident())
+        duration_ms = (time.perf_counter() - profile["started"]) * 1000
+        slow = profile["slow_ms"] and duration_ms >= profile["slow_ms"]
+        if not samples or not (profile["chosen"] or slow):
+            return
+        _save(samples, {
+            "server": server,
+            "method": request.method,
+            # The route pattern, so RSVP tokens never end up in profile files
+            "path": request.url_rule.rule if request.url_rule else "(unmatched)",
+            "endpoint": request.endpoint,
+            "status": profile.get("status", 500),
+            "duration_ms": round(duration_ms, 1),
+            "reason": "slow" if slow else "sampled",
+            "at": time.time(),
+        })
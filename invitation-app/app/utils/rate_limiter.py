@@ -0,0 +1,76 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+class TokenBucketLimiter:
+    """Token-bucket rate limiter shared by every process through SQLite.
+
+    Each key holds one fixed-size row (tokens left, last refill time), so
+    memory and disk stay O(1) per client. Rows idle for longer than idle_ttl
+    are evicted, and the table is trimmed to max_keys least-recently-used
+    rows, so scanning from many addresses can't grow it without bound. An
+    evicted key starts again with a full bucket, which is what it would have
+    refilled to anyway as long as idle_ttl covers a full refill.
+    """
+
+    def __init__(self, path, capacity, per_seconds, max_keys=10000, idle_ttl=None):
+        self.path = Path(path)
+        self.capacity = float(capacity)
+        self.refill_rate = capacity / float(per_seconds)
+        self.max_keys = max_keys
+        self.idle_ttl = max(idle_ttl or 0, per_seconds)
+        self._local = threading.local()
+        self._calls = 0
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS buckets_updated ON buckets (updated)")
+            self._local.conn = conn
+        return conn
+
+    def allow(self, key, cost=1):
+        """Take cost tokens from key's bucket. Returns False if it is empty."""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                tokens = self.capacity
+            else:
+                tokens = min(self.capacity, row[0] + (now - row[1]) * self.refill_rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            self._calls += 1
+            if self._calls % 256 == 0:
+                self._evict(conn, now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM buckets WHERE updated < ?", (now - self.idle_ttl,))
+        conn.execute(
+            "DELETE FROM buckets WHERE key IN ("
+            "SELECT key FROM buckets ORDER BY updated DESC LIMIT -1 OFFSET ?)",
+            (self.max_keys,),
+        )
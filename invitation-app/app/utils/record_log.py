@@ -0,0 +1,231 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from app.utils.file_lock import _lock_exclusive, _lock_shared, _unlock
+
+# Marker field of the line appended by remove()
+TOMBSTONE = "_removed"
+
+# Compact once the log holds this many times more lines than live records
+COMPACT_RATIO = 2
+COMPACT_MIN_LINES = 64
+
+
+class _Index:
+    """Byte offsets of the latest line for each key in one log file."""
+
+    def __init__(self, ino):
+        self.ino = ino
+        self.size = 0  # bytes indexed so far
+        self.lines = 0
+        self.offsets = {}  # key -> (offset, length); dict order = first seen
+
+
+_indexes = {}  # path -> _Index
+_indexes_lock = threading.Lock()
+
+
+class RecordLog:
+    """Append-only JSON Lines file of records identified by one field.
+
+    Each change appends the full record as a new line; the last line for a
+    key wins, and a tombstone line removes it. A per-process offset index
+    (extended incrementally as the file grows, rebuilt if another process
+    compacts it) lets single records be read without parsing the whole
+    file. Writers hold an exclusive flock on the log; compaction rewrites
+    it once superseded lines dominate.
+    """
+
+    def __init__(self, path, key):
+        self.path = Path(path)
+        self.key = key
+
+    @contextmanager
+    def _open(self, exclusive, create=True):
+        """The log file, locked shared or exclusive.
+
+        An exclusive open with create=False yields None if the log doesn't
+        exist or is deleted while waiting for the lock, so a writer racing
+        delete() can't recreate it.
+        """
+        if not exclusive:
+            with open(self.path, "rb") as f:
+                _lock_shared(f)
+                try:
+                    yield f
+                finally:
+                    _unlock(f)
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        while True:
+            try:
+                f = open(self.path, "a+b" if create else "r+b")
+            except FileNotFoundError:
+                yield None
+                return
+            _lock_exclusive(f)
+            # A compaction may have renamed a new file into place while we
+            # waited; writing to the old inode would lose the change.
+            try:
+                current = os.stat(self.path).st_ino == os.fstat(f.fileno()).st_ino
+            except FileNotFoundError:
+                current = False
+            if current:
+                break
+            _unlock(f)
+            f.close()
+        try:
+            yield f
+        finally:
+            _unlock(f)
+            f.close()
+
+    def _index(self, f):
+        """Bring this file's index up to date with what's on disk."""
+        st = os.fstat(f.fileno())
+        with _indexes_lock:
+            index = _indexes.get(str(self.path))
+            if index is None or index.ino != st.st_ino or st.st_size < index.size:
+                index = _indexes[str(self.path)] = _Index(st.st_ino)
+            if st.st_size > index.size:
+                f.seek(index.size)
+                offset = index.size
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn write from a crashed writer; ignored
+                    if line.strip():
+                        record = json.loads(line)
+                        if record.get(TOMBSTONE):
+                            index.offsets.pop(record[self.key], None)
+                        else:
+                            index.offsets[record[self.key]] = (offset, len(line))
+                        index.lines += 1
+                    offset += len(line)
+                index.size = offset
+            return index
+
+    @staticmethod
+    def _read_at(f, offset, length):
+        f.seek(offset)
+        return json.loads(f.read(length))
+
+    def exists(self):
+        return self.path.exists()
+
+    def keys(self):
+        if not self.path.exists():
+            return []
+        with self._open(exclusive=False) as f:
+            return list(self._index(f).offsets)
+
+    def all(self):
+        """Latest version of every record, in the order keys first appeared."""
+        if not self.path.exists():
+            return []
+        with self._open(exclusive=False) as f:
+            index = self._index(f)
+            return [self._read_at(f, off, length) for off, length in index.offsets.values()]
+
+    def get(self, key):
+        if not self.path.exists():
+            return None
+        with self._open(exclusive=False) as f:
+            entry = self._index(f).offsets.get(key)
+            return self._read_at(f, *entry) if entry else None
+
+    def find(self, field, value):
+        """First live record whose field equals value (a full scan)."""
+        for record in self.all():
+            if record.get(field) == value:
+                return record
+        return None
+
+    def _append(self, f, records):
+        f.seek(0, os.SEEK_END)
+        data = b"".join(
+            json.dumps(r, separators=(",", ":"), default=str).encode() + b"\n" for r in records
+        )
+        f.write(data)
+        f.flush()
+
+    def append(self, records):
+        """Add or replace records. Only the new lines are written.
+
+        Does nothing if the log has been deleted.
+        """
+        if not records:
+            return
+        with self._open(exclusive=True, create=False) as f:
+            if f is None:
+                return
+            self._append(f, records)
+            self._maybe_compact(f)
+
+    def update(self, key, change):
+        """Apply change(record) to the latest version of key and append it.
+
+        Returns the updated record, or None if the key isn't in the log.
+        """
+        with self._open(exclusive=True, create=False) as f:
+            entry = self._index(f).offsets.get(key) if f else None
+            if entry is None:
+                return None
+            record = self._read_at(f, *entry)
+            change(record)
+            self._append(f, [record])
+            self._maybe_compact(f)
+            return record
+
+    def remove(self, key):
+        """Drop a record by appending a tombstone. Returns the removed record."""
+        with self._open(exclusive=True, create=False) as f:
+            entry = self._index(f).offsets.get(key) if f else None
+            if entry is None:
+                return None
+            record = self._read_at(f, *entry)
+            self._append(f, [{self.key: key, TOMBSTONE: True}])
+            self._maybe_compact(f)
+            return record
+
+    def _maybe_compact(self, f):
+        index = self._index(f)
+        if index.lines >= COMPACT_MIN_LINES and index.lines > COMPACT_RATIO * len(index.offsets):
+            records = [self._read_at(f, off, length) for off, length in index.offsets.values()]
+            self._replace(records)
+
+    def rewrite(self, records):
+        """Replace the log with exactly these records (compaction, migration)."""
+        with self.exclusive() as replace:
+            replace(records)
+
+    @contextmanager
+    def exclusive(self):
+        """Hold the writers' lock across a check and a rewrite.
+
+        Yields a function that replaces the log's records like rewrite(),
+        which can't be called inside: flock doesn't nest across opens.
+        """
+        with self._open(exclusive=True):
+            yield self._replace
+
+    def _replace(self, records):
+        # Renamed into place: readers holding the old file finish against it,
+        # and the next open (or waiting writer) sees the new inode.
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            self._append(f, records)
+            os.fsync(f.fileno())
+        tmp.replace(self.path)
+
+    def delete(self):
+        # Under the lock, so a writer mid-update finishes first; writers
+        # still waiting find the file gone and don't recreate it
+        with self._open(exclusive=True, create=False) as f:
+            if f is not None:
+                self.path.unlink()
+        with _indexes_lock:
+            _indexes.pop(str(self.path), None)
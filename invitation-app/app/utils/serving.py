@@ -0,0 +1,56 @@
+import sys
+
+
+def run_production(app_module, bind, workers, threads, timeout, max_requests=1000):
+    """Serve a WSGI app under gunicorn's pre-forking server.
+
+    app_module is an import string like "public_server:app". Workers import
+    it after forking, so each gets its own SQLite connections and no state
+    leaks from the master. Workers are recycled after max_requests (with
+    jitter so they don't all restart together); SIGHUP to the master does a
+    graceful reload and SIGTERM a graceful shutdown.
+    """
+    from gunicorn.app.base import BaseApplication
+    from gunicorn.util import import_app
+
+    class _Server(BaseApplication):
+        def load_config(self):
+            for key, value in {
+                "bind": bind,
+                "workers": workers,
+                "threads": threads,
+                "worker_class": "gthread" if threads > 1 else "sync",
+                "timeout": timeout,
+                "graceful_timeout": timeout,
+                "max_requests": max_requests,
+                "max_requests_jitter": max(max_requests // 10, 1),
+                # Requests are logged by the app through json_log's queue instead
+                "accesslog": None,
+                "errorlog": "-",
+                "proc_name": app_module.split(":")[0],
+            }.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return import_app(app_module)
+
+    _Server().run()
+
+
+def main(app, app_module, host, port, workers, threads, timeout, commands=None):
+    """Entry point shared by admin_server.py and public_server.py.
+
+    `python <server>.py serve` runs under gunicorn; no argument keeps the
+    Flask development server for local hacking. commands maps extra
+    subcommand names to zero-argument callables (e.g. offline maintenance).
+    """
+    commands = commands or {}
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        run_production(app_module, f"{host}:{port}", workers, threads, timeout)
+    elif len(sys.argv) > 1 and sys.argv[1] in commands:
+        commands[sys.argv[1]]()
+    elif len(sys.argv) > 1:
+        expected = ", ".join(repr(c) for c in ["serve", *commands])
+        sys.exit(f"Unknown command: {sys.argv[1]} (expected {expected})")
+    else:
+        app.run(host=host, port=port, debug=False)
@@ -62,6 +62,7 @@ rsync -a \
     --exclude='*.pyc' \
     --exclude='.claude/' \
     --exclude='backup.log' \
+    --exclude='cache/' \
     "$APP_DIR/" "$DEST_PATH/"
 
 echo "$(date '+%Y-%m-%d %H:%M:%S') Backup complete: ${DEST_PATH}"
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""Time the app's hot paths against a synthetic dataset.
+
+    python -m perf.bench --events 500 --invitees 200
+    python -m perf.bench --data /tmp/invitations     # reuse a perf.datagen directory
+
+Results go to stdout as JSON (and to --output if given): per benchmark the
+number of runs and min/median/p95/max/mean in milliseconds, plus the dataset
+size, so runs can be diffed against each other. Email and SMS transports are
+replaced by in-process stubs and send quotas are lifted, so the send loop
+measures the app itself.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+
+def _environment(data_dir):
+    """Settings that must be in place before app.config is imported."""
+    os.environ["DATA_DIR"] = str(data_dir)
+    os.environ.setdefault("ACCESS_LOG", "0")
+    os.environ.setdefault("GMAIL_ADDRESS", "bench@example.com")
+    os.environ.setdefault("GMAIL_APP_PASSWORD", "bench")
+    os.environ.setdefault("SMS_GATEWAY_URL", "http://127.0.0.1:9/api")
+    os.environ.setdefault("SMS_GATEWAY_LOGIN", "bench")
+    os.environ.setdefault("SMS_GATEWAY_PASSWORD", "bench")
+    for name in ("GMAIL_RATE_PER_MINUTE", "SMS_RATE_PER_MINUTE"):
+        os.environ[name] = "1000000"
+    for name in ("GMAIL_DAILY_LIMIT", "SMS_DAILY_LIMIT"):
+        os.environ[name] = "100000000"
+
+
+class _StubSMTP:
+    def sendmail(self, from_addr, to_addr, msg):
+        return {}
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _stub_transports():
+    from app.services import email_service, sms_service
+
+    email_service._create_smtp = lambda *args, **kwargs: _StubSMTP()
+    sms_service._send_gateway_message = lambda *args, **kwargs: None
+
+
+def measure(fn, repeat, setup=None, teardown=None):
+    """Run fn repeat times; returns timing stats in milliseconds."""
+    samples = []
+    for i in range(repeat):
+        arg = setup(i) if setup else None
+        started = time.perf_counter()
+        fn(arg) if setup else fn()
+        samples.append((time.perf_counter() - started) * 1000)
+        if teardown:
+            teardown(arg)
+    return summarize(samples)
+
+
+def summarize(samples):
+    """min/median/p95/max/mean of millisecond samples."""
+    samples = sorted(samples)
+    return {
+        "runs": len(samples),
+        "min_ms": round(samples[0], 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(int(len(samples) * 0.95), len(samples) - 1)], 3),
+        "max_ms": round(samples[-1], 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR, capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(data_dir, repeat, send_invitees, only=None):
+    from app.config import CONTACTS_FILE, INVITATION_TEMPLATES_DIR
+    from app.services import contact_service, email_service, event_service, read_model
+
+    _stub_transports()
+    tokens = json.loads((Path(data_dir) / "bench_tokens.json").read_text())
+    if not tokens:
+        sys.exit("Dataset has no invitees")
+
+    started = time.perf_counter()
+    import admin_server
+    admin_startup_ms = (time.perf_counter() - started) * 1000
+    admin = admin_server.app.test_client()
+
+    def token(i):
+        return tokens[i % len(tokens)]
+
+    contacts_backup = CONTACTS_FILE.read_bytes()
+
+    def restore_contacts(_):
+        CONTACTS_FILE.write_bytes(contacts_backup)
+
+    def import_csv(i):
+        rows = ["name,email,phone,tags"]
+        for n in range(1000):
+            # Every other row repeats an existing address and is skipped
+            email = f"guest{n * 2}@example.com" if n % 2 else f"new{i}-{n}@example.com"
+            rows.append(f"Imported {n},{email},,Bench")
+        return "\n".join(rows)
+
+    template_html = (INVITATION_TEMPLATES_DIR / "birthday_adult.html").read_text()
+    sample_event = event_service.get_event(tokens[0]["event_id"])
+    sample_invitee = sample_event["invitees"][0]
+
+    def send_event(i):
+        contacts = contact_service.get_all_contacts()[:send_invitees]
+        contacts = [dict(c, send_method="both" if c["email"] and c["phone"] else "email") for c in contacts]
+        return event_service.create_event(
+            f"Send bench {i}", "Bench", "2099-01-01", "18:00", "Here", "Hi", "birthday_adult", contacts=contacts,
+        )["id"]
+
+    benchmarks = {
+        "get_event_by_token": (lambda i: event_service.get_event_by_token(token(i)["token"]), None, repeat),
+        "get_event_by_short_token": (
+            lambda i: event_service.get_event_by_short_token(token(i)["short_token"]), None, repeat),
+        "read_model.get_by_token": (lambda i: read_model.get_by_token(token(i)["token"]), None, repeat),
+        "update_rsvp": (lambda i: event_service.update_rsvp(token(i)["token"], "maybe"), None, repeat),
+        "update_rsvp_with_event_id": (
+            lambda i: event_service.update_rsvp(token(i)["token"], "accepted", event_id=token(i)["event_id"]),
+            None, repeat),
+        "dashboard": (lambda i: admin.get("/"), None, max(repeat // 4, 1)),
+        "search_contacts": (lambda i: contact_service.search_contacts(("müller", "guest12", "vip")[i % 3]),
+                            None, repeat),
+        "import_contacts_csv": (contact_service.import_contacts_csv, restore_contacts, max(repeat // 4, 1)),
+        "render_invitation_email": (
+            lambda i: email_service.render_invitation_email(template_html, sample_event, sample_invitee,
+                                                            "https://example.com/rsvp/x"),
+            None, repeat),
+        "send_invitations": (lambda event_id: admin.post(f"/events/{event_id}/send"), None, max(repeat // 10, 1)),
+    }
+    setups = {"import_contacts_csv": import_csv, "send_invitations": send_event}
+
+    results = {}
+    for name, (fn, teardown, runs) in benchmarks.items():
+        if only and name not in only:
+            continue
+        setup = setups.get(name, lambda i: i)
+        results[name] = measure(fn, runs, setup=setup, teardown=teardown)
+        print(f"{name:28s} median {results[name]['median_ms']:10.3f} ms", file=sys.stderr)
+    results["admin_startup"] = {"runs": 1, "median_ms": round(admin_startup_ms, 3)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", help="existing perf.datagen directory (default: generate a temporary one)")
+    parser.add_argument("--events", type=int, default=100)
+    parser.add_argument("--invitees", type=int, default=100)
+    parser.add_argument("--contacts", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=40, help="runs per fast benchmark (slow ones run fewer)")
+    parser.add_argument("--send-invitees", type=int, default=50, help="guests per send_invitations run")
+    parser.add_argument("--only", nargs="*", help="benchmark names to run")
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    scratch = None
+    if args.data:
+        data_dir = Path(args.data).resolve()
+        # Benchmarks write (RSVPs, sends, imports); never point them at real data
+        work = Path(tempfile.mkdtemp(prefix="invitation-bench-"))
+        shutil.copytree(data_dir, work, dirs_exist_ok=True)
+        data_dir = scratch = work
+        _environment(data_dir)
+    else:
+        data_dir = scratch = Path(tempfile.mkdtemp(prefix="invitation-bench-"))
+        _environment(data_dir)
+        from perf import datagen
+        started = time.perf_counter()
+        datagen.generate(data_dir, args.events, args.invitees, args.contacts or max(1000, args.invitees), args.seed)
+        print(f"Generated dataset in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    try:
+        # Sized before the run, which adds events of its own
+        dataset = {
+            "source": args.data,
+            "events": sum(1 for _ in (data_dir / "events").glob("*.json")),
+            "invitees_per_event": None if args.data else args.invitees,
+            "contacts": len(json.loads((data_dir / "contacts.json").read_text())),
+            "token_sample": len(json.loads((data_dir / "bench_tokens.json").read_text())),
+        }
+        results = run(data_dir, args.repeat, args.send_invitees, args.only)
+        report = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "dataset": dataset,
+            "results": results,
+        }
+    finally:
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Generate a synthetic data directory for benchmarks and load tests.
+
+    python -m perf.datagen --out /tmp/invitations --events 500 --invitees 200
+
+Writes contacts.json and events/ in the app's current storage layout
+(metadata file plus invitee log per event), builds the public read model and
+contact index, and saves a sample of RSVP tokens to bench_tokens.json for
+perf.bench and perf.loadgen. Run the servers against it with DATA_DIR=<out>.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+APP_DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+TOKEN_SAMPLE = 1000
+TEMPLATES = ("birthday_adult", "birthday_kid", "dinner_party", "generic_party")
+STATUSES = ("pending",) * 5 + ("accepted",) * 3 + ("declined", "maybe")
+FIRST = ("Ana", "Ben", "Chloe", "David", "Emma", "Felix", "Greta", "Hugo", "Ida", "Jonas", "Klara", "Leo")
+LAST = ("Müller", "Schmidt", "Meyer", "Weber", "Wagner", "Becker", "Schulz", "Hoffmann", "Koch", "Richter")
+TAGS = ("Family", "Friends", "Work", "Neighbours", "VIP", "School")
+
+
+def _hex(rng, nbytes):
+    return f"{rng.getrandbits(nbytes * 8):0{nbytes * 2}x}"
+
+
+def _short(rng):
+    alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+    return "".join(rng.choice(alphabet) for _ in range(8))
+
+
+def _iso(day, rng):
+    return f"{day.isoformat()}T{rng.randrange(24):02d}:{rng.randrange(60):02d}:00Z"
+
+
+def make_contacts(rng, count):
+    contacts = []
+    for i in range(count):
+        name = f"{rng.choice(FIRST)} {rng.choice(LAST)} {i}"
+        contacts.append({
+            "id": f"contact-{i:06d}",
+            "name": name,
+            "email": f"guest{i}@example.com" if i % 10 else "",
+            "phone": f"+4917{i:08d}" if i % 3 else "",
+            "tags": rng.sample(TAGS, rng.randrange(3)),
+            "created_at": "2024-01-01T00:00:00Z",
+        })
+    return contacts
+
+
+def _invitee(rng, contact, sent_day):
+    if not contact["email"]:
+        method = "sms"
+    elif not contact["phone"]:
+        method = "email"
+    else:
+        method = rng.choice(("email", "sms", "both"))
+    # Only events whose invitations already went out have responses
+    status = rng.choice(STATUSES) if sent_day else "pending"
+    sent_at = _iso(sent_day, rng) if sent_day else None
+    emailed = sent_at if method != "sms" else None
+    texted = sent_at if method != "email" else None
+    return {
+        "contact_id": contact["id"],
+        "name": contact["name"],
+        "email": contact["email"],
+        "phone": contact["phone"],
+        "token": _hex(rng, 32),
+        "short_token": _short(rng),
+        "send_method": method,
+        "status": status,
+        "responded_at": sent_at if status != "pending" else None,
+        "email_sent_at": emailed,
+        "sms_sent_at": texted,
+        "email_sent_via": "primary" if emailed else None,
+        "sms_sent_via": "primary" if texted else None,
+    }
+
+
+def generate(out, events, invitees, contacts=None, seed=1):
+    """Write a dataset into out (which must be the process's DATA_DIR)."""
+    from app.config import DATA_DIR
+    from app.services import event_service
+
+    out = Path(out)
+    if out.resolve() != DATA_DIR.resolve():
+        raise ValueError(f"DATA_DIR is {DATA_DIR}, not {out}; set it before importing app")
+    rng = random.Random(seed)
+    events_dir = out / "events"
+    events_dir.mkdir(parents=True, exist_ok=True)
+    for old in events_dir.glob("*"):
+        old.unlink()
+
+    people = make_contacts(rng, max(contacts or 0, invitees))
+    (out / "contacts.json").write_text(json.dumps(people, indent=2))
+
+    today = date.today()
+    sample = []
+    per_event_sample = max(TOKEN_SAMPLE // max(events, 1), 1)
+    for n in range(events):
+        event_id = f"bench-{n:05d}-{_hex(rng, 4)}"
+        day = today + timedelta(days=rng.randrange(-365, 365))
+        header = {
+            "id": event_id,
+            "title": f"Benchmark Party {n}",
+            "host": rng.choice(FIRST),
+            "date": day.isoformat(),
+            "time": f"{rng.randrange(12, 22)}:00",
+            "location": f"{rng.randrange(1, 200)} Example Street",
+            "message": "Join us for cake, music and good company! " * 3,
+            "template": rng.choice(TEMPLATES),
+            "photo": None,
+            "sender_profile": "primary",
+            "show_host": True,
+            "location_url": "",
+            "created_at": _iso(day - timedelta(days=30), rng),
+            "schema_version": event_service.SCHEMA_VERSION,
+        }
+        sent_day = day - timedelta(days=14) if day - timedelta(days=14) <= today else None
+        guests = [_invitee(rng, c, sent_day) for c in rng.sample(people, invitees)]
+        with open(events_dir / f"{event_id}.invitees.jsonl", "w") as f:
+            for inv in guests:
+                f.write(json.dumps(inv, separators=(",", ":")) + "\n")
+        (events_dir / f"{event_id}.json").write_text(json.dumps(header, indent=2))
+        for inv in rng.sample(guests, min(per_event_sample, len(guests))):
+            sample.append({"event_id": event_id, "token": inv["token"], "short_token": inv["short_token"]})
+
+    rng.shuffle(sample)
+    (out / "bench_tokens.json").write_text(json.dumps(sample[:TOKEN_SAMPLE]))
+
+    event_service.rebuild_read_model()
+    event_service.rebuild_contact_index()
+    return sample
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, help="data directory to (re)create")
+    parser.add_argument("--events", type=int, default=100, help="number of events (10-5000)")
+    parser.add_argument("--invitees", type=int, default=100, help="invitees per event (10-10000)")
+    parser.add_argument("--contacts", type=int, default=None, help="contacts (default: max(1000, invitees))")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if Path(args.out).resolve() == APP_DATA_DIR.resolve():
+        sys.exit(f"Refusing to overwrite the app's real data directory ({APP_DATA_DIR})")
+    # Must be set before anything imports app.config
+    os.environ["DATA_DIR"] = str(Path(args.out).resolve())
+    started = time.perf_counter()
+    generate(args.out, args.events, args.invitees, args.contacts or max(1000, args.invitees), args.seed)
+    print(f"Generated {args.events} event(s) x {args.invitees} invitee(s) in {args.out} "
+          f"({time.perf_counter() - started:.1f}s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
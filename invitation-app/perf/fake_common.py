@@ -0,0 +1,92 @@
+# Shared behaviour knobs for the fake SMTP server and SMS gateway:
+# response latency, random failures, and per-minute / daily throttling.
+
+import random
+import threading
+import time
+from collections import deque
+
+ACCEPT = "accept"
+ERROR = "error"
+THROTTLED = "throttled"
+DAILY_LIMIT = "daily_limit"
+
+
+def add_arguments(parser, default_port):
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=default_port)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every message")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random 0..N seconds per message")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of messages failed (0-1)")
+    parser.add_argument("--rate", type=int, default=0, help="messages per minute before throttling (0 = off)")
+    parser.add_argument("--daily", type=int, default=0, help="messages per 24h before refusing (0 = off)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible failures")
+    parser.add_argument("--stats-interval", type=float, default=10.0, help="seconds between stats lines")
+
+
+class Behaviour:
+    """Decides the fate of each message; safe to share between handler threads."""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, rate=0, daily=0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate = rate
+        self.daily = daily
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._minute = deque()
+        self._day = deque()
+        self.counts = {ACCEPT: 0, ERROR: 0, THROTTLED: 0, DAILY_LIMIT: 0}
+
+    @classmethod
+    def from_args(cls, args):
+        return cls(args.latency, args.jitter, args.error_rate, args.rate, args.daily, args.seed)
+
+    def delay(self):
+        with self._lock:
+            pause = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        if pause > 0:
+            time.sleep(pause)
+
+    def decide(self):
+        """Outcome for the next message: ACCEPT, ERROR, THROTTLED or DAILY_LIMIT."""
+        now = time.monotonic()
+        with self._lock:
+            while self._minute and self._minute[0] <= now - 60:
+                self._minute.popleft()
+            while self._day and self._day[0] <= now - 86400:
+                self._day.popleft()
+            if self.daily and len(self._day) >= self.daily:
+                outcome = DAILY_LIMIT
+            elif self.rate and len(self._minute) >= self.rate:
+                outcome = THROTTLED
+            elif self.error_rate and self._random.random() < self.error_rate:
+                outcome = ERROR
+            else:
+                outcome = ACCEPT
+                self._minute.append(now)
+                self._day.append(now)
+            self.counts[outcome] += 1
+        return outcome
+
+    def summary(self):
+        with self._lock:
+            return " ".join(f"{name}={count}" for name, count in self.counts.items())
+
+
+def report_periodically(name, behaviour, interval):
+    """Print the counters every interval seconds while they change."""
+    if interval <= 0:
+        return
+
+    def loop():
+        last = None
+        while True:
+            time.sleep(interval)
+            line = behaviour.summary()
+            if line != last:
+                print(f"[{name}] {line}", flush=True)
+                last = line
+
+    threading.Thread(target=loop, daemon=True).start()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""HTTP stand-in for the Android SMS Gateway app's message API.
+
+    python -m perf.fake_sms_gateway --port 8090 --latency 0.5 --rate 30 --log /tmp/sms.jsonl
+
+Implements POST /message, GET /message/<id> and GET /health with basic auth,
+under any path prefix (so both http://host:8090 and a cloud-style
+http://host:8090/3rdparty/v1 base URL work). Failures look like a phone in
+trouble:
+
+  --error-rate   500 Internal Server Error
+  --rate         429 Too Many Requests (per-minute limit)
+  --daily        429 Too Many Requests (24h limit)
+
+Point the app at it with SMS_GATEWAY_URL=http://127.0.0.1:8090 in .env.
+"""
+
+import argparse
+import base64
+import itertools
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from perf import fake_common
+
+
+class GatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def authorized(self):
+        server = self.server
+        if server.login is None and server.password is None:
+            return True
+        header = self.headers.get("Authorization", "")
+        if not header.startswith("Basic "):
+            return False
+        try:
+            login, _, password = base64.b64decode(header[6:]).decode().partition(":")
+        except ValueError:
+            return False
+        return ((server.login is None or login == server.login)
+                and (server.password is None or password == server.password))
+
+    def _route(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if not self.authorized():
+            self.send_json(401, {"message": "Unauthorized"})
+            return None, None
+        parts = path.split("/")
+        if parts[-1] == "health":
+            return "health", None
+        if parts[-1] == "message":
+            return "messages", None
+        if len(parts) >= 2 and parts[-2] == "message":
+            return "message", parts[-1]
+        return "unknown", None
+
+    def do_GET(self):
+        route, message_id = self._route()
+        if route is None:
+            return
+        if route == "health":
+            self.send_json(200, {"status": "pass"})
+        elif route == "message" and message_id in self.server.states:
+            self.send_json(200, self.server.states[message_id])
+        else:
+            self.send_json(404, {"message": "Not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        route, _ = self._route()
+        if route is None:
+            return
+        if route != "messages":
+            self.send_json(404, {"message": "Not found"})
+            return
+        try:
+            payload = json.loads(body)
+            phones = payload["phoneNumbers"]
+        except (ValueError, KeyError, TypeError):
+            self.send_json(400, {"message": "Invalid message"})
+            return
+        # Newer clients send textMessage.text, older ones a top-level message
+        text = (payload.get("textMessage") or {}).get("text") or payload.get("message") or ""
+
+        behaviour = self.server.behaviour
+        behaviour.delay()
+        outcome = behaviour.decide()
+        if outcome in (fake_common.THROTTLED, fake_common.DAILY_LIMIT):
+            limit = "daily" if outcome == fake_common.DAILY_LIMIT else "per-minute"
+            self.send_json(429, {"message": f"Too many requests ({limit} limit)"})
+        elif outcome == fake_common.ERROR:
+            self.send_json(500, {"message": "Failed to send message"})
+        else:
+            self.send_json(202, self.server.record(payload.get("id"), phones, text))
+
+
+class FakeGatewayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, behaviour, login=None, password=None, log=None):
+        super().__init__(address, GatewayHandler)
+        self.behaviour = behaviour
+        self.login = login
+        self.password = password
+        self.log = log
+        self.states = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def record(self, message_id, phones, text):
+        with self._lock:
+            message_id = message_id or f"fake-{next(self._ids)}"
+            state = {
+                "id": message_id,
+                "state": "Sent",
+                "recipients": [{"phoneNumber": phone, "state": "Sent"} for phone in phones],
+                "isHashed": False,
+                "isEncrypted": False,
+            }
+            self.states[message_id] = state
+            if self.log:
+                with open(self.log, "a") as f:
+                    f.write(json.dumps({"id": message_id, "to": phones, "text": text}) + "\n")
+        return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    fake_common.add_arguments(parser, default_port=8090)
+    parser.add_argument("--login", help="only accept this login (default: any)")
+    parser.add_argument("--password", help="only accept this password (default: any)")
+    parser.add_argument("--log", help="append accepted messages to this JSONL file")
+    args = parser.parse_args()
+
+    behaviour = fake_common.Behaviour.from_args(args)
+    server = FakeGatewayServer((args.host, args.port), behaviour,
+                               login=args.login, password=args.password, log=args.log)
+    print(f"Fake SMS gateway listening on http://{args.host}:{args.port}", flush=True)
+    fake_common.report_periodically("sms", behaviour, args.stats_interval)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"[sms] {behaviour.summary()}")
+
+
+if __name__ == "__main__":
+    main()
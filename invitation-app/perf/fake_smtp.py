@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""Local SMTP sink that behaves enough like Gmail for load tests.
+
+    python -m perf.fake_smtp --port 2525 --latency 0.3 --rate 60 --maildir /tmp/mail
+
+Speaks ESMTP with STARTTLS (self-signed certificate generated with openssl
+unless --cert/--key are given) and AUTH PLAIN/LOGIN, and records accepted
+messages. Failures mirror Gmail's replies, so the app's retry, back-off and
+circuit-breaker paths see what they would in production:
+
+  --error-rate   451 4.3.0 temporary failure
+  --rate         421 4.7.0 try again later, then the connection is closed
+  --daily        550 5.4.5 daily sending quota exceeded
+
+Point the app at it with SMTP_HOST=127.0.0.1 and SMTP_PORT=2525 in .env.
+"""
+
+import argparse
+import base64
+import binascii
+import itertools
+import shutil
+import socketserver
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from perf import fake_common
+
+HOSTNAME = "fake-smtp.local"
+MAX_SIZE = 35 * 1024 * 1024
+
+
+def make_certificate(directory):
+    """Self-signed certificate for localhost; returns (cert, key) paths."""
+    if not shutil.which("openssl"):
+        sys.exit("openssl not found; pass --cert and --key instead")
+    cert, key = Path(directory) / "cert.pem", Path(directory) / "key.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "30",
+         "-subj", "/CN=localhost", "-keyout", str(key), "-out", str(cert)],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    # Gmail-style deadline for an idle client
+    timeout = 300
+
+    def setup(self):
+        super().setup()
+        self.tls = False
+        self.user = None
+        self.mail_from = None
+        self.recipients = []
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+        self.wfile.flush()
+
+    def readline(self):
+        line = self.rfile.readline(MAX_SIZE + 3)
+        if not line:
+            raise ConnectionResetError
+        return line.rstrip(b"\r\n").decode("utf-8", errors="replace")
+
+    def handle(self):
+        try:
+            self.reply(f"220 {HOSTNAME} ESMTP ready")
+            while True:
+                line = self.readline()
+                verb, _, arg = line.partition(" ")
+                handler = getattr(self, f"smtp_{verb.upper()}", None)
+                if handler is None:
+                    self.reply("502 5.5.1 Unrecognized command.")
+                elif handler(arg.strip()) is False:
+                    return
+        except (ConnectionError, TimeoutError, ssl.SSLError, OSError):
+            return
+
+    def smtp_EHLO(self, arg):
+        features = ["8BITMIME", f"SIZE {MAX_SIZE}", "ENHANCEDSTATUSCODES"]
+        features.append("AUTH LOGIN PLAIN" if self.tls else "STARTTLS")
+        lines = [HOSTNAME] + features
+        for line in lines[:-1]:
+            self.reply(f"250-{line}")
+        self.reply(f"250 {lines[-1]}")
+
+    def smtp_HELO(self, arg):
+        self.reply(f"250 {HOSTNAME}")
+
+    def smtp_STARTTLS(self, arg):
+        if self.tls:
+            self.reply("503 5.5.1 TLS already active.")
+            return
+        self.reply("220 2.0.0 Ready to start TLS")
+        self.request = self.server.tls_context.wrap_socket(self.request, server_side=True)
+        self.rfile = self.request.makefile("rb")
+        self.wfile = self.request.makefile("wb")
+        self.tls = True
+        self.user = None
+
+    def smtp_AUTH(self, arg):
+        if not self.tls:
+            self.reply("530 5.7.0 Must issue a STARTTLS command first.")
+            return
+        mechanism, _, initial = arg.partition(" ")
+        try:
+            if mechanism.upper() == "PLAIN":
+                if not initial:
+                    self.reply("334 ")
+                    initial = self.readline()
+                _, user, password = base64.b64decode(initial).decode().split("\0")
+            elif mechanism.upper() == "LOGIN":
+                if not initial:
+                    self.reply("334 VXNlcm5hbWU6")
+                    initial = self.readline()
+                user = base64.b64decode(initial).decode()
+                self.reply("334 UGFzc3dvcmQ6")
+                password = base64.b64decode(self.readline()).decode()
+            else:
+                self.reply("504 5.7.4 Unrecognized authentication type.")
+                return
+        except (ValueError, binascii.Error):
+            self.reply("501 5.5.2 Cannot decode response.")
+            return
+        if not self.server.check_credentials(user, password):
+            self.reply("535 5.7.8 Username and Password not accepted.")
+            return
+        self.user = user
+        self.reply("235 2.7.0 Accepted")
+
+    def smtp_MAIL(self, arg):
+        if self.user is None:
+            self.reply("530 5.7.0 Authentication Required.")
+            return
+        self.mail_from = arg.partition(":")[2].strip().split(" ")[0].strip("<>")
+        self.recipients = []
+        self.reply("250 2.1.0 OK")
+
+    def smtp_RCPT(self, arg):
+        if self.mail_from is None:
+            self.reply("503 5.5.1 MAIL first.")
+            return
+        self.recipients.append(arg.partition(":")[2].strip().strip("<>"))
+        self.reply("250 2.1.5 OK")
+
+    def smtp_DATA(self, arg):
+        if not self.recipients:
+            self.reply("503 5.5.1 RCPT first.")
+            return
+        self.reply("354 Go ahead")
+        lines = []
+        while True:
+            line = self.rfile.readline(MAX_SIZE + 3)
+            if not line:
+                raise ConnectionResetError
+            if line in (b".\r\n", b".\n"):
+                break
+            lines.append(line[1:] if line.startswith(b"..") else line)
+        self.server.behaviour.delay()
+        outcome = self.server.behaviour.decide()
+        mail_from, recipients = self.mail_from, self.recipients
+        self.mail_from, self.recipients = None, []
+        if outcome == fake_common.THROTTLED:
+            self.reply("421 4.7.0 Try again later, closing connection.")
+            return False
+        if outcome == fake_common.DAILY_LIMIT:
+            self.reply("550 5.4.5 Daily user sending quota exceeded.")
+        elif outcome == fake_common.ERROR:
+            self.reply("451 4.3.0 Mail server temporarily rejected message.")
+        else:
+            message_id = self.server.record(mail_from, recipients, b"".join(lines))
+            self.reply(f"250 2.0.0 OK {message_id}")
+
+    def smtp_RSET(self, arg):
+        self.mail_from, self.recipients = None, []
+        self.reply("250 2.1.5 Flushed")
+
+    def smtp_NOOP(self, arg):
+        self.reply("250 2.0.0 OK")
+
+    def smtp_QUIT(self, arg):
+        self.reply("221 2.0.0 closing connection")
+        return False
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, behaviour, cert, key, user=None, password=None, maildir=None):
+        super().__init__(address, SMTPHandler)
+        self.behaviour = behaviour
+        self.tls_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        self.tls_context.load_cert_chain(cert, key)
+        self.user = user
+        self.password = password
+        self.maildir = Path(maildir) if maildir else None
+        if self.maildir:
+            self.maildir.mkdir(parents=True, exist_ok=True)
+        self._ids = itertools.count(1)
+
+    def check_credentials(self, user, password):
+        # Without --user/--password any login is accepted
+        if self.user is not None and user != self.user:
+            return False
+        return self.password is None or password == self.password
+
+    def record(self, mail_from, recipients, data):
+        message_id = f"{int(time.time())}-{next(self._ids)}"
+        if self.maildir:
+            envelope = f"X-Envelope-From: {mail_from}\r\nX-Envelope-To: {', '.join(recipients)}\r\n"
+            (self.maildir / f"{message_id}.eml").write_bytes(envelope.encode() + data)
+        return message_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    fake_common.add_arguments(parser, default_port=2525)
+    parser.add_argument("--cert", help="PEM certificate (default: generate a self-signed one)")
+    parser.add_argument("--key", help="PEM private key for --cert")
+    parser.add_argument("--user", help="only accept this login (default: any)")
+    parser.add_argument("--password", help="only accept this password (default: any)")
+    parser.add_argument("--maildir", help="save accepted messages here as .eml files")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="fake-smtp-") as scratch:
+        cert, key = (args.cert, args.key) if args.cert else make_certificate(scratch)
+        behaviour = fake_common.Behaviour.from_args(args)
+        server = FakeSMTPServer((args.host, args.port), behaviour, cert, key,
+                                user=args.user, password=args.password, maildir=args.maildir)
+        print(f"Fake SMTP listening on {args.host}:{args.port}", flush=True)
+        fake_common.report_periodically("smtp", behaviour, args.stats_interval)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            print(f"[smtp] {behaviour.summary()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""Replay guest traffic against a running public server.
+
+    python -m perf.datagen --out /tmp/invitations --events 50 --invitees 200
+    DATA_DIR=/tmp/invitations python public_server.py serve     # in another shell
+    python -m perf.loadgen --data /tmp/invitations --concurrency 50 --duration 30
+
+Each virtual guest does what someone tapping an SMS link does: follows the
+short link (/r/<short>), loads the RSVP page it redirects to, and with
+probability --respond-rate submits a response. Guests come from distinct
+client addresses (sent as CF-Connecting-IP, which the server trusts from
+localhost) so the per-client rate limit behaves as it would for real guests;
+--clients caps how many addresses are used, --clients 1 puts everyone behind
+one address.
+
+Reports throughput, p50/p95/p99 latency per request kind, server errors,
+connection errors and 429s, as a table on stderr and JSON on stdout.
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import requests
+
+KINDS = ("short", "page", "respond")
+STATUSES = ("accepted", "declined", "maybe")
+
+
+class Recorder:
+    """Latencies and outcomes per request kind, shared by all workers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {kind: [] for kind in KINDS}
+        self.outcomes = {kind: {"ok": 0, "rate_limited": 0, "client_error": 0, "server_error": 0, "failed": 0}
+                         for kind in KINDS}
+
+    def add(self, kind, seconds, outcome):
+        with self._lock:
+            self.latencies[kind].append(seconds)
+            self.outcomes[kind][outcome] += 1
+
+
+def _outcome(status, expected):
+    if status == expected:
+        return "ok"
+    if status == 429:
+        return "rate_limited"
+    if status >= 500:
+        return "server_error"
+    return "client_error"
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def _client_ip(n):
+    return f"10.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}"
+
+
+class Guest(threading.Thread):
+    def __init__(self, number, args, tokens, recorder, stop_at, counter):
+        super().__init__(daemon=True)
+        self.number = number
+        self.args = args
+        self.tokens = tokens
+        self.recorder = recorder
+        self.stop_at = stop_at
+        self.counter = counter
+        self.random = random.Random(args.seed * 100003 + number)
+        self.session = requests.Session()
+
+    def request(self, kind, method, path, expected, ip, data=None):
+        started = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, self.args.url + path, data=data, allow_redirects=False,
+                headers={"CF-Connecting-IP": ip}, timeout=self.args.timeout,
+            )
+            response.content
+            outcome = _outcome(response.status_code, expected)
+        except requests.RequestException:
+            response, outcome = None, "failed"
+        self.recorder.add(kind, time.perf_counter() - started, outcome)
+        return response if outcome == "ok" else None
+
+    def visit(self):
+        index = self.random.randrange(len(self.tokens))
+        entry = self.tokens[index]
+        # The same guest always comes from the same address
+        ip = _client_ip(index % (self.args.clients or len(self.tokens)))
+
+        if not self.request("short", "GET", f"/r/{entry['short_token']}", 302, ip):
+            return
+        self.request("page", "GET", f"/rsvp/{entry['token']}", 200, ip)
+        if self.random.random() < self.args.respond_rate:
+            if self.args.think:
+                time.sleep(self.random.uniform(0, self.args.think))
+            self.request("respond", "POST", f"/rsvp/{entry['token']}/respond", 302, ip,
+                         data={"status": self.random.choice(STATUSES)})
+
+    def run(self):
+        while time.monotonic() < self.stop_at and self.counter.take():
+            self.visit()
+            if self.args.think:
+                time.sleep(self.random.uniform(0, self.args.think))
+        self.session.close()
+
+
+class VisitCounter:
+    """Hands out the --visits budget across workers (unlimited when None)."""
+
+    def __init__(self, limit):
+        self._remaining = limit
+        self._lock = threading.Lock()
+
+    def take(self):
+        if self._remaining is None:
+            return True
+        with self._lock:
+            if self._remaining <= 0:
+                return False
+            self._remaining -= 1
+            return True
+
+
+def summarize(recorder, elapsed):
+    results = {}
+    total = 0
+    for kind in KINDS:
+        ordered = sorted(recorder.latencies[kind])
+        total += len(ordered)
+        results[kind] = {
+            "requests": len(ordered),
+            **recorder.outcomes[kind],
+            "p50_ms": _ms(_percentile(ordered, 0.50)),
+            "p95_ms": _ms(_percentile(ordered, 0.95)),
+            "p99_ms": _ms(_percentile(ordered, 0.99)),
+            "max_ms": _ms(ordered[-1] if ordered else None),
+        }
+    everything = sorted(t for kind in KINDS for t in recorder.latencies[kind])
+    outcomes = {key: sum(recorder.outcomes[kind][key] for kind in KINDS) for key in recorder.outcomes["page"]}
+    results["all"] = {
+        "requests": total,
+        **outcomes,
+        "p50_ms": _ms(_percentile(everything, 0.50)),
+        "p95_ms": _ms(_percentile(everything, 0.95)),
+        "p99_ms": _ms(_percentile(everything, 0.99)),
+        "max_ms": _ms(everything[-1] if everything else None),
+        "throughput_rps": round(total / elapsed, 1) if elapsed else None,
+        "error_rate": round((outcomes["server_error"] + outcomes["failed"]) / total, 4) if total else None,
+        "rate_limited_rate": round(outcomes["rate_limited"] / total, 4) if total else None,
+    }
+    return results
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def print_table(results, elapsed):
+    print(f"\n{'kind':8s} {'reqs':>7s} {'ok':>7s} {'429':>6s} {'4xx':>5s} {'5xx':>5s} {'fail':>5s} "
+          f"{'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s}", file=sys.stderr)
+    for kind, row in results.items():
+        print(f"{kind:8s} {row['requests']:7d} {row['ok']:7d} {row['rate_limited']:6d} {row['client_error']:5d} "
+              f"{row['server_error']:5d} {row['failed']:5d} {row['p50_ms'] or 0:8.1f} {row['p95_ms'] or 0:8.1f} "
+              f"{row['p99_ms'] or 0:8.1f}", file=sys.stderr)
+    print(f"\n{results['all']['throughput_rps']} req/s over {elapsed:.1f}s", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8080", help="public server base URL")
+    parser.add_argument("--data", help="perf.datagen directory (reads its bench_tokens.json)")
+    parser.add_argument("--tokens", help="bench_tokens.json to use instead of --data")
+    parser.add_argument("--concurrency", type=int, default=20, help="simultaneous guests")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run")
+    parser.add_argument("--visits", type=int, default=None, help="stop after this many guest visits")
+    parser.add_argument("--ramp", type=float, default=0, help="seconds over which guests start")
+    parser.add_argument("--respond-rate", type=float, default=0.3, help="share of visits that submit an RSVP")
+    parser.add_argument("--think", type=float, default=0, help="random 0..N seconds pause between steps")
+    parser.add_argument("--clients", type=int, default=0, help="distinct client addresses (default: one per token)")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    if not args.tokens and not args.data:
+        parser.error("pass --data or --tokens")
+    tokens = json.loads(Path(args.tokens or Path(args.data) / "bench_tokens.json").read_text())
+    if not tokens:
+        sys.exit("No tokens to replay")
+    args.url = args.url.rstrip("/")
+
+    recorder = Recorder()
+    counter = VisitCounter(args.visits)
+    started = time.monotonic()
+    stop_at = started + args.duration
+    guests = [Guest(n, args, tokens, recorder, stop_at, counter) for n in range(args.concurrency)]
+    for n, guest in enumerate(guests):
+        if args.ramp and n:
+            time.sleep(args.ramp / args.concurrency)
+        guest.start()
+    try:
+        for guest in guests:
+            guest.join()
+    except KeyboardInterrupt:
+        print("Interrupted, reporting partial results", file=sys.stderr)
+    elapsed = time.monotonic() - started
+
+    results = summarize(recorder, elapsed)
+    print_table(results, elapsed)
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "url": args.url,
+        "concurrency": args.concurrency,
+        "duration_s": round(elapsed, 2),
+        "respond_rate": args.respond_rate,
+        "clients": args.clients or len(tokens),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
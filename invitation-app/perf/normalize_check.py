@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Check that image_service.normalize_upload strips metadata from uploads.
+
+    python -m perf.normalize_check
+
+Builds small images the way phones and editors write them (JPEG and
+multi-picture MPO JPEGs with a rotated EXIF orientation, camera model and
+GPS position; PNG, WebP and static GIF with EXIF; an animated GIF), runs
+each through normalize_upload in a scratch directory, and checks that the
+result has no EXIF left, has the orientation applied to its pixels, and
+keeps its format. Animated GIFs must come out byte for byte unchanged.
+Prints one JSON line per case; exits 1 if any case fails.
+"""
+
+import json
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+WIDTH, HEIGHT = 60, 40
+ROTATED = 6  # EXIF orientation: rotate 90 degrees clockwise when shown
+
+# name -> (Pillow format, file extension, expected format after normalizing, rotated)
+CASES = {
+    "jpeg": ("JPEG", "jpg", "JPEG", True),
+    "mpo": ("MPO", "jpg", "JPEG", True),
+    "png": ("PNG", "png", "PNG", True),
+    "webp": ("WEBP", "webp", "WEBP", True),
+    "gif": ("GIF", "gif", "GIF", False),
+}
+
+
+def _exif():
+    from PIL import ExifTags, Image
+
+    exif = Image.Exif()
+    exif[ExifTags.Base.Orientation] = ROTATED
+    exif[ExifTags.Base.Model] = "Test Phone"
+    gps = exif.get_ifd(ExifTags.IFD.GPSInfo)
+    gps[ExifTags.GPS.GPSLatitudeRef] = "N"
+    gps[ExifTags.GPS.GPSLatitude] = (52.0, 31.0, 0.0)
+    return exif
+
+
+def write_case(directory, name):
+    from PIL import Image
+
+    fmt, ext, _, _ = CASES[name]
+    path = directory / f"{name}.{ext}"
+    im = Image.new("RGB", (WIDTH, HEIGHT), (200, 30, 30))
+    if fmt == "GIF":
+        # GIF has no EXIF; only check that a static one is re-saved cleanly
+        im.convert("P").save(path, format="GIF", comment=b"Test Phone")
+    elif fmt == "MPO":
+        im.save(path, format="MPO", save_all=True, append_images=[im.copy()], exif=_exif())
+    else:
+        im.save(path, format=fmt, exif=_exif())
+    return path
+
+
+def write_animated(directory):
+    from PIL import Image
+
+    path = directory / "animated.gif"
+    frames = [Image.new("RGB", (WIDTH, HEIGHT), color) for color in ((255, 0, 0), (0, 255, 0), (0, 0, 255))]
+    frames[0].save(path, format="GIF", save_all=True, append_images=frames[1:], duration=100, loop=0)
+    return path
+
+
+def check(path, expected_format, rotated):
+    """Problems with a normalized upload (empty if it's clean)."""
+    from PIL import ExifTags, Image
+
+    problems = []
+    with Image.open(path) as im:
+        exif = im.getexif()
+        if im.format != expected_format:
+            problems.append(f"format {im.format}, expected {expected_format}")
+        if exif.get_ifd(ExifTags.IFD.GPSInfo):
+            problems.append("GPS position kept")
+        if len(exif):
+            problems.append(f"EXIF tags kept: {sorted(exif)}")
+        if "comment" in im.info:
+            problems.append("comment kept")
+        size = (HEIGHT, WIDTH) if rotated else (WIDTH, HEIGHT)
+        if im.size != size:
+            problems.append(f"size {im.size}, expected {size}")
+    return problems
+
+
+def main():
+    from app.services.image_service import normalize_upload
+
+    directory = Path(tempfile.mkdtemp(prefix="invitation-normalize-"))
+    failed = False
+    try:
+        for name, (_, _, expected_format, rotated) in CASES.items():
+            path = write_case(directory, name)
+            normalize_upload(path)
+            problems = check(path, expected_format, rotated)
+            failed |= bool(problems)
+            print(json.dumps({"case": name, "ok": not problems, "problems": problems}))
+
+        path = write_animated(directory)
+        before = path.read_bytes()
+        normalize_upload(path)
+        problems = [] if path.read_bytes() == before else ["animated GIF was rewritten"]
+        failed |= bool(problems)
+        print(json.dumps({"case": "animated_gif", "ok": not problems, "problems": problems}))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Check helpers.sanitize against bleach.clean over a corpus, and time both.
+
+    python -m perf.sanitize_corpus
+    python -m perf.sanitize_corpus --fuzz 200000 --seed 7
+
+The corpus is realistic contact and event fields (names, emails, phone
+numbers, tags, dates, messages), hand-written markup and entity cases, every
+ASCII character embedded in text, and --fuzz random strings biased towards
+the characters bleach treats specially. Every entry must give exactly bleach.clean(text.strip())
+through sanitize() and sanitize_many(); mismatches are printed and the exit
+status is 1. Timings are per field in microseconds, as JSON on stdout.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from perf.datagen import FIRST, LAST, TAGS
+
+HANDWRITTEN = [
+    "", " ", "  padded  ", "John Smith", "Smith & Sons", "Tom &amp; Jerry", "AT&T", "a&b", "&", "&&",
+    "&lt;b&gt;", "&nbsp;", "&#39;", "&#x27;", "&#0;", "&#xD800;", "&bogus;", "&amp", "&ampx", "&copy", "&notin;",
+    "<", ">", "<>", "1 < 2", "2 > 1", "a <b", "<3", "-->", "<!-- comment -->", "<![CDATA[x]]>", "<!DOCTYPE html>",
+    "<b>bold</b>", "<B>BOLD</B>", "<strong>x</strong>", "<em>x", "<i>x</i> y", "<ul><li>1</li></ul>",
+    "<a href=\"https://example.com\">link</a>", "<a href='javascript:alert(1)'>x</a>", "<a onclick=x>y</a>",
+    "<abbr title=\"t\">x</abbr>", "<acronym title=t>x</acronym>", "<blockquote>q</blockquote>", "<code>c</code>",
+    "<script>alert(1)</script>", "<img src=x onerror=alert(1)>", "<svg/onload=alert(1)>", "<style>*{}</style>",
+    "<p>para</p>", "<br>", "<br/>", "</b>", "<b", "<b attr", "<b>unclosed", "<table><tr><td>x", "<textarea>x",
+    "<title>x</title>", "<iframe src=x></iframe>", "<<b>>", "<b><i>nested</b></i>", "x<y>z", "<?php ?>",
+    "line\nbreak", "tab\there", "cr\rlf", "crlf\r\nline", "nul\x00byte", "bell\x07", "esc\x1b[0m", "\x0bvt\x0c",
+    "del\x7f", "nbsp space", "zero​width", "bom﻿", "nonchar￾￿", "astral \U0001F389",
+    "José Müller-Lüdenscheidt", "王小明", "Ōsaka", "Привет", "مرحبا", "O'Brien", "\"quoted\"", "back\\slash",
+    "+1 (555) 123-4567", "+49 171 12345678", "guest+tag@example.com", "2025-06-14", "18:30",
+    "Garden party 🎉 — bring a dish!", "50% off & free <drinks>", "=cmd|' /C calc'!A0",
+]
+
+# Characters that html5lib changes or that start markup, plus ordinary text
+_SPECIAL = "<>&\r\x00\x01\x0b\x1f;#\"'/=!-?"
+_PLAIN = "abcXYZ 019.,@+()éü王🎉\t\n"
+
+
+def realistic(rng, count):
+    fields = []
+    for i in range(count):
+        first, last = rng.choice(FIRST), rng.choice(LAST)
+        fields += [
+            f"{first} {last}", f"{first.lower()}.{last.lower()}{i}@example.com", f"+49 17{i:08d}",
+            rng.choice(TAGS), f"{first}'s {rng.choice(('Birthday', 'BBQ', 'Dinner'))}",
+            f"We'd love to see you at {last} Hall.\nParking at the back.",
+        ]
+    return fields
+
+
+def fuzz(rng, count):
+    alphabet = _SPECIAL + _PLAIN * 2
+    words = ["<b>", "</b>", "<a href=x>", "&amp;", "&lt;", "<!--", "-->", "<script>", "&#", "<", "&"]
+    strings = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randrange(1, 8)):
+            if rng.random() < 0.3:
+                parts.append(rng.choice(words))
+            else:
+                parts.append("".join(rng.choice(alphabet) for _ in range(rng.randrange(1, 12))))
+        strings.append("".join(parts))
+    return strings
+
+
+def check(corpus):
+    """Entries where sanitize or sanitize_many disagree with bleach."""
+    import bleach
+
+    from app.utils.helpers import sanitize, sanitize_many
+
+    batch = sanitize_many(corpus)
+    mismatches = []
+    for text, batched in zip(corpus, batch):
+        expected = bleach.clean(text.strip())
+        single = sanitize(text)
+        if single != expected or batched != expected:
+            mismatches.append({"input": text, "expected": expected, "sanitize": single, "sanitize_many": batched})
+    return mismatches
+
+
+def _per_field_us(fn, corpus):
+    from app.utils import helpers
+
+    helpers._bleach_clean.cache_clear()
+    started = time.perf_counter()
+    fn(corpus)
+    return round((time.perf_counter() - started) / len(corpus) * 1e6, 3)
+
+
+def timings(fields):
+    import bleach
+
+    from app.utils import helpers
+
+    return {
+        "fields": len(fields),
+        "needing_bleach": sum(1 for f in fields if helpers._NEEDS_CLEANING.search(f.strip())),
+        "bleach_clean_us": _per_field_us(lambda c: [bleach.clean(t.strip()) for t in c], fields),
+        "sanitize_us": _per_field_us(lambda c: [helpers.sanitize(t) for t in c], fields),
+        "sanitize_many_us": _per_field_us(helpers.sanitize_many, fields),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--realistic", type=int, default=2000, help="generated contacts/events (6 fields each)")
+    parser.add_argument("--fuzz", type=int, default=20000, help="random strings")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    every_char = [f"a{chr(cp)}b" for cp in range(0x80)] + [chr(cp) for cp in range(0x20)]
+    plain = realistic(rng, args.realistic)
+    corpus = HANDWRITTEN + every_char + plain + fuzz(rng, args.fuzz)
+
+    mismatches = check(corpus)
+    report = {
+        "corpus": len(corpus),
+        "mismatches": len(mismatches),
+        "realistic": timings(plain),
+        # Import-style: a few markup-bearing values repeated many times
+        "repeated_markup": timings(["Smith & Sons", "<b>VIP</b>", "R&D"] * 1000),
+        "handwritten": timings(HANDWRITTEN),
+        "long_message": timings(["<p>" + "Dinner & drinks. " * 40 + "</p>"] * 50),
+    }
+    for mismatch in mismatches[:20]:
+        print(json.dumps(mismatch, ensure_ascii=False), file=sys.stderr)
+    print(json.dumps(report, indent=2))
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Time how long the servers take to start, each in a fresh interpreter.
+
+    python -m perf.startup
+    python -m perf.startup --runs 20 --targets public --importtime 15
+
+For every target a new Python process imports the server module and answers
+one request through the Flask test client, the way a gunicorn worker boots
+after a restart or after being recycled. Reported per target, in
+milliseconds: the whole process (interpreter start to exit), the import
+alone and the first request. "loaded" lists heavy optional modules that the
+import pulled in; they should only load on first use. --importtime adds the
+slowest modules of one run by `python -X importtime`.
+
+Runs against a small generated dataset (or a copy of --data), as JSON on
+stdout like perf.bench.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from perf.bench import APP_DIR, _environment, _git_revision, summarize
+
+# module, request path
+TARGETS = {
+    "config": ("app.config", None),
+    "public": ("public_server", "/r/00000000"),
+    "admin": ("admin_server", "/"),
+}
+
+# Dependencies that only some requests need
+HEAVY_MODULES = ("PIL.Image", "bleach", "smtplib", "email.mime.text", "requests", "android_sms_gateway")
+
+_CHILD = """
+import importlib, json, sys, time
+started = time.perf_counter()
+module = importlib.import_module(sys.argv[1])
+imported = time.perf_counter()
+if sys.argv[2]:
+    module.app.test_client().get(sys.argv[2])
+answered = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_request_ms": (answered - imported) * 1000 if sys.argv[2] else None,
+    "loaded": [name for name in sys.argv[3:] if name in sys.modules],
+}))
+"""
+
+
+def _child_env():
+    # Keep the servers' own log lines out of the measurement
+    return dict(os.environ, LOG_LEVEL="WARNING", ACCESS_LOG="0")
+
+
+def boot(target):
+    """One fresh process for target; returns its timings."""
+    module, path = TARGETS[target]
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", _CHILD, module, path or "", *HEAVY_MODULES],
+        cwd=APP_DIR, env=_child_env(), capture_output=True, text=True,
+    )
+    total_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        sys.exit(f"{target} failed to start:\n{result.stderr}")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["total_ms"] = total_ms
+    return timings
+
+
+def slowest_imports(target, limit):
+    """[(module, cumulative ms)] of one import of target, slowest first."""
+    module, _ = TARGETS[target]
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR, env=_child_env(), capture_output=True, text=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules.append((name.strip(), round(int(cumulative) / 1000, 1)))
+    return sorted(modules, key=lambda m: m[1], reverse=True)[:limit]
+
+
+def run(targets, runs, importtime):
+    results = {}
+    for target in targets:
+        boot(target)  # first start builds the read model, image variants, ...
+        samples = [boot(target) for _ in range(runs)]
+        results[target] = {
+            "total": summarize([s["total_ms"] for s in samples]),
+            "import": summarize([s["import_ms"] for s in samples]),
+            "loaded": samples[-1]["loaded"],
+        }
+        if samples[0]["first_request_ms"] is not None:
+            results[target]["first_request"] = summarize([s["first_request_ms"] for s in samples])
+        if importtime:
+            results[target]["slowest_imports"] = slowest_imports(target, importtime)
+        print(f"{target:8s} total median {results[target]['total']['median_ms']:8.1f} ms, "
+              f"import {results[target]['import']['median_ms']:8.1f} ms", file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", help="existing perf.datagen directory (default: generate a small one)")
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--invitees", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=10, help="process starts per target")
+    parser.add_argument("--targets", nargs="*", choices=list(TARGETS), default=list(TARGETS))
+    parser.add_argument("--importtime", type=int, default=0, metavar="N",
+                        help="also list the N slowest imports of each target")
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    data_dir = Path(tempfile.mkdtemp(prefix="invitation-startup-"))
+    _environment(data_dir)
+    try:
+        if args.data:
+            shutil.copytree(Path(args.data).resolve(), data_dir, dirs_exist_ok=True)
+        else:
+            from perf import datagen
+            datagen.generate(data_dir, args.events, args.invitees, max(1000, args.invitees), 1)
+        report = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "dataset": {"source": args.data, "events": sum(1 for _ in (data_dir / "events").glob("*.json"))},
+            "results": run(args.targets, args.runs, args.importtime),
+        }
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
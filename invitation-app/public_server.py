@@ -1,22 +1,65 @@
 #!/usr/bin/env python3
-"""Public RSVP server - exposed via Cloudflare Tunnel. Port configurable via PUBLIC_PORT in .env."""
+"""Public RSVP server - exposed via Cloudflare Tunnel. Port configurable via PUBLIC_PORT in .env.
+
+Run `python public_server.py serve` for the multi-worker production server.
+"""
 
 from flask import Flask, send_from_directory
-from app.config import SECRET_KEY, UPLOADS_DIR, TEMPLATE_IMAGES_DIR, PUBLIC_PORT
+from app.config import (
+    SECRET_KEY, UPLOADS_DIR, TEMPLATE_IMAGES_DIR, IMAGE_CACHE_DIR, IMMUTABLE_MAX_AGE, PUBLIC_PORT,
+    PUBLIC_WORKERS, PUBLIC_THREADS, PUBLIC_TIMEOUT, COMPRESS_MIN_SIZE,
+)
 from app.public.routes import public_bp
+from app.services import event_service, image_service, read_model, upload_store
+from app.utils import json_log, metrics, profiling
+from app.utils.compression import init_compression
+from app.utils.serving import main
 
-app = Flask(__name__)
+# No app-level static folder: its /static route would shadow public_bp's (rsvp.css)
+app = Flask(__name__, static_folder=None)
 app.secret_key = SECRET_KEY
 
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
+    # Content-addressed uploads never change under the same name
+    if upload_store.is_content_addressed(filename):
+        response = send_from_directory(UPLOADS_DIR, filename, max_age=IMMUTABLE_MAX_AGE)
+        response.cache_control.immutable = True
+        return response
     return send_from_directory(UPLOADS_DIR, filename)
 
 @app.route('/template-images/<filename>')
 def template_image(filename):
     return send_from_directory(TEMPLATE_IMAGES_DIR, filename)
 
+@app.route('/img/<filename>')
+def image_variant(filename):
+    response = send_from_directory(IMAGE_CACHE_DIR, filename, max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.immutable = True
+    return response
+
 app.register_blueprint(public_bp)
 
+# JSON logs through a background thread, with request ids and timings; first,
+# so the logged duration includes every other hook
+json_log.init_app(app, "public")
+
+# Request counts and latencies, written to data/metrics/ for the admin's /metrics
+metrics.init_app(app, "public")
+
+# Opt-in stack sampling of slow or randomly chosen requests (see /debug/profiles)
+profiling.init_app(app, "public")
+
+# gzip/brotli for pages and static text; static files are precompressed in
+# the background once the worker takes its first request
+init_compression(app, min_size=COMPRESS_MIN_SIZE)
+
+# First start before the admin server has published anything
+if not read_model.version():
+    event_service.rebuild_read_model()
+
+# Build resized variants of the bundled template images up front
+image_service.warm(TEMPLATE_IMAGES_DIR)
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=PUBLIC_PORT, debug=False)
+    main(app, "public_server:app", "0.0.0.0", PUBLIC_PORT, PUBLIC_WORKERS, PUBLIC_THREADS, PUBLIC_TIMEOUT)
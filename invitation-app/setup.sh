@@ -54,7 +54,10 @@ After=network.target
 Type=simple
 User=$USER
 WorkingDirectory=$APP_DIR
-ExecStart=$APP_DIR/venv/bin/python $APP_DIR/admin_server.py
+ExecStart=$APP_DIR/venv/bin/python $APP_DIR/admin_server.py serve
+ExecReload=/bin/kill -HUP \$MAINPID
+KillMode=mixed
+TimeoutStopSec=620
 Restart=always
 RestartSec=5
 Environment=PATH=$APP_DIR/venv/bin:/usr/bin:/bin
@@ -72,7 +75,10 @@ After=network.target
 Type=simple
 User=$USER
 WorkingDirectory=$APP_DIR
-ExecStart=$APP_DIR/venv/bin/python $APP_DIR/public_server.py
+ExecStart=$APP_DIR/venv/bin/python $APP_DIR/public_server.py serve
+ExecReload=/bin/kill -HUP \$MAINPID
+KillMode=mixed
+TimeoutStopSec=30
 Restart=always
 RestartSec=5
 Environment=PATH=$APP_DIR/venv/bin:/usr/bin:/bin